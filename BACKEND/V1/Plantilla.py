@@ -1,9 +1,26 @@
+import hashlib
+import io
+import threading
 import pandas as pd
-from openpyxl import load_workbook
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.datavalidation import DataValidation
 from datetime import datetime
 
-def generar_plantilla():
+# Plantilla ya generada en memoria: (año, contenido, etag)
+_plantilla_cache = None
+_plantilla_lock = threading.Lock()
+
+def construir_plantilla(año_actual=None):
+    """
+    Arma el libro de la plantilla en memoria, con anchos y validaciones de datos.
+
+    Args:
+        año_actual (int): Año máximo permitido en la columna AÑO (por defecto el actual)
+
+    Returns:
+        Workbook: Libro de openpyxl sin guardar
+    """
     # Crear la plantilla
     data = {
         'TIPO DE DOCUMENTO': [],
@@ -15,53 +32,79 @@ def generar_plantilla():
     }
     df = pd.DataFrame(data)
 
-    # Guardar la plantilla en un archivo Excel
-    nombre_archivo = 'plantilla.xlsx'
-    df.to_excel(nombre_archivo, index=False, engine='openpyxl')
+    wb = Workbook()
+    ws = wb.active
+    ws.append(list(df.columns))
     
     # Ajustar el ancho de las columnas
-    ajustar_ancho(nombre_archivo)
+    ajustar_ancho(ws, calcular_anchos(df))
     
     # Agregar validación de datos (lista desplegable)
-    agregar_validacion_datos(nombre_archivo)
-    
+    agregar_validacion_datos(ws, año_actual)
+    return wb
+
+def generar_plantilla():
+    # Guardar la plantilla en un archivo Excel
+    nombre_archivo = 'plantilla.xlsx'
+    construir_plantilla().save(nombre_archivo)
     print("Se ha generado la plantilla: plantilla.xlsx")
 
-def ajustar_ancho(nombre_archivo):
-    # Abrir el archivo Excel para ajustar el ancho de las columnas
-    wb = load_workbook(nombre_archivo)
-    ws = wb.active
+def plantilla_en_memoria():
+    """
+    Retorna el contenido de la plantilla, generándolo solo la primera vez y cada vez que
+    cambia el año (la validación de AÑO depende del año actual).
 
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter  # Obtener la letra de la columna
-        column_name = column[0].value  # Obtener el nombre de la columna
-        
-        for cell in column:
-            try:
-                # Calcular el largo máximo del contenido de la celda
-                max_length = max(max_length, len(str(cell.value) if cell.value else ""))
-            except Exception as e:
-                print(f"Error ajustando ancho: {e}")
-        
+    Returns:
+        tuple: (contenido en bytes, etag)
+    """
+    global _plantilla_cache
+    año_actual = datetime.now().year
+    with _plantilla_lock:
+        if _plantilla_cache is None or _plantilla_cache[0] != año_actual:
+            buffer = io.BytesIO()
+            construir_plantilla(año_actual).save(buffer)
+            contenido = buffer.getvalue()
+            _plantilla_cache = (año_actual, contenido, hashlib.sha256(contenido).hexdigest()[:32])
+        return _plantilla_cache[1], _plantilla_cache[2]
+
+def calcular_anchos(df):
+    """
+    Calcula el ancho de cada columna a partir del DataFrame, antes de escribirlo.
+
+    Args:
+        df (DataFrame): Datos que se van a escribir (el encabezado también cuenta)
+
+    Returns:
+        list: Ancho de cada columna, en el mismo orden de df.columns
+    """
+    anchos = []
+    for columna in df.columns:
         # Configurar un ancho específico para la columna "NOMBRE Y APELLIDO"
-        if column_name == "NOMBRES Y APELLIDOS":
-            adjusted_width = 40  # Ancho específico
-        else:
-            adjusted_width = max_length + 10  # Ancho calculado dinámicamente
-        
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Guardar los cambios en el archivo Excel
-    wb.save(nombre_archivo)
+        if columna == "NOMBRES Y APELLIDOS":
+            anchos.append(40)
+            continue
 
-def agregar_validacion_datos(nombre_archivo):
-    # Abrir el archivo Excel para agregar validación de datos
-    wb = load_workbook(nombre_archivo)
-    ws = wb.active
-    
+        # Largo máximo del contenido, sin recorrer celda por celda
+        largo_maximo = df[columna].dropna().astype(str).str.len().max()
+        largo_maximo = 0 if pd.isna(largo_maximo) else int(largo_maximo)
+        anchos.append(max(largo_maximo, len(str(columna))) + 10)  # Ancho calculado dinámicamente
+    return anchos
+
+def ajustar_ancho(ws, anchos):
+    """
+    Aplica los anchos a las columnas de una hoja. En una hoja de solo escritura debe
+    llamarse antes de agregar la primera fila.
+
+    Args:
+        ws (Worksheet): Hoja de openpyxl
+        anchos (list): Anchos calculados con calcular_anchos
+    """
+    for numero_columna, ancho in enumerate(anchos, start=1):
+        ws.column_dimensions[get_column_letter(numero_columna)].width = ancho
+
+def agregar_validacion_datos(ws, año_actual=None):
     # Obtener el año actual
-    año_actual = datetime.now().year
+    año_actual = año_actual or datetime.now().year
     
     # 1. VALIDACIÓN PARA TIPO DE DOCUMENTO (Columna A)
     dv_tipo_doc = DataValidation(
@@ -126,9 +169,6 @@ def agregar_validacion_datos(nombre_archivo):
     dv_año.errorStyle = 'stop'
     dv_año.add('F2:F1000')
     ws.add_data_validation(dv_año)
-    
-    # Guardar los cambios
-    wb.save(nombre_archivo)
 
 if __name__ == "__main__":
     generar_plantilla()
\ No newline at end of file
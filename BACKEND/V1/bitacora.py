@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import pandas as pd
+from dotenv import load_dotenv
+
+# Cargar las variables de entorno
+load_dotenv()
+
+# Resultados que se consideran definitivos al reanudar un lote.
+# ERROR DE PAGINA no está aquí: esas filas se vuelven a intentar.
+STATUS_TERMINADOS = ("EXITO", "FALLIDO", "NOVEDAD", "ENLACE_ESPECIAL")
+
+def huella_datos(datos, alcance=None):
+    """
+    Calcula una huella SHA-256 del contenido de la plantilla. Si se vuelve a subir
+    el mismo archivo (aunque se haya guardado de nuevo) la huella es la misma.
+
+    Args:
+        datos (DataFrame): Datos leídos de la plantilla
+        alcance (str): Si se indica (por ejemplo la carpeta de destino), forma parte de la
+            huella, de modo que el mismo archivo en otro destino tiene otra bitácora
+
+    Returns:
+        str: Huella en hexadecimal
+    """
+    huella = hashlib.sha256()
+    if alcance:
+        huella.update(str(alcance).encode("utf-8") + b"\0")
+    huella.update("|".join(map(str, datos.columns)).encode("utf-8"))
+    huella.update(pd.util.hash_pandas_object(datos.astype(str), index=False).values.tobytes())
+    return huella.hexdigest()
+
+class Bitacora:
+    """
+    Registro de solo anexar (JSONL) con el resultado de cada fila de un lote, escrito
+    en cuanto se conoce. Permite reanudar un lote interrumpido sin repetir las filas
+    que ya terminaron. Cuando el lote termina completo la bitácora se descarta, así que
+    volver a procesar el mismo archivo a propósito consulta el sitio de nuevo.
+
+    Configuración (.env):
+        BITACORA_CARPETA: carpeta donde se guardan las bitácoras
+        BITACORA_VIGENCIA_HORAS: antigüedad máxima de un registro para reutilizarlo
+    """
+
+    def __init__(self, huella, carpeta=None, vigencia_horas=None):
+        self.carpeta = carpeta or os.getenv("BITACORA_CARPETA", "checkpoints")
+        self.vigencia_horas = vigencia_horas if vigencia_horas is not None else float(
+            os.getenv("BITACORA_VIGENCIA_HORAS", "24"))
+        os.makedirs(self.carpeta, exist_ok=True)
+        self.ruta = os.path.join(self.carpeta, f"{huella}.jsonl")
+        self._lock = threading.Lock()
+        self._archivo = None
+
+    def cargar(self):
+        """
+        Lee los registros vigentes de la bitácora. Si una fila aparece varias veces,
+        gana el último registro. Una línea incompleta (por una caída a mitad de
+        escritura) se ignora.
+
+        Returns:
+            dict: fila -> resultado registrado
+        """
+        registros = {}
+        if not os.path.exists(self.ruta):
+            return registros
+
+        limite = time.time() - self.vigencia_horas * 3600
+        with open(self.ruta, encoding="utf-8") as archivo:
+            for linea in archivo:
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue
+                if registro.get("FECHA", 0) >= limite:
+                    registros[registro["FILA"]] = registro
+        return registros
+
+    def registrar(self, fila, resultado):
+        """
+        Agrega el resultado de una fila a la bitácora y lo fuerza a disco.
+
+        Args:
+            fila (int): Posición de la fila (base 0)
+            resultado (dict): Resultado con STATUS, OBSERVACIONES y demás columnas
+        """
+        registro = {"FILA": int(fila), "FECHA": time.time(), **resultado}
+        linea = json.dumps(registro, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._archivo is None:
+                self._archivo = open(self.ruta, "a", encoding="utf-8")
+            self._archivo.write(linea)
+            self._archivo.flush()
+            os.fsync(self._archivo.fileno())
+
+    def cerrar(self):
+        """
+        Cierra el archivo de la bitácora.
+        """
+        with self._lock:
+            if self._archivo:
+                self._archivo.close()
+                self._archivo = None
+
+    def descartar(self):
+        """
+        Cierra y borra la bitácora de un lote que terminó completo.
+        """
+        self.cerrar()
+        with self._lock:
+            try:
+                os.remove(self.ruta)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,150 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+# Cargar las variables de entorno
+load_dotenv()
+
+# Resultados que vale la pena recordar entre lotes
+STATUS_CACHEABLES = ("EXITO", "NOVEDAD", "FALLIDO")
+
+def _texto(valor):
+    """
+    Normaliza un valor de la plantilla a texto (12345.0 -> "12345").
+    """
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+def clave_certificado(row):
+    """
+    Retorna la clave de caché de una fila: número de documento y fecha de expedición.
+
+    Args:
+        row (Series): Fila de la plantilla
+
+    Returns:
+        tuple: (documento, dia, mes, año) normalizados
+    """
+    return (
+        _texto(row["NUMERO DE DOCUMENTO"]),
+        _texto(row["DIA"]).zfill(2),
+        _texto(row["MES"]).upper(),
+        _texto(row["AÑO"]),
+    )
+
+class CacheCertificados:
+    """
+    Caché local de certificados ya consultados en lotes anteriores, con su PDF y su
+    resultado. Evita repetir la consulta en el sitio para personas ya certificadas.
+
+    Configuración (.env):
+        CACHE_CARPETA: carpeta donde se guardan los PDFs y el índice SQLite
+        CACHE_TTL_HORAS: horas durante las que un resultado guardado se considera vigente
+    """
+
+    def __init__(self, carpeta=None, ttl_horas=None):
+        self.carpeta = carpeta or os.getenv("CACHE_CARPETA", "cache_certificados")
+        self.ttl_horas = ttl_horas if ttl_horas is not None else float(os.getenv("CACHE_TTL_HORAS", "168"))
+        os.makedirs(self.carpeta, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(os.path.join(self.carpeta, "indice.sqlite3"), check_same_thread=False)
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS certificados (
+                documento TEXT NOT NULL,
+                dia TEXT NOT NULL,
+                mes TEXT NOT NULL,
+                anio TEXT NOT NULL,
+                status TEXT NOT NULL,
+                observaciones TEXT,
+                archivo_pdf TEXT,
+                nombre_pdf TEXT,
+                fecha REAL NOT NULL,
+                PRIMARY KEY (documento, dia, mes, anio)
+            )
+        """)
+        self._conexion.commit()
+
+    def buscar(self, row):
+        """
+        Busca el resultado vigente de una fila.
+
+        Returns:
+            dict: Registro con status, observaciones y PDF, o None si no hay uno vigente
+        """
+        limite = time.time() - self.ttl_horas * 3600
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT status, observaciones, archivo_pdf, nombre_pdf FROM certificados "
+                "WHERE documento = ? AND dia = ? AND mes = ? AND anio = ? AND fecha >= ?",
+                (*clave_certificado(row), limite),
+            ).fetchone()
+
+        if not fila:
+            return None
+
+        status, observaciones, archivo_pdf, nombre_pdf = fila
+        # Un resultado con certificado solo sirve si el PDF sigue en la caché
+        if status != "FALLIDO" and not (archivo_pdf and os.path.exists(os.path.join(self.carpeta, archivo_pdf))):
+            return None
+
+        return {
+            "status": status,
+            "observaciones": observaciones,
+            "archivo_pdf": os.path.join(self.carpeta, archivo_pdf) if archivo_pdf else None,
+            "nombre_pdf": nombre_pdf,
+        }
+
+    def guardar(self, row, resultado):
+        """
+        Guarda el resultado de una fila (y una copia de su PDF) si es cacheable.
+
+        Args:
+            row (Series): Fila de la plantilla
+            resultado (dict): Resultado con STATUS, OBSERVACIONES y ARCHIVO_PDF
+        """
+        if resultado.get("STATUS") not in STATUS_CACHEABLES:
+            return
+
+        clave = clave_certificado(row)
+        archivo_pdf = None
+        nombre_pdf = None
+        origen = resultado.get("ARCHIVO_PDF")
+        if origen and os.path.exists(origen):
+            archivo_pdf = "_".join(clave) + ".pdf"
+            nombre_pdf = os.path.basename(origen)
+            shutil.copy2(origen, os.path.join(self.carpeta, archivo_pdf))
+        elif resultado["STATUS"] != "FALLIDO":
+            return
+
+        with self._lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO certificados "
+                "(documento, dia, mes, anio, status, observaciones, archivo_pdf, nombre_pdf, fecha) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*clave, resultado["STATUS"], resultado.get("OBSERVACIONES"), archivo_pdf, nombre_pdf, time.time()),
+            )
+            self._conexion.commit()
+
+    def copiar_pdf(self, registro, carpeta_destino):
+        """
+        Copia el PDF guardado en la caché a la carpeta de destino con su nombre original.
+
+        Returns:
+            str: Ruta del PDF copiado, o None si el registro no tiene PDF
+        """
+        if not registro.get("archivo_pdf"):
+            return None
+        ruta_final = os.path.join(carpeta_destino, registro["nombre_pdf"])
+        shutil.copy2(registro["archivo_pdf"], ruta_final)
+        return ruta_final
+
+    def cerrar(self):
+        """
+        Cierra la conexión con el índice.
+        """
+        with self._lock:
+            self._conexion.close()
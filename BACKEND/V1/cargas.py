@@ -0,0 +1,120 @@
+import hashlib
+import os
+import pandas as pd
+from dotenv import load_dotenv
+from V1.leerEXCEL import leer_excel
+from V1.lectores import tipar_columnas
+from V1.metricas import metricas
+
+# pyarrow es opcional: si no está instalado los datos validados se guardan con pickle
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_DISPONIBLE = True
+except ImportError:
+    PARQUET_DISPONIBLE = False
+
+# Cargar las variables de entorno
+load_dotenv()
+
+# Tamaño de cada bloque leído de la subida
+TAMANO_BLOQUE = 1024 * 1024
+
+def _carpeta_validados():
+    carpeta = os.getenv("DATOS_VALIDADOS_CARPETA", os.path.join("uploads", "validados"))
+    os.makedirs(carpeta, exist_ok=True)
+    return carpeta
+
+def guardar_en_bloques(origen, ruta_destino, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Copia un archivo subido a disco por bloques, calculando su SHA-256 al mismo tiempo.
+
+    Args:
+        origen (file): Flujo de lectura del archivo subido
+        ruta_destino (str): Ruta donde se guarda el archivo
+        tamano_bloque (int): Bytes por bloque
+
+    Returns:
+        str: Huella SHA-256 del contenido en hexadecimal
+    """
+    huella = hashlib.sha256()
+    temporal = ruta_destino + ".tmp"
+    with open(temporal, "wb") as destino:
+        while True:
+            bloque = origen.read(tamano_bloque)
+            if not bloque:
+                break
+            huella.update(bloque)
+            destino.write(bloque)
+    os.replace(temporal, ruta_destino)
+    return huella.hexdigest()
+
+def _rutas_validados(huella):
+    base = os.path.join(_carpeta_validados(), huella)
+    return base + ".parquet", base + ".pkl"
+
+def existen_datos_validados(huella):
+    """
+    Indica si ya hay datos validados guardados para un archivo con esta huella.
+    """
+    return any(os.path.exists(ruta) for ruta in _rutas_validados(huella))
+
+def guardar_datos_validados(huella, datos):
+    """
+    Guarda los datos ya validados de un archivo, en Parquet si está disponible.
+
+    Args:
+        huella (str): Huella SHA-256 del archivo subido
+        datos (DataFrame): Datos retornados por leer_excel
+    """
+    ruta_parquet, ruta_pickle = _rutas_validados(huella)
+    if PARQUET_DISPONIBLE:
+        try:
+            datos.to_parquet(ruta_parquet + ".tmp", index=False)
+            os.replace(ruta_parquet + ".tmp", ruta_parquet)
+            return
+        except Exception as e:
+            # Columnas con tipos mezclados (por ejemplo números y texto) no caben en Parquet
+            print(f"No se pudieron guardar los datos en Parquet, se usará pickle: {e}")
+    datos.to_pickle(ruta_pickle + ".tmp")
+    os.replace(ruta_pickle + ".tmp", ruta_pickle)
+
+def cargar_datos_validados(huella):
+    """
+    Carga los datos validados de un archivo subido anteriormente.
+
+    Returns:
+        DataFrame: Los datos, o None si no hay datos guardados para esa huella
+    """
+    ruta_parquet, ruta_pickle = _rutas_validados(huella)
+    try:
+        # tipar_columnas también convierte los datos guardados cuando DIA y AÑO eran texto
+        if PARQUET_DISPONIBLE and os.path.exists(ruta_parquet):
+            return tipar_columnas(pd.read_parquet(ruta_parquet))
+        if os.path.exists(ruta_pickle):
+            return tipar_columnas(pd.read_pickle(ruta_pickle))
+    except Exception as e:
+        print(f"No se pudieron cargar los datos validados de {huella}: {e}")
+    return None
+
+def preparar_datos(ruta_excel, huella):
+    """
+    Lee y valida el archivo subido una sola vez y guarda el resultado con su huella.
+    Si el mismo archivo ya se había subido, no se vuelve a leer.
+
+    Args:
+        ruta_excel (str): Ruta del archivo subido
+        huella (str): Huella SHA-256 del archivo
+
+    Returns:
+        tuple: (es_valido, ya_existia)
+    """
+    if existen_datos_validados(huella):
+        return True, True
+
+    with metricas.etapa("leer_excel", huella=huella):
+        datos = leer_excel(ruta_excel)
+    if datos is None:
+        return False, False
+
+    guardar_datos_validados(huella, datos)
+    return True, False
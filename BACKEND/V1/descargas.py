@@ -0,0 +1,110 @@
+import fnmatch
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+# watchdog es opcional: si no está instalado se usa sondeo de la carpeta
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# Cargar las variables de entorno
+load_dotenv()
+
+# Extensiones temporales que usa Chrome mientras el archivo se está escribiendo
+EXTENSIONES_TEMPORALES = (".crdownload", ".tmp", ".part")
+
+class _NotificadorEventos(FileSystemEventHandler):
+    """
+    Despierta a quien espera una descarga cada vez que cambia algo en la carpeta.
+    """
+
+    def __init__(self, condicion):
+        super().__init__()
+        self._condicion = condicion
+
+    def on_any_event(self, event):
+        with self._condicion:
+            self._condicion.notify_all()
+
+class VigilanteDescargas:
+    """
+    Vigila la carpeta de descargas de un driver y avisa en cuanto un PDF termina de escribirse.
+
+    Usa eventos del sistema de archivos (watchdog: inotify, FSEvents o ReadDirectoryChangesW)
+    cuando están disponibles y, si no, revisa la carpeta cada pocos milisegundos. Como cada
+    driver descarga en su propia carpeta, la revisión solo recorre unos pocos archivos.
+    """
+
+    def __init__(self, carpeta, intervalo_sondeo=None):
+        self.carpeta = carpeta
+        self.intervalo_sondeo = intervalo_sondeo or float(os.getenv("DESCARGA_INTERVALO_SONDEO", "0.1"))
+        self._condicion = threading.Condition()
+        self._observador = None
+
+        if Observer is not None:
+            try:
+                self._observador = Observer()
+                self._observador.schedule(_NotificadorEventos(self._condicion), carpeta, recursive=False)
+                self._observador.daemon = True
+                self._observador.start()
+            except Exception as e:
+                print(f"No se pudo iniciar el vigilante de eventos, se usará sondeo: {e}")
+                self._observador = None
+
+    def _buscar(self, patron):
+        """
+        Retorna los archivos terminados que cumplen el patrón.
+        """
+        try:
+            nombres = os.listdir(self.carpeta)
+        except FileNotFoundError:
+            return []
+
+        return [
+            os.path.join(self.carpeta, nombre)
+            for nombre in nombres
+            if fnmatch.fnmatch(nombre, patron) and not nombre.endswith(EXTENSIONES_TEMPORALES)
+        ]
+
+    def esperar(self, patron, timeout=None):
+        """
+        Espera a que aparezca en la carpeta un archivo terminado que cumpla el patrón.
+
+        Args:
+            patron (str): Patrón del nombre del archivo (por ejemplo "Certificado*.pdf")
+            timeout (float): Segundos máximos de espera (por defecto DESCARGA_TIMEOUT del .env)
+
+        Returns:
+            list: Rutas de los archivos encontrados, o lista vacía si se agotó el tiempo
+        """
+        if timeout is None:
+            timeout = float(os.getenv("DESCARGA_TIMEOUT", "10"))
+        limite = time.monotonic() + timeout
+
+        # Con eventos se duerme hasta que algo cambie; el tope de 1 s cubre eventos perdidos
+        intervalo = 1.0 if self._observador else self.intervalo_sondeo
+
+        with self._condicion:
+            while True:
+                archivos = self._buscar(patron)
+                if archivos:
+                    return archivos
+
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return []
+                self._condicion.wait(min(intervalo, restante))
+
+    def cerrar(self):
+        """
+        Detiene el vigilante de eventos si está activo.
+        """
+        if self._observador:
+            self._observador.stop()
+            self._observador.join(timeout=2)
+            self._observador = None
@@ -0,0 +1,113 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+
+# Cargar las variables de entorno
+load_dotenv()
+
+# Carpeta base donde se crean los espacios de trabajo
+UPLOAD_FOLDER = "uploads"
+
+class EspacioTrabajo:
+    """
+    Espacio aislado de un trabajo: su propio archivo subido, su carpeta de destino
+    y su archivo de resultados. Permite atender varios lotes al mismo tiempo sin
+    que un usuario sobrescriba los archivos de otro.
+
+    Un espacio sin trabajo en ejecución se retira del registro (junto con su carpeta de
+    subida) cuando pasan ESPACIOS_VIGENCIA_HORAS sin usarse. La carpeta de destino con
+    los certificados es del usuario y no se toca.
+    """
+
+    def __init__(self, espacio_id=None, nombre_archivo_salida="resultados_certificados.xlsx"):
+        self.id = espacio_id or uuid.uuid4().hex
+        self.carpeta = os.path.join(UPLOAD_FOLDER, self.id)
+        self.ruta_excel = os.path.join(self.carpeta, "archivo_subido.xlsx")
+        self.carpeta_destino = None
+        # Huella SHA-256 del archivo subido, con la que se ubican sus datos ya validados
+        self.huella_archivo = None
+        self.nombre_archivo_salida = nombre_archivo_salida
+        # Último uso (petición o fin de su trabajo) y si tiene un trabajo en cola o en proceso
+        self.ultimo_uso = time.time()
+        self.trabajo_activo = False
+        os.makedirs(self.carpeta, exist_ok=True)
+
+    @property
+    def ruta_resultados(self):
+        """
+        Ruta del archivo de resultados del espacio, o None si aún no tiene carpeta de destino.
+        """
+        if not self.carpeta_destino:
+            return None
+        return os.path.join(self.carpeta_destino, self.nombre_archivo_salida)
+
+_espacios = {}
+_espacios_lock = threading.Lock()
+
+def _purgar_vencidos():
+    """
+    Retira los espacios sin trabajo activo que llevan más de ESPACIOS_VIGENCIA_HORAS sin
+    usarse y borra su carpeta de subida.
+    """
+    limite = time.time() - float(os.getenv("ESPACIOS_VIGENCIA_HORAS", "24")) * 3600
+    with _espacios_lock:
+        vencidos = [espacio for espacio in _espacios.values()
+                    if not espacio.trabajo_activo and espacio.ultimo_uso < limite]
+        for espacio in vencidos:
+            del _espacios[espacio.id]
+    for espacio in vencidos:
+        shutil.rmtree(espacio.carpeta, ignore_errors=True)
+
+def crear_espacio():
+    """
+    Crea y registra un nuevo espacio de trabajo. De paso retira los espacios vencidos.
+
+    Returns:
+        EspacioTrabajo: El espacio creado
+    """
+    _purgar_vencidos()
+    espacio = EspacioTrabajo()
+    with _espacios_lock:
+        _espacios[espacio.id] = espacio
+    return espacio
+
+def obtener_espacio(espacio_id):
+    """
+    Retorna el espacio con el id indicado, o None si no existe.
+    """
+    if not espacio_id:
+        return None
+    with _espacios_lock:
+        espacio = _espacios.get(espacio_id)
+        if espacio:
+            espacio.ultimo_uso = time.time()
+        return espacio
+
+def marcar_trabajo(espacio_id, activo):
+    """
+    Indica si el espacio tiene un trabajo en cola o en proceso. Mientras lo tenga no
+    vence; cuando el trabajo termina, la vigencia se cuenta desde ese momento.
+
+    Args:
+        espacio_id (str): Id del espacio (el mismo id del trabajo)
+        activo (bool): True al encolar el trabajo, False al terminar
+    """
+    with _espacios_lock:
+        espacio = _espacios.get(espacio_id)
+        if espacio:
+            espacio.trabajo_activo = activo
+            espacio.ultimo_uso = time.time()
+
+def obtener_o_crear_espacio(espacio_id=None):
+    """
+    Retorna el espacio indicado o crea uno nuevo si no se envió un id.
+
+    Returns:
+        EspacioTrabajo: El espacio, o None si se envió un id que no existe
+    """
+    if not espacio_id:
+        return crear_espacio()
+    return obtener_espacio(espacio_id)
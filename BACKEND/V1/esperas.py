@@ -0,0 +1,136 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from dotenv import load_dotenv
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Cargar las variables de entorno
+load_dotenv()
+
+class PoliticaEspera:
+    """
+    Calcula los tiempos de espera de cada paso de la navegación a partir de las
+    latencias observadas en el sitio, en lugar de usar esperas fijas.
+
+    Para cada paso guarda las últimas mediciones y usa un percentil de ellas,
+    multiplicado por un margen, como tiempo máximo de espera. Si un paso obligatorio
+    agota su tiempo, la espera de ese paso se duplica hasta que vuelva a tener éxito,
+    de modo que el sitio lento no genera errores falsos.
+
+    Configuración (.env):
+        ESPERA_INICIAL: segundos de espera mientras no hay suficientes mediciones
+        ESPERA_MINIMA / ESPERA_MAXIMA: límites del tiempo de espera calculado
+        ESPERA_PERCENTIL: percentil de las latencias observadas (por ejemplo 95)
+        ESPERA_FACTOR: margen que se aplica sobre el percentil
+        ESPERA_VENTANA: cantidad de mediciones recientes que se guardan por paso
+    """
+
+    MUESTRAS_MINIMAS = 5
+
+    def __init__(self, inicial=None, minima=None, maxima=None, percentil=None, factor=None, ventana=None):
+        self.inicial = inicial if inicial is not None else float(os.getenv("ESPERA_INICIAL", "5"))
+        self.minima = minima if minima is not None else float(os.getenv("ESPERA_MINIMA", "0.5"))
+        self.maxima = maxima if maxima is not None else float(os.getenv("ESPERA_MAXIMA", "20"))
+        self.percentil = percentil if percentil is not None else float(os.getenv("ESPERA_PERCENTIL", "95"))
+        self.factor = factor if factor is not None else float(os.getenv("ESPERA_FACTOR", "2"))
+        self.ventana = ventana if ventana is not None else int(os.getenv("ESPERA_VENTANA", "50"))
+        self._muestras = {}
+        self._castigo = {}
+        self._agotados = {}
+        self._lock = threading.Lock()
+
+    def _percentil(self, valores):
+        ordenados = sorted(valores)
+        posicion = max(0, math.ceil(self.percentil / 100 * len(ordenados)) - 1)
+        return ordenados[posicion]
+
+    def timeout(self, paso):
+        """
+        Retorna el tiempo máximo de espera (en segundos) para el paso indicado.
+        """
+        with self._lock:
+            muestras = self._muestras.get(paso)
+            castigo = self._castigo.get(paso, 1.0)
+
+            if not muestras or len(muestras) < self.MUESTRAS_MINIMAS:
+                base = self.inicial
+            else:
+                base = self._percentil(muestras) * self.factor
+
+        return min(self.maxima, max(self.minima, base * castigo))
+
+    def registrar(self, paso, segundos):
+        """
+        Registra la duración observada de un paso completado.
+        """
+        with self._lock:
+            if paso not in self._muestras:
+                self._muestras[paso] = deque(maxlen=self.ventana)
+            self._muestras[paso].append(segundos)
+            # Tras un éxito la espera vuelve poco a poco a lo aprendido
+            self._castigo[paso] = max(1.0, self._castigo.get(paso, 1.0) * 0.5)
+
+    def registrar_agotado(self, paso):
+        """
+        Registra que un paso obligatorio agotó su tiempo de espera.
+        """
+        with self._lock:
+            self._castigo[paso] = min(self._castigo.get(paso, 1.0) * 2, 64.0)
+            self._agotados[paso] = self._agotados.get(paso, 0) + 1
+
+    def esperar(self, driver, paso, condicion, obligatorio=True):
+        """
+        Espera una condición de Selenium con el tiempo aprendido para el paso.
+
+        Args:
+            driver (WebDriver): Driver de Chrome
+            paso (str): Nombre del paso (por ejemplo "carga_pagina")
+            condicion (callable): Condición de expected_conditions
+            obligatorio (bool): Si es False, agotar el tiempo es un resultado esperado
+                (la condición puede no cumplirse nunca) y no alarga la espera del paso
+
+        Returns:
+            El valor retornado por la condición
+
+        Raises:
+            TimeoutException: Si la condición no se cumple a tiempo
+        """
+        inicio = time.monotonic()
+        try:
+            resultado = WebDriverWait(driver, self.timeout(paso), poll_frequency=0.05).until(condicion)
+        except TimeoutException:
+            if obligatorio:
+                self.registrar_agotado(paso)
+            raise
+
+        self.registrar(paso, time.monotonic() - inicio)
+        return resultado
+
+    def resumen(self):
+        """
+        Retorna, por paso, la cantidad de mediciones, las latencias p50/p95 y el tiempo de espera actual.
+
+        Returns:
+            dict: Estadísticas por paso
+        """
+        with self._lock:
+            pasos = {paso: list(muestras) for paso, muestras in self._muestras.items()}
+            agotados = dict(self._agotados)
+
+        resumen = {}
+        for paso in set(pasos) | set(agotados):
+            muestras = sorted(pasos.get(paso, []))
+            resumen[paso] = {
+                "mediciones": len(muestras),
+                "p50": round(muestras[len(muestras) // 2], 3) if muestras else None,
+                "p95": round(muestras[max(0, math.ceil(0.95 * len(muestras)) - 1)], 3) if muestras else None,
+                "timeout_actual": round(self.timeout(paso), 3),
+                "agotados": agotados.get(paso, 0),
+            }
+        return resumen
+
+# Política compartida por todos los trabajadores: lo aprendido se conserva entre lotes
+politica_espera = PoliticaEspera()
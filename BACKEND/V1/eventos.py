@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+from collections import deque
+from dotenv import load_dotenv
+
+# Cargar las variables de entorno
+load_dotenv()
+
+class Suscripcion:
+    """
+    Buffer acotado de eventos de un cliente. Si el cliente lee más lento de lo que se
+    publican eventos, se descartan los más antiguos y se cuentan como perdidos: quien
+    publica (los hilos trabajadores) nunca se bloquea esperando al cliente.
+    """
+
+    def __init__(self, canal, capacidad):
+        self._canal = canal
+        self._eventos = deque(maxlen=capacidad)
+        self._condicion = threading.Condition()
+        self.perdidos = 0
+        self.cerrada = False
+
+    def _entregar(self, evento):
+        with self._condicion:
+            if len(self._eventos) == self._eventos.maxlen:
+                self.perdidos += 1
+            self._eventos.append(evento)
+            self._condicion.notify()
+
+    def esperar(self, timeout):
+        """
+        Espera eventos nuevos hasta timeout segundos.
+
+        Returns:
+            tuple: (lista de eventos, cantidad de eventos perdidos desde la última lectura)
+        """
+        with self._condicion:
+            if not self._eventos and not self.cerrada:
+                self._condicion.wait(timeout)
+            eventos = list(self._eventos)
+            self._eventos.clear()
+            perdidos, self.perdidos = self.perdidos, 0
+        return eventos, perdidos
+
+    def cerrar(self):
+        with self._condicion:
+            self.cerrada = True
+            self._condicion.notify()
+        self._canal._retirar(self)
+
+class CanalEventos:
+    """
+    Canal de eventos de un trabajo (resultado de cada fila, cambios de estado) para los
+    clientes conectados por Server-Sent Events.
+
+    Cada evento lleva un id creciente y los últimos se guardan en un historial, de modo
+    que un cliente que se reconecta con Last-Event-ID recibe lo que se perdió.
+
+    Configuración (.env):
+        EVENTOS_BUFFER: eventos máximos en espera por cliente
+        EVENTOS_HISTORIAL: eventos recientes que se guardan para las reconexiones
+    """
+
+    def __init__(self, capacidad=None, historial=None):
+        self.capacidad = capacidad or int(os.getenv("EVENTOS_BUFFER", "1000"))
+        self._historial = deque(maxlen=historial or int(os.getenv("EVENTOS_HISTORIAL", "1000")))
+        self._suscripciones = []
+        self._ultimo_id = 0
+        self._lock = threading.Lock()
+
+    def publicar(self, tipo, datos):
+        """
+        Publica un evento a todos los clientes conectados sin esperar a ninguno.
+
+        Args:
+            tipo (str): Nombre del evento (por ejemplo "fila" o "estado")
+            datos (dict): Contenido serializable a JSON
+        """
+        with self._lock:
+            self._ultimo_id += 1
+            evento = (self._ultimo_id, tipo, datos)
+            self._historial.append(evento)
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            suscripcion._entregar(evento)
+
+    def suscribir(self, ultimo_id=None):
+        """
+        Registra un cliente. Si indica el último id recibido, su buffer empieza con los
+        eventos posteriores que sigan en el historial.
+
+        Returns:
+            Suscripcion: Buffer del cliente (se debe cerrar al desconectarse)
+        """
+        suscripcion = Suscripcion(self, self.capacidad)
+        with self._lock:
+            if ultimo_id is not None:
+                for evento in self._historial:
+                    if evento[0] > ultimo_id:
+                        suscripcion._entregar(evento)
+            self._suscripciones.append(suscripcion)
+        return suscripcion
+
+    def _retirar(self, suscripcion):
+        with self._lock:
+            if suscripcion in self._suscripciones:
+                self._suscripciones.remove(suscripcion)
+
+def formato_sse(tipo, datos, evento_id=None):
+    """
+    Da formato de Server-Sent Events a un evento.
+
+    Returns:
+        str: Bloque "id/event/data" terminado en línea en blanco
+    """
+    lineas = []
+    if evento_id is not None:
+        lineas.append(f"id: {evento_id}")
+    lineas.append(f"event: {tipo}")
+    lineas.append(f"data: {json.dumps(datos, ensure_ascii=False, default=str)}")
+    return "\n".join(lineas) + "\n\n"
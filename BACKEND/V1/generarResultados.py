@@ -1,13 +1,55 @@
 import os
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
-from V1.Plantilla import ajustar_ancho
-import shutil
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, PatternFill
+from V1.Plantilla import ajustar_ancho, calcular_anchos
 
 # Carpeta de descargas por defecto
 ruta_carpeta_descargas = os.path.join(os.path.expanduser("~"), "Downloads")
 
+# Un solo relleno por STATUS, compartido por todas las celdas de ese color
+COLORES_STATUS = {
+    "EXITO": PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid"),
+    "NOVEDAD": PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid"),
+    "FALLIDO": PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid"),
+    "ERROR DE PAGINA": PatternFill(start_color="808080", end_color="808080", fill_type="solid"),
+    "ENLACE_ESPECIAL": PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid"),  # Color blanco para tipos especiales
+}
+
+def _escribir_excel(tabla, status, ruta_archivo_salida):
+    """
+    Escribe la tabla en un solo recorrido (modo de solo escritura de openpyxl), con los
+    anchos de columna y el color de cada fila según su STATUS.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+
+    # En modo de solo escritura los anchos deben definirse antes de la primera fila
+    ajustar_ancho(ws, calcular_anchos(tabla))
+
+    # El estilo de cada color se registra una sola vez en el libro y las celdas lo usan por nombre
+    estilos = {}
+    for status_color, relleno in COLORES_STATUS.items():
+        estilos[status_color] = f"STATUS {status_color}"
+        wb.add_named_style(NamedStyle(name=estilos[status_color], fill=relleno))
+
+    ws.append(list(tabla.columns))
+    valores = tabla.astype(object).where(tabla.notna(), None)
+    for fila, status_fila in zip(valores.itertuples(index=False, name=None), status):
+        relleno = COLORES_STATUS.get(status_fila)
+        if relleno is None:
+            ws.append(fila)
+            continue
+        celdas = []
+        for valor in fila:
+            celda = WriteOnlyCell(ws, value=valor)
+            celda.style = estilos[status_fila]
+            celdas.append(celda)
+        ws.append(celdas)
+
+    wb.save(ruta_archivo_salida)
+
 def generar_resultados(datos, resultados_df, nombre_archivo_salida="resultados_certificados.xlsx", carpeta_destino=ruta_carpeta_descargas):
     # Cambia 'resultados' por 'resultados_df'
     if isinstance(resultados_df, list):
@@ -16,93 +58,45 @@ def generar_resultados(datos, resultados_df, nombre_archivo_salida="resultados_c
         print("Error: El DataFrame 'resultados' está vacío. No se puede generar el archivo.")
         return
 
-    # Carpeta de descargas
-    downloads_folder = os.path.join(os.path.expanduser("~"), "Downloads")
-    if not os.path.exists(downloads_folder):
-        print("Error: No se puede encontrar la carpeta de Descargas.")
+    # Se escribe directamente en la carpeta destino del trabajo para que dos lotes
+    # simultáneos no compartan un archivo intermedio en Descargas. La carpeta de
+    # Descargas solo se exige cuando es el destino.
+    carpeta_salida = carpeta_destino or ruta_carpeta_descargas
+    if not os.path.exists(carpeta_salida):
+        if carpeta_salida == ruta_carpeta_descargas:
+            print("Error: No se puede encontrar la carpeta de Descargas.")
+        else:
+            print(f"Error: No se puede encontrar la carpeta de destino {carpeta_salida}.")
         return
+    ruta_archivo_salida = os.path.join(carpeta_salida, nombre_archivo_salida)
 
-    # Ruta general de salida (ya no por ficha)
-    ruta_archivo_salida = os.path.join(downloads_folder, nombre_archivo_salida)
-
-    # Agregar columna de observaciones directamente al DataFrame completo
+    # Agregar columna de observaciones sobre una copia: 'datos' no se modifica.
+    # STATUS no se agrega como columna, solo se usa para el color de cada fila.
     print("Agregando columna de observaciones...")
+    resultados_df = resultados_df.reset_index(drop=True)
     # Asegurarse de que los resultados se asocien correctamente con las filas
     if len(resultados_df) == len(datos):
-        datos["OBSERVACIONES"] = resultados_df["OBSERVACIONES"]
-        datos["STATUS"] = resultados_df["STATUS"]
+        columnas = {"OBSERVACIONES": resultados_df["OBSERVACIONES"].to_numpy()}
+        # Cantidad de reintentos por CAPTCHA de cada fila
+        if "REINTENTOS" in resultados_df.columns:
+            columnas["REINTENTOS"] = resultados_df["REINTENTOS"].fillna(0).astype(int).to_numpy()
+        # Indica si el resultado salió de la caché de certificados (HIT) o del sitio (MISS)
+        if "CACHE" in resultados_df.columns:
+            columnas["CACHE"] = resultados_df["CACHE"].fillna("").to_numpy()
+        tabla = datos.assign(**columnas)
+        status = resultados_df["STATUS"].tolist()
     else:
         print(f"ADVERTENCIA: El número de resultados ({len(resultados_df)}) no coincide con el número de filas de datos ({len(datos)})")
         # Asignar solo las observaciones disponibles
-        for i in range(min(len(resultados_df), len(datos))):
-            datos.loc[i, "OBSERVACIONES"] = resultados_df.iloc[i]["OBSERVACIONES"]
+        disponibles = min(len(resultados_df), len(datos))
+        observaciones = [None] * len(datos)
+        observaciones[:disponibles] = resultados_df["OBSERVACIONES"].iloc[:disponibles].tolist()
+        tabla = datos.assign(OBSERVACIONES=observaciones)
+        status = [None] * len(datos)
 
-    # Guardar archivo con STATUS para colorear
     try:
-        datos.to_excel(ruta_archivo_salida, index=False, engine="openpyxl")
+        _escribir_excel(tabla, status, ruta_archivo_salida)
         print(f"Archivo guardado en: {ruta_archivo_salida}")
     except Exception as e:
         print(f"Error al guardar el archivo Excel: {e}")
         return
-
-    # Ajustar ancho de columnas
-    try:
-        ajustar_ancho(ruta_archivo_salida)
-    except Exception as e:
-        print(f"Error al ajustar el ancho de las columnas: {e}")
-        return
-
-    # Aplicar colores y eliminar columna STATUS
-    try:
-        wb = load_workbook(ruta_archivo_salida)
-        ws = wb.active
-        
-        # Aplicar colores basados en STATUS
-        for idx, status in enumerate(datos["STATUS"] if "STATUS" in datos.columns else []):
-            fill_color = None
-            if pd.isna(status):
-                continue
-            if status == "EXITO":
-                fill_color = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
-            elif status == "NOVEDAD":
-                fill_color = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-            elif status == "FALLIDO":
-                fill_color = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-            elif status == "ERROR DE PAGINA":
-                fill_color = PatternFill(start_color="808080", end_color="808080", fill_type="solid")
-            elif status == "ENLACE_ESPECIAL":  # Color blanco para tipos especiales
-                fill_color = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-            
-            if fill_color:
-                excel_row = idx + 2
-                for col in range(1, ws.max_column + 1):
-                    ws.cell(row=excel_row, column=col).fill = fill_color
-        
-        # NUEVO: Encontrar y eliminar la columna STATUS
-        status_column = None
-        for col in range(1, ws.max_column + 1):
-            if ws.cell(row=1, column=col).value == "STATUS":
-                status_column = col
-                break
-        
-        if status_column:
-            ws.delete_cols(status_column)
-            print("Columna STATUS eliminada del archivo Excel")
-        
-        wb.save(ruta_archivo_salida)
-        print(f"Archivo coloreado, STATUS eliminado y guardado en: {ruta_archivo_salida}")
-    except Exception as e:
-        print(f"Error al aplicar colores o eliminar STATUS: {e}")
-        return
-
-    # Eliminar STATUS del DataFrame para uso posterior
-    if "STATUS" in datos.columns:
-        datos.drop(columns=["STATUS"], inplace=True)
-
-    # Mover si hay carpeta destino
-    if carpeta_destino:
-        try:
-            shutil.move(ruta_archivo_salida, os.path.join(carpeta_destino, nombre_archivo_salida))
-            print(f"Archivo movido a: {os.path.join(carpeta_destino, nombre_archivo_salida)}")
-        except Exception as e:
-            print(f"Error al mover el archivo a la carpeta de destino: {e}")
\ No newline at end of file
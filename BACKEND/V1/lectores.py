@@ -0,0 +1,184 @@
+import csv
+import os
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from openpyxl import load_workbook
+
+# python-calamine es opcional: es el lector de Excel más rápido que admite pandas
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_DISPONIBLE = True
+except ImportError:
+    CALAMINE_DISPONIBLE = False
+
+# Cargar las variables de entorno
+load_dotenv()
+
+# Columnas de la plantilla (las únicas que se leen del archivo)
+COLUMNAS_PLANTILLA = [
+    'TIPO DE DOCUMENTO',
+    'NUMERO DE DOCUMENTO',
+    'NOMBRES Y APELLIDOS',
+    'DIA',
+    'MES',
+    'AÑO'
+]
+
+# Columnas numéricas de la plantilla: se entregan como enteros (Int64) una vez validadas
+COLUMNAS_ENTERAS = ['DIA', 'AÑO']
+
+EXTENSIONES_CSV = ('.csv', '.txt')
+
+# Formato antiguo de Excel: solo lo lee calamine (openpyxl abre únicamente .xlsx)
+EXTENSIONES_SOLO_CALAMINE = ('.xls',)
+
+MENSAJE_XLS_SIN_CALAMINE = ("Los archivos .xls requieren python-calamine, que no está disponible en el servidor. "
+                            "Guarde el archivo como .xlsx o .csv e intente de nuevo.")
+
+def _a_texto(valor):
+    """
+    Convierte una celda a texto sin decimales espurios (12345678.0 -> "12345678").
+    Las celdas vacías retornan None.
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, (float, np.floating)):
+        if np.isnan(valor):
+            return None
+        if float(valor).is_integer():
+            valor = int(valor)
+    elif isinstance(valor, (int, np.integer)) and not isinstance(valor, bool):
+        valor = int(valor)
+    texto = str(valor).strip()
+    return texto or None
+
+def _normalizar(datos):
+    """
+    Deja todas las columnas como texto (dtype object). La conversión se hace una vez por
+    cada valor distinto de la columna y se reparte a todas las filas.
+    """
+    columnas = {}
+    for columna in datos.columns:
+        codigos, unicos = pd.factorize(datos[columna])
+        textos = np.empty(len(unicos) + 1, dtype=object)
+        textos[:-1] = [_a_texto(valor) for valor in unicos]
+        textos[-1] = None
+        columnas[columna] = textos[codigos]
+    return pd.DataFrame(columnas, columns=list(datos.columns))
+
+def _posiciones(encabezado):
+    """
+    Retorna las posiciones de las columnas de la plantilla presentes en el encabezado.
+    """
+    return [posicion for posicion, nombre in enumerate(encabezado) if nombre in COLUMNAS_PLANTILLA]
+
+def _leer_csv(ruta):
+    with open(ruta, encoding='utf-8-sig', newline='') as archivo:
+        muestra = archivo.read(64 * 1024)
+    try:
+        # Excel en español exporta con punto y coma
+        separador = csv.Sniffer().sniff(muestra, delimiters=',;\t').delimiter
+    except csv.Error:
+        separador = ','
+
+    encabezado = pd.read_csv(ruta, sep=separador, encoding='utf-8-sig', nrows=0).columns
+    encabezado = [str(nombre).strip() for nombre in encabezado]
+    posiciones = _posiciones(encabezado)
+    datos = pd.read_csv(ruta, sep=separador, encoding='utf-8-sig', usecols=posiciones,
+                        dtype=str, keep_default_na=False)
+    datos.columns = [encabezado[posicion] for posicion in posiciones]
+    return encabezado, datos
+
+def _leer_calamine(ruta):
+    encabezado = pd.read_excel(ruta, engine='calamine', nrows=0).columns
+    encabezado = [str(nombre).strip() for nombre in encabezado]
+    posiciones = _posiciones(encabezado)
+    datos = pd.read_excel(ruta, engine='calamine', usecols=posiciones, dtype=object)
+    datos.columns = [encabezado[posicion] for posicion in posiciones]
+    return encabezado, datos
+
+def _leer_openpyxl(ruta):
+    # Modo de solo lectura: las filas se recorren en streaming sin cargar todo el libro
+    wb = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = wb.active.iter_rows(values_only=True)
+        primera = next(filas, None) or ()
+        encabezado = [str(nombre).strip() if nombre is not None else '' for nombre in primera]
+        # Se descartan las columnas vacías del final, como hace pandas
+        while encabezado and encabezado[-1] == '':
+            encabezado.pop()
+        posiciones = _posiciones(encabezado)
+        valores = [[fila[posicion] if posicion < len(fila) else None for posicion in posiciones]
+                   for fila in filas]
+    finally:
+        wb.close()
+    datos = pd.DataFrame(valores, columns=[encabezado[posicion] for posicion in posiciones], dtype=object)
+    return encabezado, datos
+
+def motor_excel():
+    """
+    Retorna el lector de Excel a usar: MOTOR_EXCEL del .env ("calamine" u "openpyxl"),
+    o el más rápido disponible si no se indica.
+    """
+    motor = os.getenv("MOTOR_EXCEL", "auto").strip().lower()
+    if motor == "calamine" and not CALAMINE_DISPONIBLE:
+        print("ADVERTENCIA: python-calamine no está instalado, se usará openpyxl")
+        motor = "openpyxl"
+    if motor not in ("calamine", "openpyxl"):
+        motor = "calamine" if CALAMINE_DISPONIBLE else "openpyxl"
+    return motor
+
+def extension_admitida(extension):
+    """
+    Indica si el servidor puede leer un archivo con la extensión indicada.
+
+    Returns:
+        tuple: (es_admitida, mensaje_error)
+    """
+    if extension.lower() in EXTENSIONES_SOLO_CALAMINE and motor_excel() != "calamine":
+        return False, MENSAJE_XLS_SIN_CALAMINE
+    return True, None
+
+def leer_tabla(ruta):
+    """
+    Lee un archivo de la plantilla (Excel o CSV). Solo se leen las columnas de la
+    plantilla y todas quedan como texto, de modo que NUMERO DE DOCUMENTO nunca se
+    convierte en decimal.
+
+    Args:
+        ruta (str): Ruta del archivo
+
+    Returns:
+        tuple: (encabezado completo del archivo, DataFrame con las columnas de la plantilla)
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    es_admitida, mensaje = extension_admitida(extension)
+    if not es_admitida:
+        raise ValueError(mensaje)
+
+    if extension in EXTENSIONES_CSV:
+        encabezado, datos = _leer_csv(ruta)
+    elif motor_excel() == "calamine":
+        encabezado, datos = _leer_calamine(ruta)
+    else:
+        encabezado, datos = _leer_openpyxl(ruta)
+    return encabezado, _normalizar(datos)
+
+def tipar_columnas(datos):
+    """
+    Convierte DIA y AÑO a enteros (Int64) para que el Excel de resultados los escriba
+    como números. NUMERO DE DOCUMENTO y las demás columnas siguen como texto. Se llama
+    después de validar, cuando ya se sabe que esas columnas son enteros.
+
+    Args:
+        datos (DataFrame): Datos validados de la plantilla
+
+    Returns:
+        DataFrame: Copia de los datos con DIA y AÑO como Int64
+    """
+    datos = datos.copy()
+    for columna in COLUMNAS_ENTERAS:
+        if columna in datos.columns:
+            datos[columna] = pd.to_numeric(datos[columna]).astype('Int64')
+    return datos
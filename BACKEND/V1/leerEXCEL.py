@@ -1,8 +1,185 @@
+import re
+import numpy as np
 import pandas as pd
+from V1.lectores import COLUMNAS_PLANTILLA, leer_tabla, tipar_columnas
+
+# Columnas esperadas en la plantilla
+COLUMNAS_ESPERADAS = COLUMNAS_PLANTILLA
+
+TIPOS_VALIDOS = ['CC', 'TI', 'CE', 'PPT']
+
+MESES_VALIDOS = ['ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO',
+                 'JULIO', 'AGOSTO', 'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE']
+
+# Formatos del número de documento y cuáles acepta cada tipo
+PATRON_DIGITOS = re.compile(r'\d{3,11}')
+PATRON_ALFANUMERICO = re.compile(r'[A-Za-z0-9]{3,15}')
+FORMATOS_DOCUMENTO = {
+    'CC': (('DIGITOS',), 'solo dígitos (3 a 11)'),
+    'TI': (('DIGITOS',), 'solo dígitos (3 a 11)'),
+    'CE': (('DIGITOS', 'ALFANUMERICO'), 'letras o dígitos (3 a 15)'),
+    'PPT': (('DIGITOS', 'ALFANUMERICO'), 'letras o dígitos (3 a 15)'),
+}
+
+# Columnas de la tabla de errores de validar_contenido
+COLUMNAS_ERRORES = ['FILA', 'COLUMNA', 'VALOR', 'ERROR', 'NIVEL']
+
+def _texto(valor):
+    """
+    Normaliza un valor de la plantilla a texto (sin espacios, 12345.0 -> "12345").
+    Los vacíos retornan None.
+    """
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    texto = str(valor).strip()
+    return texto or None
+
+def _por_valor(columna, funcion):
+    """
+    Aplica la función una sola vez por cada valor distinto de la columna y reparte el
+    resultado a todas las filas. Las columnas de la plantilla tienen pocos valores
+    distintos (tipos, días, meses, años), así que el costo no depende del número de filas.
+
+    Returns:
+        ndarray: Resultado de la función para cada fila (los vacíos reciben funcion(None))
+    """
+    codigos, unicos = pd.factorize(columna)
+    resultados = [funcion(valor) for valor in unicos] + [funcion(None)]
+    arreglo = np.empty(len(resultados), dtype=object)
+    arreglo[:] = resultados
+    return arreglo[codigos]
+
+def _entero(texto, minimo, maximo):
+    """
+    Clasifica un texto como entero dentro del rango: None si es válido,
+    "vacio", "no_numero" o "fuera_de_rango" en otro caso.
+    """
+    if texto is None:
+        return "vacio"
+    try:
+        numero = float(texto)
+    except ValueError:
+        return "no_numero"
+    if not numero.is_integer():
+        return "no_numero"
+    if numero < minimo or numero > maximo:
+        return "fuera_de_rango"
+    return None
+
+def _errores(mascara, filas, columna, valores, prefijo, sufijo="", nivel="ERROR"):
+    """
+    Arma el bloque de la tabla de errores para las filas donde la máscara es verdadera.
+    El mensaje es prefijo + valor + sufijo; si valores es None el mensaje es solo el prefijo.
+    El sufijo puede ser un texto o un arreglo con un texto por fila.
+    """
+    if not mascara.any():
+        return None
+    cantidad = int(mascara.sum())
+    if valores is None:
+        valores = np.full(cantidad, "", dtype=object)
+        mensajes = np.full(cantidad, prefijo, dtype=object)
+    else:
+        valores = np.array([str(valor) for valor in valores[mascara]], dtype=object)
+        if isinstance(sufijo, np.ndarray):
+            sufijo = sufijo[mascara]
+        mensajes = prefijo + valores + sufijo
+    return pd.DataFrame({
+        'FILA': filas[mascara],
+        'COLUMNA': columna,
+        'VALOR': valores,
+        'ERROR': mensajes,
+        'NIVEL': nivel,
+    })
+
+def validar_contenido(datos):
+    """
+    Valida el contenido de la plantilla con operaciones vectorizadas por columna.
+
+    Los números de fila corresponden a la fila de Excel (la fila 1 es el encabezado),
+    aunque haya filas vacías en medio.
+
+    Args:
+        datos (DataFrame): DataFrame con los datos del Excel (con su índice original)
+
+    Returns:
+        DataFrame: Tabla con columnas FILA, COLUMNA, VALOR, ERROR y NIVEL ("ERROR" o
+        "ADVERTENCIA"), ordenada por fila. Vacía si no hay hallazgos.
+    """
+    filas = datos.index.to_numpy() + 2
+    originales = {columna: datos[columna].to_numpy() for columna in COLUMNAS_ESPERADAS}
+    bloques = []
+
+    # Tipos de documento válidos
+    tipo = _por_valor(datos['TIPO DE DOCUMENTO'], lambda v: (_texto(v) or "").upper() or None)
+    tipo_vacio = pd.isna(tipo)
+    bloques.append(_errores(tipo_vacio, filas, 'TIPO DE DOCUMENTO', None, "Falta el valor de 'TIPO DE DOCUMENTO'"))
+    bloques.append(_errores(~tipo_vacio & ~pd.Series(tipo).isin(TIPOS_VALIDOS).to_numpy(), filas,
+                            'TIPO DE DOCUMENTO', originales['TIPO DE DOCUMENTO'],
+                            "Tipo de documento inválido '", f"'. Debe ser: {', '.join(TIPOS_VALIDOS)}"))
+
+    # Formato del número de documento según el tipo
+    if pd.api.types.is_integer_dtype(datos['NUMERO DE DOCUMENTO']):
+        # Columna totalmente numérica: la conversión a texto se hace en bloque
+        numero = datos['NUMERO DE DOCUMENTO'].to_numpy().astype(str).astype(object)
+    else:
+        numero = _por_valor(datos['NUMERO DE DOCUMENTO'], _texto)
+    numero_vacio = pd.isna(numero)
+    bloques.append(_errores(numero_vacio, filas, 'NUMERO DE DOCUMENTO', None, "Falta el valor de 'NUMERO DE DOCUMENTO'"))
+    formato = _por_valor(numero, lambda v: None if v is None
+                         else 'DIGITOS' if PATRON_DIGITOS.fullmatch(v)
+                         else 'ALFANUMERICO' if PATRON_ALFANUMERICO.fullmatch(v) else 'INVALIDO')
+    for tipo_documento, (formatos_validos, descripcion) in FORMATOS_DOCUMENTO.items():
+        invalido = ~numero_vacio & ~pd.Series(formato).isin(formatos_validos).to_numpy()
+        bloques.append(_errores((tipo == tipo_documento) & invalido, filas, 'NUMERO DE DOCUMENTO', numero,
+                                "Número de documento inválido '",
+                                f"' para {tipo_documento}. Debe tener {descripcion}"))
+
+    # Días: números enteros entre 1 y 31
+    dia = _por_valor(datos['DIA'], lambda v: _entero(_texto(v), 1, 31))
+    bloques.append(_errores(dia == "vacio", filas, 'DIA', None, "Falta el valor de 'DIA'"))
+    bloques.append(_errores(dia == "no_numero", filas, 'DIA', originales['DIA'], "Día '", "' debe ser un número"))
+    bloques.append(_errores(dia == "fuera_de_rango", filas, 'DIA', originales['DIA'],
+                            "Día inválido '", "'. Debe estar entre 1 y 31"))
+
+    # Meses válidos
+    mes = _por_valor(datos['MES'], lambda v: "vacio" if _texto(v) is None
+                     else None if _texto(v).upper() in MESES_VALIDOS else "invalido")
+    bloques.append(_errores(mes == "vacio", filas, 'MES', None, "Falta el valor de 'MES'"))
+    bloques.append(_errores(mes == "invalido", filas, 'MES', originales['MES'],
+                            "Mes inválido '", f"'. Debe ser uno de: {', '.join(MESES_VALIDOS)}"))
+
+    # Años: entre 1900 y el año actual
+    año_actual = pd.Timestamp.now().year
+    año = _por_valor(datos['AÑO'], lambda v: _entero(_texto(v), 1900, año_actual))
+    bloques.append(_errores(año == "vacio", filas, 'AÑO', None, "Falta el valor de 'AÑO'"))
+    bloques.append(_errores(año == "no_numero", filas, 'AÑO', originales['AÑO'], "Año '", "' debe ser un número"))
+    bloques.append(_errores(año == "fuera_de_rango", filas, 'AÑO', originales['AÑO'],
+                            "Año inválido '", f"'. Debe estar entre 1900 y {año_actual}"))
+
+    # Cédulas duplicadas: no bloquean el proceso, pero se reportan antes de usar el navegador
+    clave = pd.DataFrame({'tipo': tipo, 'numero': numero})
+    duplicadas = ~numero_vacio & clave.duplicated(keep='first').to_numpy()
+    if duplicadas.any():
+        # La primera aparición se busca solo entre las filas repetidas
+        repetidas = clave.duplicated(keep=False).to_numpy()
+        primera_fila = pd.Series(filas[repetidas]).groupby(
+            [tipo[repetidas], numero[repetidas]], dropna=False).transform('min').to_numpy()
+        detalle = np.empty(len(filas), dtype=object)
+        detalle[duplicadas] = [f"'. Ya aparece en la fila {fila}"
+                               for fila in primera_fila[duplicadas[repetidas]]]
+        bloques.append(_errores(duplicadas, filas, 'NUMERO DE DOCUMENTO', numero,
+                                "Documento duplicado '", detalle, nivel="ADVERTENCIA"))
+
+    bloques = [bloque for bloque in bloques if bloque is not None]
+    if not bloques:
+        return pd.DataFrame(columns=COLUMNAS_ERRORES)
+    return pd.concat(bloques, ignore_index=True).sort_values('FILA', kind='stable', ignore_index=True)
 
 def validar_plantilla(datos):
     """
-    Valida que el archivo Excel tenga la estructura correcta de la plantilla
+    Valida que el archivo Excel tenga la estructura y el contenido correctos de la plantilla
     
     Args:
         datos (DataFrame): DataFrame con los datos del Excel
@@ -10,22 +187,38 @@ def validar_plantilla(datos):
     Returns:
         tuple: (es_valido, mensaje_error)
     """
-    # Columnas esperadas en la plantilla
-    columnas_esperadas = [
-        'TIPO DE DOCUMENTO',
-        'NUMERO DE DOCUMENTO', 
-        'NOMBRES Y APELLIDOS',
-        'DIA',
-        'MES',
-        'AÑO'
-    ]
+    es_valido, mensaje = validar_estructura(datos)
+    if not es_valido:
+        return es_valido, mensaje
+    return validar_errores_contenido(validar_contenido(datos))
+
+def validar_estructura(datos):
+    """
+    Valida que el archivo Excel tenga las columnas de la plantilla
     
+    Args:
+        datos (DataFrame): DataFrame con los datos del Excel
+        
+    Returns:
+        tuple: (es_valido, mensaje_error)
+    """
     # Verificar que el DataFrame no esté vacío
     if datos.empty:
         return False, "El archivo está vacío. Use la plantilla correcta."
     
-    # Obtener las columnas del archivo
-    columnas_archivo = list(datos.columns)
+    return validar_columnas(list(datos.columns))
+
+def validar_columnas(columnas_archivo):
+    """
+    Valida que el encabezado tenga exactamente las columnas de la plantilla, en orden.
+
+    Args:
+        columnas_archivo (list): Nombres de las columnas del archivo
+
+    Returns:
+        tuple: (es_valido, mensaje_error)
+    """
+    columnas_esperadas = COLUMNAS_ESPERADAS
     
     # Verificar que tenga el número correcto de columnas
     if len(columnas_archivo) != len(columnas_esperadas):
@@ -40,40 +233,15 @@ def validar_plantilla(datos):
         if columna_actual != columna_esperada:
             return False, f"Columna incorrecta en posición {i+1}. Esperada: '{columna_esperada}', Encontrada: '{columna_actual}'"
     
-    # Validaciones adicionales de contenido
-    errores_contenido = []
-    
-    # Verificar tipos de documento válidos
-    tipos_validos = ['CC', 'TI', 'CE', 'PPT']
-    for idx, tipo in enumerate(datos['TIPO DE DOCUMENTO'].dropna()):
-        if str(tipo).strip().upper() not in tipos_validos:
-            errores_contenido.append(f"Fila {idx+2}: Tipo de documento inválido '{tipo}'. Debe ser: {', '.join(tipos_validos)}")
-    
-    # Verificar que los días sean números válidos
-    for idx, dia in enumerate(datos['DIA'].dropna()):
-        try:
-            dia_num = int(dia)
-            if dia_num < 1 or dia_num > 31:
-                errores_contenido.append(f"Fila {idx+2}: Día inválido '{dia}'. Debe estar entre 1 y 31")
-        except (ValueError, TypeError):
-            errores_contenido.append(f"Fila {idx+2}: Día '{dia}' debe ser un número")
-    
-    # Verificar meses válidos
-    meses_validos = ['ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO', 
-                     'JULIO', 'AGOSTO', 'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE']
-    for idx, mes in enumerate(datos['MES'].dropna()):
-        if str(mes).strip().upper() not in meses_validos:
-            errores_contenido.append(f"Fila {idx+2}: Mes inválido '{mes}'. Debe ser uno de: {', '.join(meses_validos)}")
-    
-    # Verificar años válidos
-    año_actual = pd.Timestamp.now().year
-    for idx, año in enumerate(datos['AÑO'].dropna()):
-        try:
-            año_num = int(año)
-            if año_num < 1900 or año_num > año_actual:
-                errores_contenido.append(f"Fila {idx+2}: Año inválido '{año}'. Debe estar entre 1900 y {año_actual}")
-        except (ValueError, TypeError):
-            errores_contenido.append(f"Fila {idx+2}: Año '{año}' debe ser un número")
+    return True, "Estructura válida"
+
+def validar_errores_contenido(tabla_errores):
+    """
+    Resume la tabla de validar_contenido en el formato (es_valido, mensaje_error).
+    Solo las filas con NIVEL "ERROR" invalidan la plantilla.
+    """
+    errores = tabla_errores[tabla_errores['NIVEL'] == 'ERROR']
+    errores_contenido = ("Fila " + errores['FILA'].astype(str) + ": " + errores['ERROR']).tolist()
     
     # Si hay errores de contenido, mostrar solo los primeros 5
     if errores_contenido:
@@ -86,11 +254,20 @@ def validar_plantilla(datos):
 
 def leer_excel(archivo_usuario):
     try:
-        # Leer el archivo Excel
-        datos = pd.read_excel(archivo_usuario, engine='openpyxl')
+        # Leer solo las columnas de la plantilla, como texto (Excel o CSV)
+        encabezado, datos = leer_tabla(archivo_usuario)
         
-        # Validar la estructura de la plantilla
-        es_valido, mensaje = validar_plantilla(datos)
+        # Ignorar filas completamente vacías (conservando el índice para reportar la fila real)
+        datos = datos.dropna(how='all')
+        
+        # Validar la estructura y el contenido de la plantilla en una sola pasada
+        es_valido, mensaje = validar_columnas(encabezado)
+        if es_valido:
+            es_valido, mensaje = validar_estructura(datos)
+        tabla_errores = None
+        if es_valido:
+            tabla_errores = validar_contenido(datos)
+            es_valido, mensaje = validar_errores_contenido(tabla_errores)
         
         if not es_valido:
             print("ERROR: El archivo no cumple con el formato de la plantilla requerida.")
@@ -106,6 +283,15 @@ def leer_excel(archivo_usuario):
             print("ADVERTENCIA: El archivo no contiene datos. Por favor, agregue información a la plantilla.")
             return None
         else:
+            # Mostrar advertencias (por ejemplo documentos duplicados)
+            advertencias = tabla_errores[tabla_errores['NIVEL'] == 'ADVERTENCIA']
+            for _, advertencia in advertencias.head(5).iterrows():
+                print(f"ADVERTENCIA: Fila {advertencia['FILA']}: {advertencia['ERROR']}")
+            if len(advertencias) > 5:
+                print(f"ADVERTENCIA: ... y {len(advertencias) - 5} advertencias más.")
+
+            # Ya validados, DIA y AÑO pasan a enteros; el documento sigue como texto
+            datos = tipar_columnas(datos.reset_index(drop=True))
             print("EXITO: Archivo cargado correctamente")
             print(f"INFO: Se encontraron {len(datos)} registros para procesar")
             
@@ -124,7 +310,7 @@ def leer_excel(archivo_usuario):
     except Exception as e:
         print(f"ERROR al cargar el archivo: {e}")
         print("VERIFICAR:")
-        print("1. El archivo sea un Excel válido (.xlsx)")
+        print("1. El archivo sea un Excel válido (.xlsx) o un CSV con las columnas de la plantilla")
         print("2. El archivo no esté abierto en otra aplicación")
         print("3. Use la plantilla generada por 'Plantilla.py'")
         return None
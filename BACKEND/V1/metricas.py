@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Cargar las variables de entorno
+load_dotenv()
+
+# Límites superiores (en segundos) de los buckets de los histogramas
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+class Histograma:
+    """
+    Histograma acumulado al estilo Prometheus: cantidad de observaciones por bucket,
+    suma y total.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for indice, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.conteos[indice] += 1
+                break
+        self.suma += valor
+        self.total += 1
+
+def _etiquetas(etiquetas):
+    return ",".join(f'{nombre}="{str(valor)}"' for nombre, valor in etiquetas)
+
+class Metricas:
+    """
+    Tiempos estructurados del proceso: etapas del lote (leer Excel, navegación, resultados,
+    unión de PDFs) y pasos del navegador dentro de cada fila (carga de página, llenado del
+    formulario, envío, espera de la descarga y movimiento del archivo).
+
+    Cada medición se agrega a un histograma (exportado en formato Prometheus por /metrics)
+    y se escribe como una línea JSON en METRICAS_ARCHIVO.
+
+    Configuración (.env):
+        METRICAS_ARCHIVO: archivo JSONL de mediciones (vacío para no escribirlo)
+    """
+
+    def __init__(self, archivo=None):
+        self.archivo = archivo if archivo is not None else os.getenv("METRICAS_ARCHIVO", "metricas/tiempos.jsonl")
+        self._histogramas = {}
+        self._lock = threading.Lock()
+        self._salida = None
+
+    def _observar(self, metrica, etiquetas, valor):
+        clave = (metrica, tuple(etiquetas.items()))
+        with self._lock:
+            if clave not in self._histogramas:
+                self._histogramas[clave] = Histograma()
+            self._histogramas[clave].observar(valor)
+
+    def _escribir(self, registro):
+        if not self.archivo:
+            return
+        linea = json.dumps(registro, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            try:
+                if self._salida is None:
+                    carpeta = os.path.dirname(self.archivo)
+                    if carpeta:
+                        os.makedirs(carpeta, exist_ok=True)
+                    self._salida = open(self.archivo, "a", encoding="utf-8")
+                self._salida.write(linea)
+                self._salida.flush()
+            except OSError as e:
+                print(f"No se pudo escribir la métrica: {e}")
+
+    @contextmanager
+    def etapa(self, nombre, **contexto):
+        """
+        Mide una etapa del lote. Uso: with metricas.etapa("leer_excel", trabajo=id): ...
+
+        Args:
+            nombre (str): Nombre de la etapa
+            contexto: Datos adicionales que solo se escriben en el JSONL (por ejemplo el trabajo)
+        """
+        inicio = time.time()
+        inicio_monotonico = time.monotonic()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            duracion = time.monotonic() - inicio_monotonico
+            self._observar("certigranja_etapa_segundos", {"etapa": nombre}, duracion)
+            self._escribir({"tipo": "etapa", "etapa": nombre, "inicio": inicio,
+                            "duracion": round(duracion, 4), "error": error, **contexto})
+
+    def registrar_fila(self, fila, status, duracion, pasos, **contexto):
+        """
+        Registra el tiempo total de una fila y el de cada paso del navegador, agrupados
+        por el STATUS con que terminó la fila.
+
+        Args:
+            fila (int): Posición de la fila (base 0)
+            status (str): STATUS del resultado (o "CAPTCHA" / "ERROR_NAVEGADOR" para un
+                intento que se reintenta)
+            duracion (float): Segundos que tomó la fila
+            pasos (dict): Segundos por paso del navegador
+        """
+        self._observar("certigranja_fila_segundos", {"status": status}, duracion)
+        for paso, segundos in pasos.items():
+            self._observar("certigranja_paso_segundos", {"paso": paso, "status": status}, segundos)
+        self._escribir({"tipo": "fila", "fila": int(fila), "status": status, "inicio": time.time() - duracion,
+                        "duracion": round(duracion, 4),
+                        "pasos": {paso: round(segundos, 4) for paso, segundos in pasos.items()},
+                        **contexto})
+
+    def exportar_prometheus(self):
+        """
+        Retorna los histogramas en el formato de texto de Prometheus.
+
+        Returns:
+            str: Texto para el endpoint /metrics
+        """
+        descripciones = {
+            "certigranja_etapa_segundos": "Duración de cada etapa del lote",
+            "certigranja_fila_segundos": "Duración de cada fila por STATUS",
+            "certigranja_paso_segundos": "Duración de cada paso del navegador por STATUS de la fila",
+        }
+        with self._lock:
+            copia = {clave: (list(h.conteos), h.suma, h.total, h.buckets) for clave, h in self._histogramas.items()}
+
+        lineas = []
+        for metrica, descripcion in descripciones.items():
+            lineas.append(f"# HELP {metrica} {descripcion}")
+            lineas.append(f"# TYPE {metrica} histogram")
+            for (nombre, etiquetas), (conteos, suma, total, buckets) in sorted(copia.items()):
+                if nombre != metrica:
+                    continue
+                acumulado = 0
+                for limite, conteo in zip(buckets, conteos):
+                    acumulado += conteo
+                    lineas.append(f"{metrica}_bucket{{{_etiquetas(etiquetas + (('le', limite),))}}} {acumulado}")
+                lineas.append(f"{metrica}_bucket{{{_etiquetas(etiquetas + (('le', '+Inf'),))}}} {total}")
+                lineas.append(f"{metrica}_sum{{{_etiquetas(etiquetas)}}} {round(suma, 6)}")
+                lineas.append(f"{metrica}_count{{{_etiquetas(etiquetas)}}} {total}")
+        return "\n".join(lineas) + "\n"
+
+@contextmanager
+def medir_paso(pasos, paso):
+    """
+    Suma al diccionario de pasos de una fila los segundos que tarda el bloque.
+    Si pasos es None no se mide nada.
+    """
+    if pasos is None:
+        yield
+        return
+    inicio = time.monotonic()
+    try:
+        yield
+    finally:
+        pasos[paso] = pasos.get(paso, 0.0) + time.monotonic() - inicio
+
+# Métricas compartidas por todo el proceso
+metricas = Metricas()
@@ -0,0 +1,346 @@
+import os
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from V1.metricas import medir_paso
+
+# Cargar las variables de entorno
+load_dotenv()
+
+MOTOR_HTTP = "http"
+MOTOR_SELENIUM = "selenium"
+
+TEXTO_ERROR_PAGINA = "Al parecer se presentó algun problema!"
+TEXTO_ENLACE_CERTIFICADO = "Expedición Certificado"
+
+# Ids de los campos del formulario ASP.NET (los mismos que usa Selenium)
+CAMPO_DOCUMENTO = "ContentPlaceHolder1_TextBox1"
+CAMPO_DIA = "ContentPlaceHolder1_DropDownList1"
+CAMPO_MES = "ContentPlaceHolder1_DropDownList2"
+CAMPO_AÑO = "ContentPlaceHolder1_DropDownList3"
+CAMPO_CODIGO = "ContentPlaceHolder1_TextBox2"
+BOTON_ENVIAR = "ContentPlaceHolder1_Button1"
+ETIQUETA_MENSAJE = "ContentPlaceHolder1_Label11"
+
+def motor_navegacion():
+    """
+    Retorna el motor con el que se consultan las filas CC: MOTOR_NAVEGACION del .env
+    ("selenium" usa Chrome y es el valor por defecto; "http" envía el formulario
+    directamente y se activa de forma explícita, pues solo se ha probado contra el
+    sitio simulado de benchmarks).
+    """
+    motor = os.getenv("MOTOR_NAVEGACION", MOTOR_SELENIUM).strip().lower()
+    return motor if motor in (MOTOR_HTTP, MOTOR_SELENIUM) else MOTOR_SELENIUM
+
+class RespuestaInesperada(Exception):
+    """
+    El sitio respondió algo que el motor HTTP no sabe interpretar (falta un campo, el
+    enlace de descarga o la descarga no es un PDF). La fila se reintenta con Selenium.
+    """
+
+# Errores con los que la fila pasa a Selenium
+ERRORES_HTTP = (RespuestaInesperada, requests.RequestException)
+
+class _LectorPagina(HTMLParser):
+    """
+    Extrae de una página lo que necesita el motor: el formulario (acción, campos y
+    opciones de las listas), los enlaces, los títulos h3, el mensaje de Label11 y los
+    marcos o enlaces que disparan la descarga.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.accion = None
+        self.campos = {}
+        self.ids = {}
+        self.botones = {}
+        self.listas = {}
+        self.enlaces = []
+        self.titulos = []
+        self.marcos = []
+        self.mensaje = None
+        self.mensaje_visible = False
+        self._lista = None
+        self._opcion = None
+        self._texto = None
+        self._destino = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {nombre: valor or "" for nombre, valor in attrs}
+        nombre = attrs.get("name")
+        if tag == "form" and self.accion is None:
+            self.accion = attrs.get("action", "")
+        elif tag == "input" and nombre:
+            tipo = attrs.get("type", "text").lower()
+            if tipo == "submit":
+                self.botones[nombre] = attrs.get("value", "")
+            elif tipo not in ("checkbox", "radio", "button", "image") or "checked" in attrs:
+                self.campos[nombre] = attrs.get("value", "")
+            if attrs.get("id"):
+                self.ids[attrs["id"]] = nombre
+        elif tag == "select" and nombre:
+            self._lista = nombre
+            self.listas[nombre] = {}
+            self.campos.setdefault(nombre, "")
+            if attrs.get("id"):
+                self.ids[attrs["id"]] = nombre
+        elif tag == "option" and self._lista:
+            self._opcion = attrs
+            self._texto = []
+        elif tag == "a":
+            self._destino = ("a", attrs.get("href", ""))
+            self._texto = []
+        elif tag == "h3":
+            self._destino = ("h3", None)
+            self._texto = []
+        elif tag == "span" and attrs.get("id") == ETIQUETA_MENSAJE:
+            self._destino = ("mensaje", None)
+            self._texto = []
+            estilo = attrs.get("style", "").replace(" ", "").lower()
+            self.mensaje_visible = "display:none" not in estilo and "visibility:hidden" not in estilo
+        elif tag == "iframe" and attrs.get("src"):
+            self.marcos.append(attrs["src"])
+        elif tag == "meta" and attrs.get("http-equiv", "").lower() == "refresh":
+            coincidencia = re.search(r"url=(.+)", attrs.get("content", ""), re.IGNORECASE)
+            if coincidencia:
+                self.marcos.append(coincidencia.group(1).strip("'\" "))
+
+    def handle_data(self, data):
+        if self._texto is not None:
+            self._texto.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "option" and self._opcion is not None:
+            texto = " ".join("".join(self._texto).split())
+            valor = self._opcion.get("value", texto)
+            self.listas[self._lista][texto] = valor
+            if "selected" in self._opcion or not self.campos[self._lista]:
+                self.campos[self._lista] = valor
+            self._opcion = None
+            self._texto = None
+        elif tag == "select":
+            self._lista = None
+        elif self._destino and tag in ("a", "h3", "span"):
+            tipo, destino = self._destino
+            texto = " ".join("".join(self._texto).split())
+            if tipo == "a" and tag == "a":
+                self.enlaces.append((texto, destino))
+            elif tipo == "h3" and tag == "h3":
+                self.titulos.append(texto)
+            elif tipo == "mensaje" and tag == "span":
+                self.mensaje = texto
+            else:
+                return
+            self._destino = None
+            self._texto = None
+
+def leer_pagina(contenido):
+    lector = _LectorPagina()
+    lector.feed(contenido)
+    lector.close()
+    return lector
+
+class ClienteCertificados:
+    """
+    Motor HTTP del sitio de certificados: envía el formulario ASP.NET directamente, sin
+    navegador, manteniendo __VIEWSTATE/__EVENTVALIDATION de una respuesta a la siguiente,
+    y escribe el PDF recibido directamente en la carpeta de destino.
+
+    Retorna los mismos STATUS y OBSERVACIONES que procesar_fila, de modo que el resto del
+    proceso no cambia. Si el sitio responde algo inesperado lanza RespuestaInesperada y
+    la fila se procesa con Selenium.
+
+    Cada trabajador usa su propio cliente: la sesión conserva las cookies del sitio y
+    reutiliza las conexiones abiertas (keep-alive) entre filas.
+
+    Configuración (.env):
+        MOTOR_HTTP_TIMEOUT: segundos máximos de espera de cada petición
+    """
+
+    AGENTE = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+
+    def __init__(self, timeout=None, conexiones=4):
+        self.timeout = timeout if timeout is not None else float(os.getenv("MOTOR_HTTP_TIMEOUT", "30"))
+        self.sesion = requests.Session()
+        self.sesion.headers["User-Agent"] = self.AGENTE
+        # Solo se reintentan las peticiones GET; reenviar un formulario podría duplicar la consulta
+        reintentos = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                           allowed_methods=frozenset(["GET"]))
+        adaptador = HTTPAdapter(pool_connections=conexiones, pool_maxsize=conexiones, max_retries=reintentos)
+        self.sesion.mount("http://", adaptador)
+        self.sesion.mount("https://", adaptador)
+
+    def cerrar(self):
+        self.sesion.close()
+
+    def _obtener(self, url, **kwargs):
+        respuesta = self.sesion.get(url, timeout=self.timeout, **kwargs)
+        respuesta.raise_for_status()
+        return respuesta
+
+    def _enviar(self, url, datos):
+        respuesta = self.sesion.post(url, data=datos, timeout=self.timeout, headers={"Referer": url})
+        respuesta.raise_for_status()
+        return respuesta
+
+    @staticmethod
+    def _campo(pagina, id_campo):
+        nombre = pagina.ids.get(id_campo)
+        if nombre is None:
+            raise RespuestaInesperada(f"El formulario no tiene el campo {id_campo}")
+        return nombre
+
+    def _datos_envio(self, pagina):
+        """
+        Arma los datos de un postback: todos los campos de la página (incluidos los ocultos
+        de ASP.NET) más el botón Button1, como lo envía el navegador al hacer clic.
+        """
+        boton = self._campo(pagina, BOTON_ENVIAR)
+        datos = dict(pagina.campos)
+        datos[boton] = pagina.botones.get(boton, "")
+        return datos
+
+    @staticmethod
+    def _seleccionar(pagina, datos, id_campo, texto):
+        nombre = ClienteCertificados._campo(pagina, id_campo)
+        opciones = pagina.listas.get(nombre, {})
+        if texto not in opciones:
+            raise RespuestaInesperada(f"La opción {texto!r} no existe en {id_campo}")
+        datos[nombre] = opciones[texto]
+
+    def _guardar_pdf(self, respuesta, documento, carpeta_destino):
+        """
+        Escribe el PDF de la respuesta en la carpeta de destino con el mismo nombre que
+        tendría la descarga de Chrome.
+        """
+        contenido = respuesta.content
+        if not contenido.startswith(b"%PDF"):
+            raise RespuestaInesperada("La descarga no es un PDF")
+
+        nombre = None
+        disposicion = respuesta.headers.get("Content-Disposition", "")
+        coincidencia = re.search(r'filename="?([^";]+)"?', disposicion)
+        if coincidencia:
+            nombre = os.path.basename(coincidencia.group(1).strip())
+        if not nombre:
+            nombre = f"Certificado estado cedula {documento}.pdf"
+
+        destino = carpeta_destino or os.path.join(os.path.expanduser("~"), "Downloads")
+        ruta_final = os.path.join(destino, nombre)
+        temporal = ruta_final + ".part"
+        with open(temporal, "wb") as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta_final)
+        return ruta_final
+
+    @staticmethod
+    def _es_pdf(respuesta):
+        return "pdf" in respuesta.headers.get("Content-Type", "").lower() or respuesta.content[:4] == b"%PDF"
+
+    def procesar_fila(self, url, row, fila_actual, carpeta_destino=None, pasos=None):
+        """
+        Procesa una fila CC enviando el formulario por HTTP.
+
+        Args:
+            url (str): URL del sitio de certificados
+            row (Series): Fila de datos a procesar
+            fila_actual (int): Posición de la fila dentro de los datos (base 0)
+            carpeta_destino (str): Carpeta donde se escribe el PDF
+            pasos (dict): Si se indica, se llena con los segundos de cada paso
+
+        Returns:
+            dict: Resultado con STATUS y OBSERVACIONES, o None si hay que reintentar la fila (CAPTCHA)
+
+        Raises:
+            RespuestaInesperada, requests.RequestException: si la fila debe pasar a Selenium
+        """
+        documento = str(row["NUMERO DE DOCUMENTO"])
+
+        with medir_paso(pasos, "carga_pagina"):
+            inicio = leer_pagina(self._obtener(url).text)
+
+        if TEXTO_ERROR_PAGINA in inicio.titulos:
+            print(f"Se presentó un problema en la fila {fila_actual + 1}. Continuando con la siguiente fila...")
+            return {
+                "STATUS": "ERROR DE PAGINA",
+                "OBSERVACIONES": "Se presentó un problema en la página"
+            }
+
+        enlace = next((href for texto, href in inicio.enlaces if texto == TEXTO_ENLACE_CERTIFICADO), None)
+        if not enlace:
+            raise RespuestaInesperada("No se encontró el enlace de expedición del certificado")
+
+        print(f"Procesando fila {fila_actual + 1}...")
+
+        with medir_paso(pasos, "formulario"):
+            url_formulario = urljoin(url, enlace)
+            formulario = leer_pagina(self._obtener(url_formulario).text)
+            url_envio = urljoin(url_formulario, formulario.accion or url_formulario)
+
+            datos = self._datos_envio(formulario)
+            datos[self._campo(formulario, CAMPO_DOCUMENTO)] = documento
+            self._seleccionar(formulario, datos, CAMPO_DIA, str(row["DIA"]).zfill(2))
+            self._seleccionar(formulario, datos, CAMPO_MES, str(row["MES"]).capitalize())
+            self._seleccionar(formulario, datos, CAMPO_AÑO, str(row["AÑO"]))
+            datos[self._campo(formulario, CAMPO_CODIGO)] = "LANAP"
+
+        with medir_paso(pasos, "envio"):
+            consulta = leer_pagina(self._enviar(url_envio, datos).text)
+            mensaje_error = consulta.mensaje or ""
+
+        if "El número de documento no se encuentra en la base de datos" in mensaje_error:
+            print(f"Error en la fila {fila_actual + 1}: {mensaje_error}")
+            return {
+                "STATUS": "FALLIDO",
+                "OBSERVACIONES": "Número de documento o fecha de expedición erróneas"
+            }
+
+        if "CAPTCHA" in mensaje_error:
+            print(f"Error de CAPTCHA en la fila {fila_actual + 1}. Reintentando...")
+            return None
+
+        with medir_paso(pasos, "envio"):
+            url_envio = urljoin(url_envio, consulta.accion or url_envio)
+            respuesta = self._enviar(url_envio, self._datos_envio(consulta))
+
+        if self._es_pdf(respuesta):
+            # El sitio respondió el certificado directamente al segundo envío
+            descarga = respuesta
+            resultado = {
+                "STATUS": "EXITO",
+                "OBSERVACIONES": "Certificado generado correctamente"
+            }
+        else:
+            final = leer_pagina(respuesta.text)
+            if final.mensaje and final.mensaje_visible:
+                print(f"Novedad detectada en la fila {fila_actual + 1}: {final.mensaje}")
+                resultado = {
+                    "STATUS": "NOVEDAD",
+                    "OBSERVACIONES": f"NOVEDAD: {final.mensaje}"
+                }
+            else:
+                resultado = {
+                    "STATUS": "EXITO",
+                    "OBSERVACIONES": "Certificado generado correctamente"
+                }
+
+            # La descarga la dispara un marco oculto, una redirección o un enlace al PDF
+            origen = next(iter(final.marcos), None) or next(
+                (href for _, href in final.enlaces if ".pdf" in href.lower() or "descarg" in href.lower()), None)
+            if not origen:
+                raise RespuestaInesperada("No se encontró la descarga del certificado")
+            descarga = None
+
+        with medir_paso(pasos, "descarga"):
+            if descarga is None:
+                descarga = self._obtener(urljoin(url_envio, origen))
+            ruta_final = self._guardar_pdf(descarga, documento, carpeta_destino)
+
+        print(f"Certificado generado correctamente para la fila {fila_actual + 1}.")
+        resultado["ARCHIVO_PDF"] = ruta_final
+        return resultado
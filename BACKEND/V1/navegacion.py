@@ -1,230 +1,549 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 from selenium.common.exceptions import UnexpectedAlertPresentException, TimeoutException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
 import time
 import traceback
 import pandas as pd
+from requests import RequestException
 from dotenv import load_dotenv
 import os
-import glob
+import tempfile
+import threading
 from V1.leerEXCEL import leer_excel
 from V1.generarResultados import generar_resultados
 import shutil
-from V1.unir_certificados import unir_pdfs
+from V1.unir_certificados import UnionIncremental
+from V1.descargas import VigilanteDescargas
+from V1.esperas import politica_espera
+from V1.reintentos import ColaFilas
+from V1.sesiones import pool_sesiones
+from V1.bitacora import Bitacora, STATUS_TERMINADOS, huella_datos
+from V1.cache_certificados import CacheCertificados
+from V1.metricas import metricas, medir_paso
+from V1.motor_http import ClienteCertificados, ERRORES_HTTP, MOTOR_HTTP, MOTOR_SELENIUM, motor_navegacion
+from V1.planificador import TIPOS_DOCUMENTO_ESPECIALES, resultado_enlace_especial, planificar
 
 # Cargar las variables de entorno
 load_dotenv()
 
-def obtener_enlace_tipo_documento(tipo_documento):
+def procesar_fila(driver, url, row, fila_actual, vigilante, carpeta_destino=None, politica=None, pasos=None):
     """
-    Retorna el enlace correspondiente según el tipo de documento
+    Procesa una fila de la plantilla en el sitio de certificados.
+
+    Args:
+        driver (WebDriver): Driver de Chrome asignado al trabajador
+        url (str): URL del sitio de certificados
+        row (Series): Fila de datos a procesar
+        fila_actual (int): Posición de la fila dentro de los datos (base 0)
+        vigilante (VigilanteDescargas): Vigilante de la carpeta de descargas propia del driver
+        carpeta_destino (str): Carpeta a la que se mueve el PDF descargado
+        politica (PoliticaEspera): Política de esperas (por defecto la compartida del módulo)
+        pasos (dict): Si se indica, se llena con los segundos de cada paso del navegador
+
+    Returns:
+        dict: Resultado con STATUS y OBSERVACIONES, o None si hay que reintentar la fila
     """
-    enlaces = {
-        "TI": "https://consultasrc.registraduria.gov.co/ProyectoSCCRC/faces/index.xhtml",
-        "CE": "https://apps.migracioncolombia.gov.co/consultaCedulas/pages/home.jsf - victor.echeverry@cancilleria.gov.co",
-        "PPT": "https://apps.migracioncolombia.gov.co:8443/consultappt/"
+    tipo_documento = str(row["TIPO DE DOCUMENTO"]).strip().upper()
+
+    # Verificar si es un tipo de documento especial (CE, PPT, TI)
+    if tipo_documento in TIPOS_DOCUMENTO_ESPECIALES:
+        print(f"Fila {fila_actual + 1}: Tipo de documento {tipo_documento} - Agregando enlace especial")
+        return resultado_enlace_especial(tipo_documento)
+
+    politica = politica or politica_espera
+    error_pagina = (By.XPATH, "//h3[text()='Al parecer se presentó algun problema!']")
+    enlace_certificado = (By.XPATH, "//a[text()='Expedición Certificado']")
+    with medir_paso(pasos, "carga_pagina"):
+        driver.get(url)
+
+        # Esperar a que cargue la página: o aparece el mensaje de error o el enlace del certificado
+        politica.esperar(driver, "carga_pagina", EC.any_of(
+            EC.presence_of_element_located(error_pagina),
+            EC.element_to_be_clickable(enlace_certificado),
+        ))
+
+    if driver.find_elements(*error_pagina):
+        print(f"Se presentó un problema en la fila {fila_actual + 1}. Continuando con la siguiente fila...")
+        return {
+            "STATUS": "ERROR DE PAGINA",
+            "OBSERVACIONES": "Se presentó un problema en la página"
+        }
+
+    print(f"Procesando fila {fila_actual + 1}...")
+
+    with medir_paso(pasos, "formulario"):
+        driver.find_element(*enlace_certificado).click()
+
+        politica.esperar(driver, "formulario",
+            EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_TextBox1"))
+        ).send_keys(str(row["NUMERO DE DOCUMENTO"]))
+
+        Select(politica.esperar(driver, "campo",
+            EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_DropDownList1"))
+        )).select_by_visible_text(str(row["DIA"]).zfill(2))
+
+        mes_normalizado = str(row["MES"]).capitalize()
+        Select(politica.esperar(driver, "campo",
+            EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_DropDownList2"))
+        )).select_by_visible_text(mes_normalizado)
+
+        Select(politica.esperar(driver, "campo",
+            EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_DropDownList3"))
+        )).select_by_visible_text(str(row["AÑO"]))
+
+        politica.esperar(driver, "campo",
+            EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_TextBox2"))
+        ).send_keys("LANAP")
+
+        boton = politica.esperar(driver, "campo",
+            EC.element_to_be_clickable((By.ID, "ContentPlaceHolder1_Button1"))
+        )
+
+    with medir_paso(pasos, "envio"):
+        boton.click()
+
+        # Esperar a que termine el postback (el botón anterior deja de existir) en lugar de una pausa fija
+        try:
+            politica.esperar(driver, "envio", EC.staleness_of(boton))
+        except TimeoutException:
+            pass
+
+        etiquetas = driver.find_elements(By.ID, "ContentPlaceHolder1_Label11")
+        mensaje_error = etiquetas[0].text if etiquetas else ""
+
+    if "El número de documento no se encuentra en la base de datos" in mensaje_error:
+        print(f"Error en la fila {fila_actual + 1}: {mensaje_error}")
+        return {
+            "STATUS": "FALLIDO",
+            "OBSERVACIONES": "Número de documento o fecha de expedición erróneas"
+        }
+
+    if "CAPTCHA" in mensaje_error:
+        print(f"Error de CAPTCHA en la fila {fila_actual + 1}. Reintentando...")
+        return None
+
+    with medir_paso(pasos, "envio"):
+        politica.esperar(driver, "campo",
+            EC.element_to_be_clickable((By.ID, "ContentPlaceHolder1_Button1"))
+        ).click()
+
+        # Verificar si hay una novedad
+        try:
+            novedad_element = politica.esperar(driver, "novedad",
+                EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_Label11")),
+                obligatorio=False,
+            )
+            if novedad_element.is_displayed():
+                texto_novedad = novedad_element.text.strip()
+                print(f"Novedad detectada en la fila {fila_actual + 1}: {texto_novedad}")
+                resultado = {
+                    "STATUS": "NOVEDAD",
+                    "OBSERVACIONES": f"NOVEDAD: {texto_novedad}"
+                }
+            else:
+                resultado = {
+                    "STATUS": "EXITO",
+                    "OBSERVACIONES": "Certificado generado correctamente"
+                }
+        except TimeoutException:
+            resultado = {
+                "STATUS": "EXITO",
+                "OBSERVACIONES": "Certificado generado correctamente"
+            }
+
+    # Esperar a que el PDF termine de descargarse en la carpeta del driver
+    pdf_filename_pattern = f"Certificado estado cedula {str(row['NUMERO DE DOCUMENTO'])}*.pdf"
+    with medir_paso(pasos, "descarga"):
+        inicio_descarga = time.monotonic()
+        pdf_path = vigilante.esperar(pdf_filename_pattern)
+        if pdf_path:
+            politica.registrar("descarga", time.monotonic() - inicio_descarga)
+
+    if pdf_path:
+        print(f"Certificado generado correctamente para la fila {fila_actual + 1}.")
+        # Mover el archivo PDF a la carpeta de destino (o a Descargas si no hay destino)
+        destino = carpeta_destino or os.path.join(os.path.expanduser("~"), "Downloads")
+        with medir_paso(pasos, "mover_archivo"):
+            for file in pdf_path:
+                ruta_final = os.path.join(destino, os.path.basename(file))
+                shutil.move(file, ruta_final)
+                print(f"Archivo PDF movido a: {destino}")
+        resultado["ARCHIVO_PDF"] = ruta_final
+        return resultado
+
+    print(f"Certificado no encontrado para la fila {fila_actual + 1}.")
+    return {
+        "STATUS": "ERROR DE PAGINA",
+        "OBSERVACIONES": "Certificado no se generó por Error de la pagina"
     }
-    return enlaces.get(tipo_documento, "")
 
-def automatizar_navegacion(datos, carpeta_destino=None):
+def _trabajador(numero, url, datos, cola_filas, resultados, carpeta_destino,
+                progreso=None, cancelar=None, bitacora=None, cache=None, motor=MOTOR_SELENIUM,
+                duplicados=None):
+    """
+    Hilo trabajador del pool: toma filas de la cola y las procesa con su propio driver.
+    Cada trabajador descarga en una carpeta temporal propia para que los PDFs no se mezclen.
+    El resultado de cada fila se copia a sus filas duplicadas (mismo documento y fecha).
+
+    Con el motor HTTP las filas CC se envían sin navegador y el driver de Chrome solo se
+    abre si alguna fila necesita pasar a Selenium. Tras MOTOR_HTTP_FALLOS filas seguidas
+    que pasan a Selenium, el trabajador deja de intentar por HTTP.
+
+    Un error del navegador no se reintenta en el acto: la fila vuelve a la cola con
+    ColaFilas.reintentar (espera exponencial, límite de intentos y revisión de cancelar)
+    y el driver se devuelve al pool, que cierra la sesión si ya no responde.
+    """
+    # En la carpeta temporal del sistema: ~/Downloads puede no existir (servidor, cuenta de servicio)
+    carpeta_descargas = tempfile.mkdtemp(prefix=f"certigranja_trabajador_{numero}_")
     driver = None
-    resultados = []
+    vigilante = VigilanteDescargas(carpeta_descargas)
+    cliente = ClienteCertificados() if motor == MOTOR_HTTP else None
+    fallos_http = 0
+    fallos_http_maximos = int(os.getenv("MOTOR_HTTP_FALLOS", "3"))
     try:
-        # Obtener URL desde .env
-        url = os.getenv("CERTIFICADO_URL")
-        if not url:
-            raise ValueError("Faltan variables de entorno en el archivo .env")
-        
-        # Configurar el driver usando webdriver-manager
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service)
-                  
-        driver.get(url)
-        fila_actual = 0
-        
-        while fila_actual < len(datos):
+        if cliente is None:
+            # Se reutiliza una sesión de Chrome ya abierta si hay alguna disponible
+            driver = pool_sesiones.obtener(carpeta_descargas)
+
+        while True:
+            fila_actual = cola_filas.tomar(cancelar)
+            if fila_actual is None:
+                break
+
+            reprogramada = False
             try:
                 row = datos.iloc[fila_actual]
-                tipo_documento = str(row["TIPO DE DOCUMENTO"]).strip().upper()
-                
-                # Verificar si es un tipo de documento especial (CE, PPT, TI)
-                if tipo_documento in ["CE", "PPT", "TI"]:
-                    enlace = obtener_enlace_tipo_documento(tipo_documento)
-                    print(f"Fila {fila_actual + 1}: Tipo de documento {tipo_documento} - Agregando enlace especial")
-                    resultados.append({
-                        "STATUS": "ENLACE_ESPECIAL",
-                        "OBSERVACIONES": f"Este tipo de certificado ({tipo_documento}) se genera en: {enlace}"
-                    })
-                    fila_actual += 1
-                    continue
-                
-                driver.get(url)
-                
-                # Verificar si el mensaje de error está presente
-                try:
-                    WebDriverWait(driver, 1).until(
-                        EC.presence_of_element_located((By.XPATH, "//h3[text()='Al parecer se presentó algun problema!']"))
-                    )
-                    print(f"Se presentó un problema en la fila {fila_actual + 1}. Continuando con la siguiente fila...")
-                    # AGREGAR RESULTADO ANTES DE INCREMENTAR - ESTA ES LA CORRECCIÓN
-                    resultados.append({
-                        "STATUS": "ERROR DE PAGINA",
-                        "OBSERVACIONES": "Se presentó un problema en la página"
-                    })
-                    fila_actual += 1
-                    continue  # Saltar a la siguiente fila
-                except TimeoutException:
-                    pass  # No se encontró el mensaje, continuar con el proceso normal
-
-                print(f"Procesando fila {fila_actual + 1}...")
-                
-                WebDriverWait(driver, 1).until(
-                    EC.element_to_be_clickable((By.XPATH, "//a[text()='Expedición Certificado']"))
-                ).click()
-                
-                WebDriverWait(driver, 1).until(
-                    EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_TextBox1"))
-                ).send_keys(str(row["NUMERO DE DOCUMENTO"]))
-                                                                                                                                                                                                                                                                                                                                                      
-                Select(WebDriverWait(driver, 1).until(
-                    EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_DropDownList1"))
-                )).select_by_visible_text(str(row["DIA"]).zfill(2))
-                
-                mes_normalizado = str(row["MES"]).capitalize()
-                Select(WebDriverWait(driver, 1).until(
-                    EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_DropDownList2"))
-                )).select_by_visible_text(mes_normalizado)
-                
-                Select(WebDriverWait(driver, 1).until(
-                    EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_DropDownList3"))
-                )).select_by_visible_text(str(row["AÑO"]))
-                
-                WebDriverWait(driver, 1).until(
-                    EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_TextBox2"))
-                ).send_keys("LANAP")
-                
-                WebDriverWait(driver, 1).until(
-                    EC.element_to_be_clickable((By.ID, "ContentPlaceHolder1_Button1"))
-                ).click()
-                
-                # Esperar un momento para que el PDF se genere
-                time.sleep(1)  # Ajusta el tiempo según sea necesario
-                
-                try:
-                    mensaje_error = WebDriverWait(driver, 1).until(  # Reducido a 3 segundos
-                        EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_Label11"))
-                    ).text
-                    
-                    if "El número de documento no se encuentra en la base de datos" in mensaje_error:
-                        print(f"Error en la fila {fila_actual + 1}: {mensaje_error}")
-                        resultados.append({
-                            "STATUS": "FALLIDO",
-                            "OBSERVACIONES": "Número de documento o fecha de expedición erróneas"
-                        })
-                        fila_actual += 1
-                        continue
-                    
-                    if "CAPTCHA" in mensaje_error:
-                        print(f"Error de CAPTCHA en la fila {fila_actual + 1}. Reintentando...")
-                        # Aquí puedes implementar un contador de reintentos si lo deseas
-                        continue  # MANTENER TU LÓGICA ORIGINAL DE REINTENTO
-                        
-                except TimeoutException:
-                    pass
-                                
-                WebDriverWait(driver, 1).until(  # Reducido a 5 segundos
-                    EC.element_to_be_clickable((By.ID, "ContentPlaceHolder1_Button1"))
-                ).click()
-                
-                # Verificar si hay una novedad
-                try:
-                    novedad_element = WebDriverWait(driver, 1).until(
-                        EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_Label11"))
-                    )
-                    if novedad_element.is_displayed():
-                        texto_novedad = novedad_element.text.strip()
-                        print(f"Novedad detectada en la fila {fila_actual + 1}: {texto_novedad}")
-                        resultados.append({
-                            "STATUS": "NOVEDAD",
-                            "OBSERVACIONES": f"NOVEDAD: {texto_novedad}"
-                        })
-                    else:
-                        resultados.append({
-                            "STATUS": "EXITO",
-                            "OBSERVACIONES": "Certificado generado correctamente"
-                        })
-                except TimeoutException:
-                    resultados.append({
-                        "STATUS": "EXITO",
-                        "OBSERVACIONES": "Certificado generado correctamente"
-                    })
-                
-                # Verificar si el archivo PDF se ha descargado
-                downloads_folder = os.path.join(os.path.expanduser("~"), "Downloads")
-                pdf_filename_pattern = f"Certificado estado cedula {str(row['NUMERO DE DOCUMENTO'])}*.pdf"
-                
-                # Esperar hasta que el archivo PDF se descargue
-                pdf_path = None
-                for _ in range(10):  # Intentar hasta 10 veces
-                    pdf_path = glob.glob(os.path.join(downloads_folder, pdf_filename_pattern))
-                    if pdf_path:
+                usar_http = cliente is not None
+                error_navegador = None
+                while True:
+                    pasos = {}
+                    inicio_fila = time.monotonic()
+                    if usar_http:
+                        # Solo los errores del envío HTTP pasan la fila a Selenium
+                        try:
+                            resultado = cliente.procesar_fila(url, row, fila_actual, carpeta_destino, pasos=pasos)
+                            fallos_http = 0
+                            break
+                        except ERRORES_HTTP as e:
+                            print(f"Trabajador {numero}: la fila {fila_actual + 1} pasa a Selenium ({e})")
+                            usar_http = False
+                            fallos_http += 1
+                            if fallos_http >= fallos_http_maximos and cliente is not None:
+                                print(f"Trabajador {numero}: {fallos_http} filas seguidas sin respuesta HTTP esperada. "
+                                      f"Se continúa solo con Selenium")
+                                cliente.cerrar()
+                                cliente = None
+                            continue
+
+                    try:
+                        if driver is None:
+                            driver = pool_sesiones.obtener(carpeta_descargas)
+                        resultado = procesar_fila(driver, url, row, fila_actual,
+                                                  vigilante, carpeta_destino, pasos=pasos)
                         break
-                    time.sleep(1)  # Esperar 1 segundo entre intentos
-                
-                if pdf_path:
-                    print(f"Certificado generado correctamente para la fila {fila_actual + 1}.")
-                    # Mover el archivo PDF a la carpeta de destino
-                    if carpeta_destino:
-                        for file in pdf_path:
-                            shutil.move(file, carpeta_destino)
-                            print(f"Archivo PDF movido a: {carpeta_destino}")
+                    except (WebDriverException, RequestException) as e:
+                        # Sesión caída, elemento que no aparece, opción inexistente en una lista o
+                        # falla al descargar chromedriver al abrir el driver: la fila vuelve a la
+                        # cola con la misma espera y el mismo límite que un CAPTCHA
+                        print(f"Trabajador {numero}: error del navegador en la fila {fila_actual + 1}: "
+                              f"{type(e).__name__}")
+                        error_navegador = e
+                        resultado = None
+                        if driver is not None:
+                            # liberar() cierra la sesión si ya no responde; el siguiente intento pide otra
+                            pool_sesiones.liberar(driver)
+                            driver = None
+                        break
+
+                if resultado:
+                    estado_intento = resultado["STATUS"]
                 else:
-                    print(f"Certificado no encontrado para la fila {fila_actual + 1}.")
-                    # CORREGIR: Modificar el último resultado si ya existe, no agregar uno nuevo
-                    if resultados and len(resultados) > 0:
-                        resultados[-1] = {
-                            "STATUS": "ERROR DE PAGINA",
-                            "OBSERVACIONES": "Certificado no se generó por Error de la pagina"
-                        }
-                    else:
-                        resultados.append({
-                            "STATUS": "ERROR DE PAGINA",
-                            "OBSERVACIONES": "Certificado no se generó por Error de la pagina"
-                        })
-                
-                fila_actual += 1
-                
-            except WebDriverException as e:
-                print("Automatización completada con éxito.")
+                    estado_intento = "ERROR_NAVEGADOR" if error_navegador else "CAPTCHA"
+                metricas.registrar_fila(fila_actual, estado_intento, time.monotonic() - inicio_fila, pasos,
+                                        trabajador=numero, motor=MOTOR_HTTP if usar_http else MOTOR_SELENIUM)
+
+                # CAPTCHA o error del navegador: la fila vuelve al final de la cola para no bloquear el lote
+                if resultado is None:
+                    reprogramada = cola_filas.reintentar(fila_actual)
+                    if reprogramada:
+                        continue
+                    intentos = cola_filas.reintentos.get(fila_actual, 0) + 1
+                    motivo = "Error del navegador" if error_navegador else "CAPTCHA no superado"
+                    print(f"Fila {fila_actual + 1}: {motivo} tras {intentos} intentos.")
+                    resultado = {
+                        "STATUS": "ERROR DE PAGINA",
+                        "OBSERVACIONES": f"{motivo} tras {intentos} intentos"
+                    }
+                    reprogramada = True  # reintentar() ya marcó la fila como terminada
+
+                resultado["REINTENTOS"] = cola_filas.reintentos.get(fila_actual, 0)
+                if cache:
+                    resultado["CACHE"] = "MISS"
+                    cache.guardar(datos.iloc[fila_actual], resultado)
+                for fila in [fila_actual] + (duplicados or {}).get(fila_actual, []):
+                    resultado_fila = resultado if fila == fila_actual else dict(resultado)
+                    resultados[fila] = resultado_fila
+                    if bitacora:
+                        bitacora.registrar(fila, resultado_fila)
+                    if progreso:
+                        progreso(fila, resultado_fila)
+            finally:
+                if not reprogramada:
+                    cola_filas.completar(fila_actual)
+
+    except Exception as e:
+        print(f"Error general en el trabajador {numero}: {e}")
+        traceback.print_exc()
+    finally:
+        if driver:
+            pool_sesiones.liberar(driver)
+        if cliente:
+            cliente.cerrar()
+        vigilante.cerrar()
+        shutil.rmtree(carpeta_descargas, ignore_errors=True)
+
+def _reanudar_desde_bitacora(bitacora, resultados, carpeta_destino, progreso=None):
+    """
+    Carga en resultados las filas que ya terminaron en una ejecución anterior del mismo
+    archivo. Si el PDF quedó en otra carpeta, se copia a la carpeta de destino actual.
+    """
+    previos = bitacora.cargar()
+    reanudadas = 0
+    for fila, registro in previos.items():
+        if fila >= len(resultados) or registro.get("STATUS") not in STATUS_TERMINADOS:
+            continue
+
+        resultado = {clave: valor for clave, valor in registro.items() if clave not in ("FILA", "FECHA")}
+        archivo_pdf = resultado.get("ARCHIVO_PDF")
+        if archivo_pdf and carpeta_destino and os.path.exists(archivo_pdf):
+            ruta_final = os.path.join(carpeta_destino, os.path.basename(archivo_pdf))
+            if os.path.abspath(ruta_final) != os.path.abspath(archivo_pdf):
+                shutil.copy2(archivo_pdf, ruta_final)
+            resultado["ARCHIVO_PDF"] = ruta_final
+
+        resultados[fila] = resultado
+        reanudadas += 1
+        if progreso:
+            progreso(fila, resultado)
+
+    if reanudadas:
+        print(f"Reanudando lote: {reanudadas} filas ya procesadas se toman de la bitácora {bitacora.ruta}")
+
+def _resolver_especiales(plan, resultados, progreso=None):
+    """
+    Carga en resultados las filas de tipo especial (CE, PPT, TI) ya resueltas por el plan.
+    """
+    resueltas = 0
+    for fila, resultado in plan.especiales.items():
+        if resultados[fila] is not None:
+            continue
+        resultado["REINTENTOS"] = 0
+        resultados[fila] = resultado
+        resueltas += 1
+        if progreso:
+            progreso(fila, resultado)
+
+    if resueltas:
+        print(f"Planificación: {resueltas} filas con enlace especial resueltas sin consultar el sitio")
+
+def _resolver_desde_cache(cache, datos, resultados, carpeta_destino, progreso=None, bitacora=None):
+    """
+    Resuelve con la caché las filas pendientes ya consultadas en lotes anteriores,
+    copiando el PDF guardado a la carpeta de destino en lugar de consultar el sitio.
+    """
+    destino = carpeta_destino or os.path.join(os.path.expanduser("~"), "Downloads")
+    aciertos = 0
+    for fila, resultado in enumerate(resultados):
+        if resultado is not None:
+            continue
+
+        registro = cache.buscar(datos.iloc[fila])
+        if not registro:
             continue
-            
+
+        resultado = {
+            "STATUS": registro["status"],
+            "OBSERVACIONES": registro["observaciones"],
+            "REINTENTOS": 0,
+            "CACHE": "HIT",
+        }
+        ruta_pdf = cache.copiar_pdf(registro, destino)
+        if ruta_pdf:
+            resultado["ARCHIVO_PDF"] = ruta_pdf
+
+        resultados[fila] = resultado
+        aciertos += 1
+        if bitacora:
+            bitacora.registrar(fila, resultado)
+        if progreso:
+            progreso(fila, resultado)
+
+    if aciertos:
+        print(f"Caché de certificados: {aciertos} filas resueltas sin consultar el sitio")
+
+def _progreso_con_union(union, progreso=None):
+    """
+    Envuelve la función de progreso para que cada PDF descargado pase a la unión incremental.
+    """
+    def progreso_con_union(fila, resultado):
+        if resultado.get("ARCHIVO_PDF"):
+            union.agregar(resultado["ARCHIVO_PDF"])
+        if progreso:
+            progreso(fila, resultado)
+    return progreso_con_union
+
+def automatizar_navegacion(datos, carpeta_destino=None, num_trabajadores=None,
+                           progreso=None, cancelar=None, generar_salidas=True, reanudar=None,
+                           usar_cache=None, unir_certificados=None, motor=None):
+    """
+    Procesa todas las filas de la plantilla en el sitio de certificados.
+
+    Antes de abrir cualquier navegador se planifica el lote: las filas de tipo especial
+    se resuelven de una vez y las filas repetidas (mismo documento y fecha) se consultan
+    una sola vez. Las filas restantes se reparten entre un pool de trabajadores, cada uno
+    con su propio driver de Chrome y su propia carpeta de descargas. Los resultados se
+    devuelven en el mismo orden de las filas de entrada.
+
+    Args:
+        datos (DataFrame): Datos leídos de la plantilla
+        carpeta_destino (str): Carpeta a la que se mueven los PDFs descargados
+        num_trabajadores (int): Número de drivers en paralelo (por defecto NUM_TRABAJADORES del .env)
+        progreso (callable): Función progreso(fila, resultado) llamada al terminar cada fila
+        cancelar (threading.Event): Evento que detiene a los trabajadores al terminar la fila actual
+        generar_salidas (bool): Si es True genera el Excel de resultados al terminar
+        reanudar (bool): Si es True omite las filas ya terminadas según la bitácora de una
+            ejecución interrumpida del mismo archivo en la misma carpeta de destino (por
+            defecto REANUDAR del .env)
+        usar_cache (bool): Si es True toma de la caché local los certificados ya consultados en
+            lotes anteriores (por defecto CACHE_CERTIFICADOS del .env)
+        unir_certificados (bool): Si es True une cada PDF en CERTIFICADOS_UNIDOS apenas se
+            descarga (por defecto igual a generar_salidas; requiere carpeta_destino)
+        motor (str): "http" envía el formulario sin navegador y usa Selenium solo cuando la
+            respuesta no es la esperada; "selenium" usa siempre Chrome (por defecto
+            MOTOR_NAVEGACION del .env)
+
+    Returns:
+        list: Un diccionario con STATUS y OBSERVACIONES por cada fila
+    """
+    resultados = [None] * len(datos)
+    cola_filas = None
+    bitacora = None
+    lote_completo = False
+    cache = None
+    union = None
+    try:
+        if num_trabajadores is None:
+            num_trabajadores = int(os.getenv("NUM_TRABAJADORES", "1"))
+        if reanudar is None:
+            reanudar = os.getenv("REANUDAR", "1") == "1"
+        if motor is None:
+            motor = motor_navegacion()
+
+        if unir_certificados is None:
+            unir_certificados = generar_salidas
+        if unir_certificados and carpeta_destino:
+            # Cada certificado se une en cuanto su fila termina, no al final del lote
+            union = UnionIncremental(carpeta_destino)
+            progreso = _progreso_con_union(union, progreso)
+
+        # Cada fila se anota en la bitácora apenas termina; al reanudar se omiten las ya hechas.
+        # La bitácora es propia del archivo y de la carpeta de destino
+        bitacora = Bitacora(huella_datos(datos, os.path.abspath(carpeta_destino) if carpeta_destino else None))
+        if reanudar:
+            _reanudar_desde_bitacora(bitacora, resultados, carpeta_destino, progreso)
+
+        with metricas.etapa("planificacion", filas=len(datos)):
+            plan = planificar(datos)
+        _resolver_especiales(plan, resultados, progreso)
+
+        if usar_cache is None:
+            usar_cache = os.getenv("CACHE_CERTIFICADOS", "1") == "1"
+        if usar_cache:
+            cache = CacheCertificados()
+            _resolver_desde_cache(cache, datos, resultados, carpeta_destino, progreso, bitacora)
+
+        pendientes, duplicados = plan.agrupar([fila for fila, resultado in enumerate(resultados) if resultado is None])
+        if duplicados:
+            print(f"Planificación: {sum(len(filas) for filas in duplicados.values())} filas repetidas "
+                  f"toman el resultado de otra fila con el mismo documento y fecha")
+
+        # Obtener URL desde .env (solo hace falta si hay filas que consultar en el sitio)
+        url = os.getenv("CERTIFICADO_URL")
+        if pendientes and not url:
+            raise ValueError("Faltan variables de entorno en el archivo .env")
+
+        num_trabajadores = max(1, min(num_trabajadores, len(pendientes)))
+        cola_filas = ColaFilas(pendientes)
+
+        if pendientes:
+            print(f"Iniciando {num_trabajadores} trabajador(es) ({motor}) para {len(pendientes)} filas...")
+        else:
+            num_trabajadores = 0
+
+        hilos = [
+            threading.Thread(
+                target=_trabajador,
+                args=(numero, url, datos, cola_filas, resultados, carpeta_destino,
+                      progreso, cancelar, bitacora, cache, motor, duplicados),
+                daemon=True,
+            )
+            for numero in range(1, num_trabajadores + 1)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        # Sin cancelación y con todas las filas resueltas no queda nada que reanudar
+        lote_completo = not (cancelar and cancelar.is_set()) and all(
+            resultado is not None for resultado in resultados)
+
+        print("Tiempos por paso (segundos):")
+        for paso, estadisticas in sorted(politica_espera.resumen().items()):
+            print(f"   - {paso}: {estadisticas}")
+
     except Exception as main_exception:
         print(f"Error general durante la ejecución: {main_exception}")
         traceback.print_exc()
     finally:
-        if driver:
-            print("Esperando unos segundos para asegurar descargas completas...")
-            time.sleep(1)
-            driver.quit()
-        
-        # Obtener nombre del archivo desde .env
-        nombre_archivo = os.getenv("OUTPUT_FILE", "resultados_certificados.xlsx")
-        resultados_df = pd.DataFrame(resultados)
-        generar_resultados(datos, resultados_df, nombre_archivo)
-        
-        # Unir los PDFs en la carpeta de destino (usando la función importada)
-        if carpeta_destino:
-            unir_pdfs(carpeta_destino)
-    
+        if bitacora:
+            if lote_completo:
+                bitacora.descartar()
+            else:
+                bitacora.cerrar()
+        if cache:
+            cache.cerrar()
+        if union:
+            with metricas.etapa("union_pdfs"):
+                union.cerrar()
+
+        # Las filas que ningún trabajador alcanzó a procesar se reportan como error
+        for fila_actual, resultado in enumerate(resultados):
+            if resultado is None:
+                if cancelar and cancelar.is_set():
+                    resultados[fila_actual] = {
+                        "STATUS": "CANCELADO",
+                        "OBSERVACIONES": "El proceso fue cancelado antes de procesar la fila",
+                        "REINTENTOS": cola_filas.reintentos.get(fila_actual, 0) if cola_filas else 0
+                    }
+                else:
+                    resultados[fila_actual] = {
+                        "STATUS": "ERROR DE PAGINA",
+                        "OBSERVACIONES": "La fila no se pudo procesar",
+                        "REINTENTOS": cola_filas.reintentos.get(fila_actual, 0) if cola_filas else 0
+                    }
+
+        if generar_salidas:
+            # Obtener nombre del archivo desde .env
+            nombre_archivo = os.getenv("OUTPUT_FILE", "resultados_certificados.xlsx")
+            resultados_df = pd.DataFrame(resultados)
+            generar_resultados(datos, resultados_df, nombre_archivo)
+
     return resultados
 
 if __name__ == "__main__":
     archivo_usuario = input("Ingrese el nombre del archivo Excel con los datos: ")
     datos = leer_excel(archivo_usuario)
     if datos is not None:
-        automatizar_navegacion(datos)
\ No newline at end of file
+        automatizar_navegacion(datos)
@@ -0,0 +1,227 @@
+import glob
+import hashlib
+import os
+import struct
+import threading
+import time
+import zlib
+from V1.unir_certificados import PREFIJO_SALIDA, NOMBRE_INDICE
+
+# Tamaño de los bloques que se leen de cada archivo al armar el ZIP
+TAMANO_BLOQUE = 256 * 1024
+
+# Límite del formato ZIP sin extensiones ZIP64
+TAMANO_MAXIMO_ZIP = 0xFFFFFFFF
+
+_FIRMA_LOCAL = 0x04034B50
+_FIRMA_DESCRIPTOR = 0x08074B50
+_FIRMA_CENTRAL = 0x02014B50
+_FIRMA_FIN = 0x06054B50
+
+# Bit 3: CRC y tamaños van en el descriptor después de los datos. Bit 11: nombres en UTF-8
+_BANDERAS = 0x0008 | 0x0800
+
+# CRC ya calculados por (ruta, tamaño, fecha de modificación), para no releer un archivo
+# en cada descarga parcial del mismo paquete
+_crcs = {}
+_crcs_lock = threading.Lock()
+
+class PaqueteDemasiadoGrande(Exception):
+    """
+    El paquete supera los 4 GB que admite un ZIP sin ZIP64.
+    """
+
+def archivos_paquete(carpeta_destino, ruta_resultados=None, individuales=False):
+    """
+    Lista los archivos del paquete de un trabajo: el Excel de resultados, los PDFs unidos
+    con su índice y, opcionalmente, cada certificado individual.
+
+    Returns:
+        list: Tuplas (ruta en disco, nombre dentro del ZIP)
+    """
+    archivos = []
+    if ruta_resultados and os.path.exists(ruta_resultados):
+        archivos.append((ruta_resultados, os.path.basename(ruta_resultados)))
+
+    unidos = sorted(glob.glob(os.path.join(carpeta_destino, f"{PREFIJO_SALIDA}*.pdf")))
+    archivos.extend((ruta, os.path.basename(ruta)) for ruta in unidos)
+    indice = os.path.join(carpeta_destino, NOMBRE_INDICE)
+    if os.path.exists(indice):
+        archivos.append((indice, NOMBRE_INDICE))
+
+    if individuales:
+        excluidos = set(unidos)
+        for ruta in sorted(glob.glob(os.path.join(carpeta_destino, "*.pdf"))):
+            if ruta not in excluidos:
+                archivos.append((ruta, f"certificados/{os.path.basename(ruta)}"))
+    return archivos
+
+def _fecha_dos(marca):
+    fecha = time.localtime(marca)
+    año = max(fecha.tm_year, 1980)
+    return (
+        (fecha.tm_hour << 11) | (fecha.tm_min << 5) | (fecha.tm_sec // 2),
+        ((año - 1980) << 9) | (fecha.tm_mon << 5) | fecha.tm_mday,
+    )
+
+class _Entrada:
+    def __init__(self, ruta, nombre):
+        estado = os.stat(ruta)
+        self.ruta = ruta
+        self.nombre = nombre.encode("utf-8")
+        self.tamano = estado.st_size
+        self.modificado = estado.st_mtime
+        self.hora, self.fecha = _fecha_dos(estado.st_mtime)
+        self.desplazamiento = 0
+        self.crc = None
+
+    def cabecera_local(self):
+        # Con el bit 3 el CRC y los tamaños de la cabecera local van en cero
+        return struct.pack("<IHHHHHIIIHH", _FIRMA_LOCAL, 20, _BANDERAS, 0, self.hora, self.fecha,
+                           0, 0, 0, len(self.nombre), 0) + self.nombre
+
+    def descriptor(self):
+        return struct.pack("<IIII", _FIRMA_DESCRIPTOR, self.crc, self.tamano, self.tamano)
+
+    def cabecera_central(self):
+        return struct.pack("<IHHHHHHIIIHHHHHII", _FIRMA_CENTRAL, 20, 20, _BANDERAS, 0, self.hora, self.fecha,
+                           self.crc, self.tamano, self.tamano, len(self.nombre), 0, 0, 0, 0, 0,
+                           self.desplazamiento) + self.nombre
+
+class PaqueteZip:
+    """
+    ZIP de un trabajo armado al vuelo mientras se descarga, sin archivo temporal y sin
+    cargar archivos completos en memoria.
+
+    Los archivos se guardan sin compresión (los PDF y el xlsx ya vienen comprimidos), así
+    que el tamaño total y la posición de cada byte se conocen antes de empezar. Eso
+    permite responder con Content-Length y atender peticiones Range para reanudar una
+    descarga. El CRC de cada archivo se calcula mientras se envía y va en un descriptor
+    después de los datos. Solo si un rango empieza a mitad de un archivo se relee ese
+    archivo para obtener su CRC.
+    """
+
+    def __init__(self, archivos):
+        self.entradas = [_Entrada(ruta, nombre) for ruta, nombre in archivos]
+
+        # Segmentos del ZIP en orden: (longitud, función que produce sus bytes desde/hasta)
+        self._segmentos = []
+        posicion = 0
+        for entrada in self.entradas:
+            entrada.desplazamiento = posicion
+            cabecera = entrada.cabecera_local()
+            self._agregar(len(cabecera), lambda desde, hasta, datos=cabecera: [datos[desde:hasta]])
+            self._agregar(entrada.tamano, lambda desde, hasta, entrada=entrada: self._datos(entrada, desde, hasta))
+            self._agregar(16, lambda desde, hasta, entrada=entrada: [self._con_crc(entrada).descriptor()[desde:hasta]])
+            posicion += len(cabecera) + entrada.tamano + 16
+
+        inicio_central = posicion
+        tamano_central = sum(46 + len(entrada.nombre) for entrada in self.entradas)
+        self._agregar(tamano_central, self._directorio_central)
+        fin = struct.pack("<IHHHHIIH", _FIRMA_FIN, 0, 0, len(self.entradas), len(self.entradas),
+                          tamano_central, inicio_central, 0)
+        self._agregar(len(fin), lambda desde, hasta: [fin[desde:hasta]])
+
+        self.tamano = sum(longitud for longitud, _ in self._segmentos)
+        if self.tamano > TAMANO_MAXIMO_ZIP:
+            raise PaqueteDemasiadoGrande(f"El paquete ocupa {self.tamano} bytes; el máximo es 4 GB")
+
+        huella = hashlib.sha256()
+        for entrada in self.entradas:
+            huella.update(b"%s\0%d\0%f\0" % (entrada.nombre, entrada.tamano, entrada.modificado))
+        self.etag = huella.hexdigest()[:32]
+
+    def _agregar(self, longitud, productor):
+        self._segmentos.append((longitud, productor))
+
+    def _datos(self, entrada, desde, hasta):
+        """
+        Lee los bytes [desde, hasta) de un archivo por bloques. Si se lee el archivo
+        completo, el CRC se calcula de paso.
+        """
+        completo = desde == 0 and hasta == entrada.tamano and entrada.crc is None
+        crc = 0
+        with open(entrada.ruta, "rb") as archivo:
+            archivo.seek(desde)
+            restante = hasta - desde
+            while restante > 0:
+                bloque = archivo.read(min(TAMANO_BLOQUE, restante))
+                if not bloque:
+                    raise IOError(f"{entrada.ruta} cambió de tamaño durante la descarga")
+                if completo:
+                    crc = zlib.crc32(bloque, crc)
+                restante -= len(bloque)
+                yield bloque
+        if completo:
+            entrada.crc = crc
+            with _crcs_lock:
+                _crcs[(entrada.ruta, entrada.tamano, entrada.modificado)] = crc
+
+    def _con_crc(self, entrada):
+        """
+        Retorna la entrada con su CRC, leyendo el archivo solo si no se calculó al enviarlo.
+        """
+        if entrada.crc is None:
+            clave = (entrada.ruta, entrada.tamano, entrada.modificado)
+            with _crcs_lock:
+                entrada.crc = _crcs.get(clave)
+            if entrada.crc is None:
+                crc = 0
+                with open(entrada.ruta, "rb") as archivo:
+                    for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b""):
+                        crc = zlib.crc32(bloque, crc)
+                entrada.crc = crc
+                with _crcs_lock:
+                    _crcs[clave] = crc
+        return entrada
+
+    def _directorio_central(self, desde, hasta):
+        contenido = b"".join(self._con_crc(entrada).cabecera_central() for entrada in self.entradas)
+        return [contenido[desde:hasta]]
+
+    def leer(self, inicio=0, fin=None):
+        """
+        Genera los bytes del ZIP entre inicio y fin (ambos incluidos).
+
+        Args:
+            inicio (int): Primer byte
+            fin (int): Último byte (por defecto el final del ZIP)
+        """
+        fin = self.tamano - 1 if fin is None else fin
+        posicion = 0
+        for longitud, productor in self._segmentos:
+            if posicion > fin:
+                break
+            if posicion + longitud > inicio and longitud:
+                desde = max(inicio - posicion, 0)
+                hasta = min(fin + 1 - posicion, longitud)
+                for bloque in productor(desde, hasta):
+                    if bloque:
+                        yield bloque
+            posicion += longitud
+
+def rango_solicitado(encabezado, tamano):
+    """
+    Interpreta un encabezado Range de un solo rango ("bytes=inicio-fin", "bytes=inicio-"
+    o "bytes=-sufijo").
+
+    Returns:
+        tuple: (inicio, fin), None si no hay rango válido que aplicar, o False si el rango
+            no se puede satisfacer
+    """
+    if not encabezado or not encabezado.startswith("bytes=") or "," in encabezado:
+        return None
+    inicio, _, fin = encabezado[len("bytes="):].strip().partition("-")
+    try:
+        if not inicio:
+            sufijo = int(fin)
+            if sufijo <= 0:
+                return False
+            return max(tamano - sufijo, 0), tamano - 1
+        inicio = int(inicio)
+        fin = int(fin) if fin else tamano - 1
+    except ValueError:
+        return None
+    if inicio >= tamano or fin < inicio:
+        return False
+    return inicio, min(fin, tamano - 1)
@@ -0,0 +1,100 @@
+import pandas as pd
+
+# Tipos de documento que no se consultan en el sitio sino que se remiten a otro enlace
+TIPOS_DOCUMENTO_ESPECIALES = ("CE", "PPT", "TI")
+
+ENLACES_TIPO_DOCUMENTO = {
+    "TI": "https://consultasrc.registraduria.gov.co/ProyectoSCCRC/faces/index.xhtml",
+    "CE": "https://apps.migracioncolombia.gov.co/consultaCedulas/pages/home.jsf - victor.echeverry@cancilleria.gov.co",
+    "PPT": "https://apps.migracioncolombia.gov.co:8443/consultappt/"
+}
+
+def obtener_enlace_tipo_documento(tipo_documento):
+    """
+    Retorna el enlace correspondiente según el tipo de documento
+    """
+    return ENLACES_TIPO_DOCUMENTO.get(tipo_documento, "")
+
+def resultado_enlace_especial(tipo_documento):
+    """
+    Resultado de una fila de tipo especial (CE, PPT, TI), que no se consulta en el sitio.
+    """
+    return {
+        "STATUS": "ENLACE_ESPECIAL",
+        "OBSERVACIONES": f"Este tipo de certificado ({tipo_documento}) se genera en: "
+                         f"{obtener_enlace_tipo_documento(tipo_documento)}"
+    }
+
+class PlanFilas:
+    """
+    Plan de consultas de un lote, calculado sobre todas las filas de una vez antes de
+    abrir cualquier navegador.
+
+    Las filas de tipo especial (CE, PPT, TI) se resuelven en el plan mismo. Las filas CC
+    se agrupan por (tipo, documento, día, mes, año): solo una fila de cada grupo se
+    consulta en el sitio y su resultado se copia a las demás.
+
+    Atributos:
+        especiales (dict): Fila -> resultado para las filas de tipo especial
+        grupos (ndarray): Número de grupo de cada fila (-1 para las filas especiales)
+    """
+
+    def __init__(self, especiales, grupos):
+        self.especiales = especiales
+        self.grupos = grupos
+
+    def agrupar(self, filas):
+        """
+        Reparte las filas pendientes entre las que se consultan y sus duplicados.
+
+        Args:
+            filas (list): Filas pendientes (no especiales), en orden
+
+        Returns:
+            tuple: (filas a consultar, dict fila consultada -> lista de filas duplicadas)
+        """
+        if not filas:
+            return [], {}
+        pendientes = pd.Series(filas)
+        grupos = pd.Series(self.grupos[pendientes.to_numpy()])
+        primera = ~grupos.duplicated()
+        unicas = pendientes[primera].tolist()
+
+        duplicados = {}
+        if not primera.all():
+            representante = dict(zip(grupos[primera], unicas))
+            for fila, grupo in zip(pendientes[~primera], grupos[~primera]):
+                duplicados.setdefault(representante[grupo], []).append(fila)
+        return unicas, duplicados
+
+def planificar(datos):
+    """
+    Calcula el plan de consultas de un lote en una sola pasada vectorizada.
+
+    Args:
+        datos (DataFrame): Datos leídos de la plantilla
+
+    Returns:
+        PlanFilas: Resultados de las filas especiales y grupo de cada fila CC
+    """
+    tipos = datos["TIPO DE DOCUMENTO"].astype(str).str.strip().str.upper()
+    es_especial = tipos.isin(TIPOS_DOCUMENTO_ESPECIALES).to_numpy()
+
+    especiales = {}
+    if es_especial.any():
+        # Un resultado por tipo, compartido (copiado) por todas las filas de ese tipo
+        por_tipo = {tipo: resultado_enlace_especial(tipo) for tipo in tipos[es_especial].unique()}
+        especiales = {int(fila): dict(por_tipo[tipo])
+                      for fila, tipo in zip(es_especial.nonzero()[0], tipos[es_especial])}
+
+    # Misma normalización que se aplica al llenar el formulario
+    claves = pd.DataFrame({
+        "tipo": tipos,
+        "documento": datos["NUMERO DE DOCUMENTO"].astype(str).str.strip(),
+        "dia": datos["DIA"].astype(str).str.strip().str.zfill(2),
+        "mes": datos["MES"].astype(str).str.strip().str.capitalize(),
+        "año": datos["AÑO"].astype(str).str.strip(),
+    })
+    grupos = claves.groupby(list(claves.columns), sort=False, dropna=False).ngroup().to_numpy(copy=True)
+    grupos[es_especial] = -1
+    return PlanFilas(especiales, grupos)
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+# Cargar las variables de entorno
+load_dotenv()
+
+class ColaFilas:
+    """
+    Cola de filas compartida por los trabajadores, con reintentos limitados.
+
+    Una fila que debe reintentarse (por ejemplo por CAPTCHA) vuelve al final de la cola
+    y no se entrega de nuevo hasta que pasa su tiempo de espera, que crece de forma
+    exponencial con cada intento. Mientras tanto los trabajadores siguen con las demás filas.
+
+    Configuración (.env):
+        CAPTCHA_MAX_INTENTOS: intentos máximos por fila (incluye el primero)
+        CAPTCHA_ESPERA_BASE: segundos de espera antes del primer reintento
+        CAPTCHA_ESPERA_MAXIMA: tope de la espera entre reintentos
+    """
+
+    def __init__(self, filas, max_intentos=None, espera_base=None, espera_maxima=None):
+        self.max_intentos = max_intentos or int(os.getenv("CAPTCHA_MAX_INTENTOS", "3"))
+        self.espera_base = espera_base if espera_base is not None else float(os.getenv("CAPTCHA_ESPERA_BASE", "2"))
+        self.espera_maxima = espera_maxima if espera_maxima is not None else float(os.getenv("CAPTCHA_ESPERA_MAXIMA", "60"))
+        self.reintentos = {}
+        self._pendientes = deque((fila, 0.0) for fila in filas)
+        self._en_proceso = 0
+        self._condicion = threading.Condition()
+
+    def __len__(self):
+        with self._condicion:
+            return len(self._pendientes)
+
+    def tomar(self, cancelar=None):
+        """
+        Entrega la siguiente fila lista para procesar. Bloquea mientras solo queden filas
+        esperando su reintento.
+
+        Args:
+            cancelar (threading.Event): Si se activa, deja de entregar filas
+
+        Returns:
+            int: Posición de la fila, o None si ya no quedan filas
+        """
+        with self._condicion:
+            while True:
+                if cancelar and cancelar.is_set():
+                    return None
+
+                ahora = time.monotonic()
+                proxima = None
+                for indice, (fila, listo_en) in enumerate(self._pendientes):
+                    if listo_en <= ahora:
+                        del self._pendientes[indice]
+                        self._en_proceso += 1
+                        return fila
+                    proxima = listo_en if proxima is None else min(proxima, listo_en)
+
+                # Sin filas pendientes ni en proceso no habrá más reintentos
+                if not self._pendientes and self._en_proceso == 0:
+                    return None
+
+                espera = 0.5 if proxima is None else min(0.5, proxima - ahora)
+                self._condicion.wait(espera)
+
+    def completar(self, fila):
+        """
+        Marca como terminada una fila entregada por tomar().
+        """
+        with self._condicion:
+            self._en_proceso -= 1
+            self._condicion.notify_all()
+
+    def reintentar(self, fila):
+        """
+        Devuelve una fila al final de la cola con espera exponencial.
+
+        Returns:
+            bool: True si se programó el reintento, False si la fila agotó sus intentos
+                (en ese caso la fila queda marcada como terminada)
+        """
+        with self._condicion:
+            self._en_proceso -= 1
+            self._condicion.notify_all()
+
+            if self.reintentos.get(fila, 0) + 1 >= self.max_intentos:
+                return False
+
+            self.reintentos[fila] = self.reintentos.get(fila, 0) + 1
+            espera = min(self.espera_maxima, self.espera_base * 2 ** (self.reintentos[fila] - 1))
+            self._pendientes.append((fila, time.monotonic() + espera))
+            return True
@@ -0,0 +1,224 @@
+import atexit
+import os
+import tempfile
+import threading
+import time
+from dotenv import load_dotenv
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+# Cargar las variables de entorno
+load_dotenv()
+
+# Archivo donde se recuerda la ruta del chromedriver entre ejecuciones del servidor
+ARCHIVO_CACHE_CHROMEDRIVER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                          ".chromedriver_path")
+
+_ruta_chromedriver = None
+_ruta_lock = threading.Lock()
+
+def ruta_chromedriver():
+    """
+    Retorna la ruta del chromedriver, resolviéndola una sola vez.
+
+    Orden de búsqueda: variable CHROMEDRIVER_PATH del .env, ruta guardada en memoria,
+    ruta guardada en disco por una ejecución anterior y, solo si ninguna existe,
+    ChromeDriverManager().install() (que puede consultar internet).
+    """
+    global _ruta_chromedriver
+    with _ruta_lock:
+        ruta_env = os.getenv("CHROMEDRIVER_PATH")
+        if ruta_env and os.path.exists(ruta_env):
+            return ruta_env
+
+        if _ruta_chromedriver and os.path.exists(_ruta_chromedriver):
+            return _ruta_chromedriver
+
+        try:
+            with open(ARCHIVO_CACHE_CHROMEDRIVER, encoding="utf-8") as archivo:
+                ruta_guardada = archivo.read().strip()
+            if ruta_guardada and os.path.exists(ruta_guardada):
+                _ruta_chromedriver = ruta_guardada
+                return _ruta_chromedriver
+        except OSError:
+            pass
+
+        _ruta_chromedriver = ChromeDriverManager().install()
+        try:
+            with open(ARCHIVO_CACHE_CHROMEDRIVER, "w", encoding="utf-8") as archivo:
+                archivo.write(_ruta_chromedriver)
+        except OSError as e:
+            print(f"No se pudo guardar la ruta del chromedriver: {e}")
+        return _ruta_chromedriver
+
+def opciones_chrome(carpeta_descargas, headless=None):
+    """
+    Construye las opciones de Chrome con un perfil de descargas sin diálogos.
+
+    Args:
+        carpeta_descargas (str): Carpeta de descargas inicial
+        headless (bool): Ejecutar sin ventana (por defecto CHROME_HEADLESS del .env)
+
+    Returns:
+        ChromeOptions: Opciones listas para crear el driver
+    """
+    if headless is None:
+        headless = os.getenv("CHROME_HEADLESS", "0") == "1"
+
+    opciones = webdriver.ChromeOptions()
+    if headless:
+        opciones.add_argument("--headless=new")
+        opciones.add_argument("--window-size=1366,900")
+    opciones.add_argument("--no-first-run")
+    opciones.add_argument("--no-default-browser-check")
+    opciones.add_argument("--disable-extensions")
+    opciones.add_argument("--disable-dev-shm-usage")
+    opciones.add_argument("--disable-background-networking")
+    opciones.add_experimental_option("prefs", {
+        "download.default_directory": carpeta_descargas,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "plugins.always_open_pdf_externally": True,
+        "safebrowsing.enabled": False,
+        "profile.default_content_setting_values.automatic_downloads": 1,
+    })
+    return opciones
+
+def asignar_carpeta_descargas(driver, carpeta_descargas):
+    """
+    Cambia la carpeta de descargas de un driver ya abierto (también en modo headless).
+    """
+    driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+        "behavior": "allow",
+        "downloadPath": os.path.abspath(carpeta_descargas),
+    })
+
+def crear_driver(carpeta_descargas, headless=None):
+    """
+    Crea un driver de Chrome que descarga los PDFs en una carpeta propia.
+
+    Args:
+        carpeta_descargas (str): Carpeta donde Chrome guardará las descargas de este driver
+        headless (bool): Ejecutar sin ventana (por defecto CHROME_HEADLESS del .env)
+
+    Returns:
+        WebDriver: Instancia de Chrome lista para usar
+    """
+    service = Service(ruta_chromedriver())
+    driver = webdriver.Chrome(service=service, options=opciones_chrome(carpeta_descargas, headless))
+    asignar_carpeta_descargas(driver, carpeta_descargas)
+    return driver
+
+def _esta_viva(driver):
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+class PoolSesiones:
+    """
+    Conserva abiertos los drivers de Chrome entre trabajos para que el siguiente lote
+    empiece a procesar sin esperar el arranque del navegador.
+
+    Configuración (.env):
+        SESIONES_MAXIMAS_INACTIVAS: drivers inactivos que se conservan (por defecto NUM_TRABAJADORES)
+        SESIONES_INACTIVAS_TTL: segundos que un driver inactivo se conserva antes de cerrarse
+    """
+
+    def __init__(self, maximas_inactivas=None, ttl=None):
+        self.maximas_inactivas = maximas_inactivas or int(
+            os.getenv("SESIONES_MAXIMAS_INACTIVAS", os.getenv("NUM_TRABAJADORES", "1")))
+        self.ttl = ttl or float(os.getenv("SESIONES_INACTIVAS_TTL", "600"))
+        self._inactivas = []
+        self._lock = threading.Lock()
+
+    def _purgar_vencidas(self):
+        ahora = time.monotonic()
+        with self._lock:
+            vencidas = [driver for driver, liberada in self._inactivas if ahora - liberada > self.ttl]
+            self._inactivas = [(driver, liberada) for driver, liberada in self._inactivas
+                               if ahora - liberada <= self.ttl]
+        for driver in vencidas:
+            _cerrar_driver(driver)
+
+    def obtener(self, carpeta_descargas):
+        """
+        Entrega un driver que descarga en la carpeta indicada, reutilizando uno inactivo si hay.
+
+        Returns:
+            WebDriver: Driver listo para usar
+        """
+        self._purgar_vencidas()
+        while True:
+            with self._lock:
+                if not self._inactivas:
+                    break
+                driver, _ = self._inactivas.pop()
+
+            if _esta_viva(driver):
+                try:
+                    asignar_carpeta_descargas(driver, carpeta_descargas)
+                    return driver
+                except Exception as e:
+                    print(f"No se pudo reutilizar una sesión de Chrome: {e}")
+            _cerrar_driver(driver)
+
+        return crear_driver(carpeta_descargas)
+
+    def liberar(self, driver):
+        """
+        Devuelve un driver al pool. Si el pool está lleno o el driver no responde, se cierra.
+        """
+        if not _esta_viva(driver):
+            _cerrar_driver(driver)
+            return
+
+        with self._lock:
+            if len(self._inactivas) < self.maximas_inactivas:
+                self._inactivas.append((driver, time.monotonic()))
+                # Cerrar el driver si nadie lo vuelve a pedir antes de que venza
+                temporizador = threading.Timer(self.ttl + 1, self._purgar_vencidas)
+                temporizador.daemon = True
+                temporizador.start()
+                return
+        _cerrar_driver(driver)
+
+    def precalentar(self, cantidad=None, url=None):
+        """
+        Abre drivers por adelantado (y opcionalmente carga la URL) para que el primer
+        lote no pague el arranque de Chrome.
+        """
+        cantidad = cantidad or self.maximas_inactivas
+        with self._lock:
+            faltantes = cantidad - len(self._inactivas)
+
+        for _ in range(max(0, faltantes)):
+            try:
+                driver = crear_driver(tempfile.gettempdir())
+                if url:
+                    driver.get(url)
+                self.liberar(driver)
+            except Exception as e:
+                print(f"No se pudo precalentar una sesión de Chrome: {e}")
+                break
+
+    def cerrar_todas(self):
+        """
+        Cierra todos los drivers inactivos.
+        """
+        with self._lock:
+            inactivas, self._inactivas = self._inactivas, []
+        for driver, _ in inactivas:
+            _cerrar_driver(driver)
+
+def _cerrar_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+# Pool compartido por todos los trabajos del proceso
+pool_sesiones = PoolSesiones()
+atexit.register(pool_sesiones.cerrar_todas)
@@ -0,0 +1,309 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from V1.leerEXCEL import leer_excel
+from V1.cargas import cargar_datos_validados
+from V1.navegacion import automatizar_navegacion
+from V1.generarResultados import generar_resultados
+from V1.metricas import metricas
+from V1.eventos import CanalEventos, formato_sse
+from V1.espacios import marcar_trabajo
+
+# Cargar las variables de entorno
+load_dotenv()
+
+# Estados posibles de un trabajo
+EN_COLA = "EN COLA"
+EN_PROCESO = "EN PROCESO"
+FINALIZADO = "FINALIZADO"
+CANCELADO = "CANCELADO"
+ERROR = "ERROR"
+
+ESTADOS_FINALES = (FINALIZADO, CANCELADO, ERROR)
+
+class TrabajoEnEjecucion(Exception):
+    """
+    Ya hay un trabajo en cola o en proceso con el mismo id (el mismo espacio de trabajo).
+    """
+
+class Trabajo:
+    """
+    Representa una ejecución del proceso completo (leer Excel, navegar, generar resultados
+    y unir PDFs) y lleva el progreso fila por fila.
+    """
+
+    def __init__(self, ruta_excel, carpeta_destino=None, nombre_archivo_salida="resultados_certificados.xlsx",
+                 trabajo_id=None, huella_archivo=None):
+        self.id = trabajo_id or uuid.uuid4().hex
+        self.ruta_excel = ruta_excel
+        self.huella_archivo = huella_archivo
+        self.carpeta_destino = carpeta_destino
+        self.nombre_archivo_salida = nombre_archivo_salida
+        self.estado = EN_COLA
+        self.mensaje = "Trabajo en cola"
+        self.total_filas = 0
+        self.filas_procesadas = 0
+        self.conteo_status = {}
+        self.creado = time.time()
+        self.iniciado = None
+        self.finalizado = None
+        self.cancelar = threading.Event()
+        # Eventos en vivo (fila por fila y cambios de estado) para los clientes SSE
+        self.eventos = CanalEventos()
+        self._lock = threading.Lock()
+
+    def actualizar(self, estado=None, mensaje=None):
+        """
+        Cambia el estado y/o el mensaje del trabajo y lo avisa a los clientes conectados.
+        """
+        if estado is not None:
+            self.estado = estado
+        if mensaje is not None:
+            self.mensaje = mensaje
+        self.eventos.publicar("estado", {"estado": self.estado, "mensaje": self.mensaje})
+
+    def terminar(self):
+        """
+        Marca el fin del trabajo y envía el resumen final a los clientes conectados.
+        """
+        self.finalizado = time.time()
+        marcar_trabajo(self.id, False)
+        self.eventos.publicar("fin", self.resumen())
+
+    def registrar_fila(self, fila, resultado):
+        """
+        Registra el resultado de una fila. Se llama desde los hilos trabajadores.
+
+        Args:
+            fila (int): Posición de la fila (base 0)
+            resultado (dict): Resultado con STATUS y OBSERVACIONES
+        """
+        with self._lock:
+            self.filas_procesadas += 1
+            procesadas = self.filas_procesadas
+            status = resultado.get("STATUS", "")
+            self.conteo_status[status] = self.conteo_status.get(status, 0) + 1
+
+        self.eventos.publicar("fila", {
+            "fila": fila,
+            "STATUS": status,
+            "OBSERVACIONES": resultado.get("OBSERVACIONES", ""),
+            "REINTENTOS": resultado.get("REINTENTOS", 0),
+            "filas_procesadas": procesadas,
+        })
+
+    def resumen(self):
+        """
+        Retorna el estado del trabajo con su progreso, velocidad (filas/min) y tiempo estimado.
+
+        Returns:
+            dict: Resumen serializable a JSON
+        """
+        with self._lock:
+            procesadas = self.filas_procesadas
+            conteo_status = dict(self.conteo_status)
+
+        fin = self.finalizado or time.time()
+        transcurrido = (fin - self.iniciado) if self.iniciado else 0
+        filas_por_minuto = (procesadas / transcurrido * 60) if transcurrido > 0 else 0
+
+        eta_segundos = None
+        if self.estado == EN_PROCESO and filas_por_minuto > 0:
+            eta_segundos = round((self.total_filas - procesadas) / filas_por_minuto * 60)
+
+        porcentaje = round(procesadas * 100 / self.total_filas) if self.total_filas else 0
+
+        return {
+            "trabajo_id": self.id,
+            "estado": self.estado,
+            "mensaje": self.mensaje,
+            "total_filas": self.total_filas,
+            "filas_procesadas": procesadas,
+            "porcentaje": porcentaje,
+            "filas_por_minuto": round(filas_por_minuto, 2),
+            "eta_segundos": eta_segundos,
+            "tiempo_transcurrido": round(transcurrido),
+            "conteo_status": conteo_status,
+        }
+
+# Ejecutor en segundo plano: cuántos trabajos corren al mismo tiempo
+_ejecutor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("MAX_TRABAJOS_SIMULTANEOS", "1")),
+    thread_name_prefix="trabajo",
+)
+_trabajos = {}
+_trabajos_lock = threading.Lock()
+
+def _purgar_terminados():
+    """
+    Retira del registro los trabajos que terminaron hace más de ESPACIOS_VIGENCIA_HORAS,
+    la misma vigencia de los espacios de trabajo: pasado ese tiempo su espacio ya no
+    existe y no tiene sentido conservar sus resultados y su historial de eventos.
+    Se llama con _trabajos_lock tomado.
+    """
+    limite = time.time() - float(os.getenv("ESPACIOS_VIGENCIA_HORAS", "24")) * 3600
+    vencidos = [trabajo_id for trabajo_id, trabajo in _trabajos.items()
+                if trabajo.finalizado is not None and trabajo.finalizado < limite]
+    for trabajo_id in vencidos:
+        del _trabajos[trabajo_id]
+
+def encolar_trabajo(ruta_excel, carpeta_destino=None, nombre_archivo_salida="resultados_certificados.xlsx",
+                    trabajo_id=None, huella_archivo=None):
+    """
+    Crea un trabajo y lo deja en cola del ejecutor en segundo plano. De paso retira del
+    registro los trabajos terminados que ya vencieron.
+
+    Args:
+        trabajo_id (str): Id del espacio de trabajo; si se omite se genera uno nuevo
+        huella_archivo (str): Huella del archivo subido; si sus datos ya se validaron al
+            subirlo, el trabajo los carga en lugar de volver a leer el Excel
+
+    Returns:
+        Trabajo: El trabajo creado
+
+    Raises:
+        TrabajoEnEjecucion: Si el espacio ya tiene un trabajo que no ha terminado
+    """
+    trabajo = Trabajo(ruta_excel, carpeta_destino, nombre_archivo_salida, trabajo_id, huella_archivo)
+    # La revisión y el registro van bajo el mismo lock: dos peticiones simultáneas para el
+    # mismo espacio no pueden iniciar dos trabajos sobre la misma carpeta
+    with _trabajos_lock:
+        _purgar_terminados()
+        anterior = _trabajos.get(trabajo.id)
+        if anterior and anterior.finalizado is None:
+            raise TrabajoEnEjecucion(f"El trabajo {trabajo.id} ya está en ejecución")
+        _trabajos[trabajo.id] = trabajo
+    marcar_trabajo(trabajo.id, True)
+    _ejecutor.submit(_ejecutar_trabajo, trabajo)
+    return trabajo
+
+def obtener_trabajo(trabajo_id):
+    """
+    Retorna el trabajo con el id indicado, o None si no existe.
+    """
+    with _trabajos_lock:
+        return _trabajos.get(trabajo_id)
+
+def listar_trabajos():
+    """
+    Retorna la lista de trabajos registrados, del más reciente al más antiguo.
+    """
+    with _trabajos_lock:
+        trabajos = list(_trabajos.values())
+    return sorted(trabajos, key=lambda t: t.creado, reverse=True)
+
+def cancelar_trabajo(trabajo_id):
+    """
+    Solicita la cancelación de un trabajo. Si aún está en cola no llegará a ejecutarse;
+    si está en proceso, los trabajadores se detienen al terminar la fila actual.
+
+    Returns:
+        Trabajo: El trabajo, o None si no existe
+    """
+    trabajo = obtener_trabajo(trabajo_id)
+    if trabajo and trabajo.estado not in ESTADOS_FINALES:
+        trabajo.cancelar.set()
+        trabajo.actualizar(mensaje="Cancelación solicitada")
+    return trabajo
+
+def eventos_trabajo(trabajo, ultimo_id=None, intervalo=None):
+    """
+    Genera el flujo Server-Sent Events de un trabajo: un evento "fila" por cada resultado,
+    "estado" en cada cambio, un "resumen" periódico con la velocidad y las filas en cola,
+    y "fin" con el resumen final, tras el cual el flujo se cierra.
+
+    Si el cliente lee lento y se descartan eventos de su buffer, recibe un evento
+    "perdidos" con la cantidad, para que vuelva a consultar /trabajos/<id>.
+
+    Args:
+        trabajo (Trabajo): Trabajo a seguir
+        ultimo_id (int): Último id de evento recibido por el cliente (Last-Event-ID)
+        intervalo (float): Segundos entre resúmenes (por defecto EVENTOS_INTERVALO_RESUMEN del .env)
+    """
+    if intervalo is None:
+        intervalo = float(os.getenv("EVENTOS_INTERVALO_RESUMEN", "2"))
+
+    suscripcion = trabajo.eventos.suscribir(ultimo_id)
+    try:
+        yield "retry: 3000\n\n"
+        ultimo_resumen = time.monotonic()
+        procesadas_antes = trabajo.filas_procesadas
+        yield formato_sse("resumen", {**trabajo.resumen(), "filas_en_cola": trabajo.total_filas - procesadas_antes})
+
+        while True:
+            eventos, perdidos = suscripcion.esperar(timeout=intervalo)
+            if perdidos:
+                yield formato_sse("perdidos", {"cantidad": perdidos})
+            for evento_id, tipo, datos in eventos:
+                yield formato_sse(tipo, datos, evento_id)
+                if tipo == "fin":
+                    return
+
+            if trabajo.finalizado and trabajo.estado in ESTADOS_FINALES:
+                yield formato_sse("fin", trabajo.resumen())
+                return
+
+            ahora = time.monotonic()
+            if ahora - ultimo_resumen >= intervalo:
+                resumen = trabajo.resumen()
+                procesadas = resumen["filas_procesadas"]
+                resumen["filas_en_cola"] = resumen["total_filas"] - procesadas
+                resumen["filas_por_minuto_reciente"] = round((procesadas - procesadas_antes) / (ahora - ultimo_resumen) * 60, 2)
+                yield formato_sse("resumen", resumen)
+                ultimo_resumen, procesadas_antes = ahora, procesadas
+    finally:
+        suscripcion.cerrar()
+
+def _ejecutar_trabajo(trabajo):
+    """
+    Ejecuta el proceso completo de un trabajo: leer_excel -> automatizar_navegacion (que une
+    los certificados a medida que se descargan) -> generar_resultados.
+    """
+    if trabajo.cancelar.is_set():
+        trabajo.actualizar(CANCELADO, "Trabajo cancelado antes de iniciar")
+        trabajo.terminar()
+        return
+
+    trabajo.iniciado = time.time()
+    trabajo.actualizar(EN_PROCESO, "Leyendo archivo Excel")
+    try:
+        with metricas.etapa("leer_excel", trabajo=trabajo.id):
+            datos = cargar_datos_validados(trabajo.huella_archivo) if trabajo.huella_archivo else None
+            if datos is None:
+                datos = leer_excel(trabajo.ruta_excel)
+        if datos is None:
+            trabajo.actualizar(ERROR, "No hay datos para procesar o el archivo no cumple con la plantilla")
+            return
+
+        trabajo.total_filas = len(datos)
+        trabajo.actualizar(mensaje="Procesando filas")
+        with metricas.etapa("navegacion", trabajo=trabajo.id, filas=len(datos)):
+            resultados = automatizar_navegacion(
+                datos,
+                carpeta_destino=trabajo.carpeta_destino,
+                progreso=trabajo.registrar_fila,
+                cancelar=trabajo.cancelar,
+                generar_salidas=False,
+                unir_certificados=True,
+            )
+
+        trabajo.actualizar(mensaje="Generando archivo de resultados")
+        with metricas.etapa("generar_resultados", trabajo=trabajo.id):
+            generar_resultados(datos, resultados, nombre_archivo_salida=trabajo.nombre_archivo_salida,
+                               carpeta_destino=trabajo.carpeta_destino)
+
+        if trabajo.cancelar.is_set():
+            trabajo.actualizar(CANCELADO, "Trabajo cancelado. Se guardaron los resultados parciales")
+        else:
+            trabajo.actualizar(FINALIZADO, "Automatización finalizada y resultados guardados")
+
+    except Exception as e:
+        print(f"Error en el trabajo {trabajo.id}: {e}")
+        traceback.print_exc()
+        trabajo.actualizar(ERROR, f"Error durante la ejecución: {str(e)}")
+    finally:
+        trabajo.terminar()
@@ -1,59 +1,417 @@
+import atexit
 import os
+import csv
 import glob
+import json
+import multiprocessing
+import queue
+import threading
 import PyPDF2
 import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dotenv import load_dotenv
 
-def unir_pdfs(carpeta_destino):
+# Cargar las variables de entorno
+load_dotenv()
+
+PREFIJO_SALIDA = "CERTIFICADOS_UNIDOS"
+NOMBRE_SALIDA = f"{PREFIJO_SALIDA}.pdf"
+NOMBRE_INDICE = f"{PREFIJO_SALIDA}_INDICE.csv"
+NOMBRE_MANIFIESTO = ".manifiesto_union.json"
+
+# Clasificación de cada página de un certificado
+PAGINA_INSUFICIENTE = "INSUFICIENTE"
+PAGINA_CON_CEDULA = "CON_CEDULA"
+PAGINA_SIN_CEDULA = "SIN_CEDULA"
+PAGINA_IRRELEVANTE = "IRRELEVANTE"
+
+ELEMENTOS_ESENCIALES = (
+    "REGISTRADURÍA NACIONAL",
+    "CERTIFICA",
+    "Cédula de Ciudadanía",
+    "Estado:"
+)
+
+INDICADORES_CERTIFICADO = (
+    "REGISTRADURÍA NACIONAL",
+    "CERTIFICA",
+    "documento de identificación",
+    "EDISON QUIÑONES SILVA",
+    "Coordinador Grupo Servicio",
+    "Para verificar la autenticidad"
+)
+
+# Un solo patrón recorre el texto una vez y encuentra a la vez los elementos esenciales,
+# los indicadores y el número de cédula
+_MARCADORES = [marcador for marcador in dict.fromkeys(ELEMENTOS_ESENCIALES + INDICADORES_CERTIFICADO)
+               if marcador != "Cédula de Ciudadanía"]
+_PATRON_PAGINA = re.compile(
+    r"(?P<cedula_ciudadania>Cédula de Ciudadanía)(?::\s+(?P<cedula>[\d\.]+))?|"
+    + "|".join(re.escape(marcador) for marcador in _MARCADORES)
+)
+
+def _buscar_marcadores(texto):
     """
-    Une todos los archivos PDF de una carpeta en un solo archivo,
-    eliminando duplicados basados en el número de cédula y páginas con contenido insuficiente.
-    
+    Retorna los marcadores de certificado presentes en el texto y la primera cédula encontrada.
+    """
+    encontrados = set()
+    cedula = None
+    for match in _PATRON_PAGINA.finditer(texto):
+        if match.group("cedula_ciudadania"):
+            encontrados.add("Cédula de Ciudadanía")
+            if cedula is None and match.group("cedula"):
+                cedula = match.group("cedula").replace('.', '')
+        else:
+            encontrados.add(match.group(0))
+    return encontrados, cedula
+
+def clasificar_pagina(texto):
+    """
+    Clasifica el texto de una página de certificado.
+
     Args:
-        carpeta_destino (str): Ruta de la carpeta que contiene los PDFs a unir
+        texto (str): Texto extraído de la página PDF
+
+    Returns:
+        tuple: (clasificación, cédula). La cédula solo se retorna para PAGINA_CON_CEDULA
     """
-    pdf_files = glob.glob(os.path.join(carpeta_destino, "*.pdf"))
-    pdf_writer = PyPDF2.PdfWriter()
-    cedulas_agregadas = set()
-    paginas_eliminadas = 0
-    
-    for pdf_file in pdf_files:
+    if not texto or len(texto.strip()) < 50:
+        return PAGINA_INSUFICIENTE, None
+
+    encontrados, cedula = _buscar_marcadores(texto)
+    if not _es_contenido_suficiente(texto, encontrados):
+        return PAGINA_INSUFICIENTE, None
+    if cedula:
+        return PAGINA_CON_CEDULA, cedula
+    if len(encontrados.intersection(INDICADORES_CERTIFICADO)) >= 2:
+        return PAGINA_SIN_CEDULA, None
+    return PAGINA_IRRELEVANTE, None
+
+# Pool de procesos compartido por todas las uniones del proceso (ver _pool_analisis)
+_pool = None
+_pool_lock = threading.Lock()
+
+def _pool_analisis(procesos):
+    """
+    Retorna el pool de procesos compartido, creándolo la primera vez que hace falta.
+    Todos los trabajos usan el mismo pool, de modo que varios lotes al tiempo no
+    multiplican los procesos.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: el proceso del servidor tiene hilos y drivers abiertos que no deben copiarse
+            _pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _descartar_pool():
+    """
+    Retira el pool compartido (por ejemplo porque uno de sus procesos murió); el
+    siguiente que lo necesite crea uno nuevo.
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+atexit.register(_descartar_pool)
+
+def _analizar_pdf(pdf_file):
+    """
+    Extrae el texto de cada página de un PDF y la clasifica. Se ejecuta en los procesos
+    del pool, por eso es una función de módulo y solo retorna datos simples.
+
+    Returns:
+        list: Una tupla (clasificación, cédula) por página
+    """
+    with open(pdf_file, "rb") as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        return [clasificar_pagina(page.extract_text()) for page in pdf_reader.pages]
+
+class UnionIncremental:
+    """
+    Une los certificados a medida que se descargan, en lugar de releer toda la carpeta
+    al final del lote. Cada PDF agregado se procesa en un hilo de fondo que mantiene al
+    día el índice de cédulas ya incluidas y va armando el PDF en memoria. Cada archivo
+    unido se escribe una sola vez: una parte al llenarse y la última al cerrar. El
+    manifiesto solo registra lo que ya quedó en disco, así que si el proceso se cae los
+    archivos no escritos se vuelven a unir en la siguiente ejecución.
+
+    La extracción de texto y la clasificación de las páginas, que es lo más costoso, la
+    hace el mismo hilo de fondo mientras la cola sea corta. Si se acumulan archivos
+    (por ejemplo al unir una carpeta completa) pasa al pool de procesos compartido; el
+    hilo de fondo arma el PDF siempre en el mismo orden en que se agregaron los archivos.
+
+    Por defecto la salida es un solo CERTIFICADOS_UNIDOS.pdf, que se arma completo en
+    memoria y se escribe al cerrar. Con PAGINAS_POR_PARTE se divide en partes de ese
+    número de páginas (CERTIFICADOS_UNIDOS_PARTE_001.pdf, ...) y la memoria queda
+    limitada a una parte.
+    En ambos casos se genera un índice CSV de cédula, archivo y página.
+    Un manifiesto en la carpeta guarda tamaño y fecha de modificación de cada PDF ya
+    unido, de modo que una nueva ejecución solo une los archivos nuevos o modificados.
+
+    Configuración (.env):
+        UNION_PROCESOS: procesos del pool compartido para extraer y clasificar páginas (0
+            usa todos los núcleos, 1 lo hace siempre en el hilo de la unión)
+        UNION_COLA_PARA_PROCESOS: archivos en espera a partir de los cuales se usa el pool
+        PAGINAS_POR_PARTE: páginas por archivo unido (0, el valor por defecto, genera un
+            solo CERTIFICADOS_UNIDOS.pdf)
+    """
+
+    def __init__(self, carpeta_destino, paginas_por_parte=None, procesos=None):
+        self.carpeta_destino = carpeta_destino
+        self.paginas_por_parte = paginas_por_parte if paginas_por_parte is not None else int(
+            os.getenv("PAGINAS_POR_PARTE", "0"))
+        self.procesos = procesos if procesos is not None else int(os.getenv("UNION_PROCESOS", "0"))
+        if self.procesos <= 0:
+            self.procesos = os.cpu_count() or 1
+        self.cola_para_procesos = int(os.getenv("UNION_COLA_PARA_PROCESOS", "4"))
+        self.ruta_manifiesto = os.path.join(carpeta_destino, NOMBRE_MANIFIESTO)
+        self.ruta_indice = os.path.join(carpeta_destino, NOMBRE_INDICE)
+        self._lock = threading.Lock()
+        self.paginas_eliminadas = 0
+        self.paginas_agregadas = 0
+        self.archivos_omitidos = 0
+        self._archivos_agregados = set()
+
+        self._manifiesto = self._cargar_manifiesto()
+        self.cedulas_agregadas = {entrada["CEDULA"] for entrada in self._manifiesto["indice"] if entrada["CEDULA"]}
+        ultima = self._manifiesto["indice"][-1] if self._manifiesto["indice"] else None
+        self._parte = ultima["PARTE"] if ultima else 1
+        self._paginas_parte = ultima["PAGINA"] if ultima else 0
+        # Lo que ya está en el writer pero aún no en disco (ni en el manifiesto)
+        self._indice_pendiente = []
+        self._archivos_pendientes = {}
+        self._pdf_writer = None
+
+        self._pendiente_escritura = False
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._procesar_cola, daemon=True)
+        self._hilo.start()
+
+    def _nombre_parte(self, parte):
+        if not self.paginas_por_parte:
+            return NOMBRE_SALIDA
+        return f"{PREFIJO_SALIDA}_PARTE_{parte:03d}.pdf"
+
+    def _cargar_manifiesto(self):
+        vacio = {"archivos": {}, "indice": []}
+        try:
+            with open(self.ruta_manifiesto, encoding="utf-8") as archivo:
+                manifiesto = json.load(archivo)
+        except (OSError, ValueError):
+            return vacio
+
+        # Si falta alguna parte o cambió la forma de dividir la salida, se une todo de nuevo
+        indice = manifiesto.get("indice", [])
+        partes = {entrada["ARCHIVO"] for entrada in indice}
+        if any(not os.path.exists(os.path.join(self.carpeta_destino, parte)) for parte in partes):
+            return vacio
+        if indice and indice[-1]["ARCHIVO"] != self._nombre_parte(indice[-1]["PARTE"]):
+            for parte in partes:
+                os.remove(os.path.join(self.carpeta_destino, parte))
+            return vacio
+        return {"archivos": manifiesto.get("archivos", {}), "indice": indice}
+
+    def agregar(self, pdf_file):
+        """
+        Programa la unión de un PDF recién descargado. No bloquea. Se omiten los archivos
+        generados por la propia unión y los que ya se unieron sin cambios.
+
+        Args:
+            pdf_file (str): Ruta del PDF a agregar
+        """
+        ruta = os.path.abspath(pdf_file)
+        nombre = os.path.basename(ruta)
+        if nombre.startswith(PREFIJO_SALIDA):
+            return
+        try:
+            estado = os.stat(ruta)
+        except OSError as e:
+            print(f"No se pudo unir el archivo {nombre}: {e}")
+            return
+        firma = {"TAMANO": estado.st_size, "MTIME": estado.st_mtime}
+
+        with self._lock:
+            if ruta in self._archivos_agregados:
+                return
+            if self._manifiesto["archivos"].get(nombre) == firma:
+                self.archivos_omitidos += 1
+                return
+            self._archivos_agregados.add(ruta)
+
+            # Con pocos archivos en espera el hilo de la unión alcanza y no se usan procesos
+            analisis = None
+            if self.procesos > 1 and self._cola.qsize() >= self.cola_para_procesos:
+                try:
+                    analisis = _pool_analisis(self.procesos).submit(_analizar_pdf, ruta)
+                except (BrokenProcessPool, RuntimeError):
+                    _descartar_pool()
+            self._cola.put((ruta, firma, analisis))
+
+    def cerrar(self):
+        """
+        Espera a que se unan los PDFs pendientes y escribe las partes y el índice finales.
+
+        Returns:
+            list: Rutas de los archivos unidos
+        """
+        self._cola.put(None)
+        self._hilo.join()
+        if self._pendiente_escritura or self._archivos_pendientes:
+            self._escribir()
+
+        partes = list(dict.fromkeys(entrada["ARCHIVO"] for entrada in self._manifiesto["indice"]))
+        rutas = [os.path.join(self.carpeta_destino, parte) for parte in partes]
+        if rutas:
+            print(f"PDF generado sin duplicados: {', '.join(partes)} (índice: {self.ruta_indice})")
+        else:
+            print("No hay certificados para unir.")
+        if self.archivos_omitidos:
+            print(f"Archivos omitidos por estar ya unidos: {self.archivos_omitidos}")
+        print(f"Total de páginas eliminadas por contenido insuficiente: {self.paginas_eliminadas}")
+        print(f"Total de certificados únicos incluidos: {len(self.cedulas_agregadas)}")
+        return rutas
+
+    def _procesar_cola(self):
+        while True:
+            elemento = self._cola.get()
+            if elemento is None:
+                return
+            pdf_file, firma, analisis = elemento
+            try:
+                try:
+                    paginas = analisis.result() if analisis else _analizar_pdf(pdf_file)
+                except BrokenProcessPool:
+                    # Un proceso del pool murió: este archivo se analiza aquí
+                    _descartar_pool()
+                    paginas = _analizar_pdf(pdf_file)
+                self._agregar_archivo(pdf_file, paginas)
+                self._archivos_pendientes[os.path.basename(pdf_file)] = firma
+            except Exception as e:
+                print(f"No se pudo unir el archivo {os.path.basename(pdf_file)}: {e}")
+
+    def _agregar_archivo(self, pdf_file, paginas):
+        # Las páginas ya vienen clasificadas: aquí no se vuelve a extraer texto
         with open(pdf_file, "rb") as f:
             pdf_reader = PyPDF2.PdfReader(f)
-            for page in pdf_reader.pages:
-                texto = page.extract_text()
-                
-                # Verificar si la página tiene contenido suficiente
-                if not es_pagina_valida(texto):
+            for page, (clasificacion, cedula) in zip(pdf_reader.pages, paginas):
+                if clasificacion == PAGINA_INSUFICIENTE:
                     print(f"Página con contenido insuficiente eliminada del archivo: {os.path.basename(pdf_file)}")
-                    paginas_eliminadas += 1
-                    continue
-                
-                # Buscar la cédula en el texto usando regex
-                match = re.search(r"Cédula de Ciudadanía:\s+([\d\.]+)", texto)
-                if match:
-                    cedula = match.group(1).replace('.', '')
+                    self.paginas_eliminadas += 1
+                elif clasificacion == PAGINA_CON_CEDULA:
                     # Solo añadir si no está repetida
-                    if cedula not in cedulas_agregadas:
-                        pdf_writer.add_page(page)
-                        cedulas_agregadas.add(cedula)
+                    if cedula not in self.cedulas_agregadas:
+                        self._agregar_pagina(page, cedula, pdf_file)
+                        self.cedulas_agregadas.add(cedula)
                     else:
                         print(f"Certificado duplicado omitido: {cedula}")
+                elif clasificacion == PAGINA_SIN_CEDULA:
+                    print("Página sin cédula identificable pero con contenido de certificado agregada.")
+                    self._agregar_pagina(page, None, pdf_file)
                 else:
-                    # Si no encuentra cédula pero tiene contenido suficiente, verificar si es página válida
-                    if tiene_contenido_certificado(texto):
-                        print("Página sin cédula identificable pero con contenido de certificado agregada.")
-                        pdf_writer.add_page(page)
-                    else:
-                        print("Página sin contenido relevante eliminada.")
-                        paginas_eliminadas += 1
-    
-    output_pdf_path = os.path.join(carpeta_destino, "CERTIFICADOS_UNIDOS.pdf")
-    with open(output_pdf_path, "wb") as output_pdf:
-        pdf_writer.write(output_pdf)
+                    print("Página sin contenido relevante eliminada.")
+                    self.paginas_eliminadas += 1
+
+            _olvidar_lector(self._pdf_writer, pdf_reader)
+
+    def _writer_actual(self):
+        if self._pdf_writer is None:
+            self._pdf_writer = PyPDF2.PdfWriter()
+            # La parte sin completar de una ejecución anterior se continúa (sin extraer texto)
+            ruta_parte = os.path.join(self.carpeta_destino, self._nombre_parte(self._parte))
+            if self._paginas_parte and os.path.exists(ruta_parte):
+                with open(ruta_parte, "rb") as f:
+                    pdf_reader = PyPDF2.PdfReader(f)
+                    for page in pdf_reader.pages:
+                        self._pdf_writer.add_page(page)
+                    _olvidar_lector(self._pdf_writer, pdf_reader)
+        return self._pdf_writer
+
+    def _agregar_pagina(self, page, cedula, pdf_file):
+        # Parte llena: se escribe y se libera antes de empezar la siguiente
+        if self.paginas_por_parte and self._paginas_parte >= self.paginas_por_parte:
+            if self._pdf_writer is not None:
+                self._escribir()
+            self._parte += 1
+            self._paginas_parte = 0
+            self._pdf_writer = None
+
+        # add_page copia la página al writer, así el archivo de origen se puede cerrar
+        self._writer_actual().add_page(page)
+        self._paginas_parte += 1
+        self.paginas_agregadas += 1
+        self._indice_pendiente.append({
+            "PARTE": self._parte,
+            "ARCHIVO": self._nombre_parte(self._parte),
+            "PAGINA": self._paginas_parte,
+            "CEDULA": cedula or "",
+            "ORIGEN": os.path.basename(pdf_file),
+        })
+        self._pendiente_escritura = True
+
+    def _escribir(self):
+        # Se escribe a un temporal y se reemplaza, para no dejar nunca un PDF a medias
+        if self._pdf_writer is not None and self._pendiente_escritura:
+            ruta_parte = os.path.join(self.carpeta_destino, self._nombre_parte(self._parte))
+            temporal = ruta_parte + ".tmp"
+            with open(temporal, "wb") as output_pdf:
+                self._pdf_writer.write(output_pdf)
+            os.replace(temporal, ruta_parte)
+
+        # El manifiesto solo registra lo que ya quedó escrito en disco
+        with self._lock:
+            self._manifiesto["indice"].extend(self._indice_pendiente)
+            self._manifiesto["archivos"].update(self._archivos_pendientes)
+            manifiesto = json.dumps(self._manifiesto, ensure_ascii=False)
+        self._indice_pendiente = []
+        self._archivos_pendientes = {}
+        _escribir_reemplazando(self.ruta_manifiesto, manifiesto)
+        self._escribir_indice()
+
+        self._pendiente_escritura = False
+
+    def _escribir_indice(self):
+        temporal = self.ruta_indice + ".tmp"
+        with open(temporal, "w", newline="", encoding="utf-8-sig") as archivo:
+            escritor = csv.DictWriter(archivo, fieldnames=["CEDULA", "ARCHIVO", "PAGINA", "ORIGEN"],
+                                      extrasaction="ignore")
+            escritor.writeheader()
+            escritor.writerows(self._manifiesto["indice"])
+        os.replace(temporal, self.ruta_indice)
+
+def _olvidar_lector(pdf_writer, pdf_reader):
+    # PyPDF2 recuerda las páginas copiadas usando id() del lector; si no se olvida
+    # este lector, el siguiente que reciba el mismo id() reutilizaría páginas ajenas
+    if pdf_writer is not None:
+        pdf_writer.reset_translation(pdf_reader)
+
+def _escribir_reemplazando(ruta, contenido):
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+
+def unir_pdfs(carpeta_destino):
+    """
+    Une los archivos PDF de una carpeta en uno o varios archivos CERTIFICADOS_UNIDOS,
+    eliminando duplicados basados en el número de cédula y páginas con contenido insuficiente.
+    Solo se procesan los PDFs que no se hayan unido antes.
     
-    print(f"PDF generado sin duplicados: {output_pdf_path}")
-    print(f"Total de páginas eliminadas por contenido insuficiente: {paginas_eliminadas}")
-    print(f"Total de certificados únicos incluidos: {len(cedulas_agregadas)}")
+    Args:
+        carpeta_destino (str): Ruta de la carpeta que contiene los PDFs a unir
+
+    Returns:
+        list: Rutas de los archivos unidos
+    """
+    # Orden estable para que el resultado no dependa del orden del sistema de archivos
+    pdf_files = sorted(glob.glob(os.path.join(carpeta_destino, "*.pdf")))
+    union = UnionIncremental(carpeta_destino)
+    for pdf_file in pdf_files:
+        union.agregar(pdf_file)
+    return union.cerrar()
 
 def es_pagina_valida(texto):
     """
@@ -67,19 +425,12 @@ def es_pagina_valida(texto):
     """
     if not texto or len(texto.strip()) < 50:  # Muy poco texto
         return False
-    
-    # Verificar que tenga elementos esenciales de un certificado
-    elementos_esenciales = [
-        "REGISTRADURÍA NACIONAL",
-        "CERTIFICA",
-        "Cédula de Ciudadanía",
-        "Estado:"
-    ]
-    
-    elementos_encontrados = sum(1 for elemento in elementos_esenciales if elemento in texto)
-    
+    encontrados, _ = _buscar_marcadores(texto)
+    return _es_contenido_suficiente(texto, encontrados)
+
+def _es_contenido_suficiente(texto, encontrados):
     # Debe tener al menos 3 de los 4 elementos esenciales
-    if elementos_encontrados < 3:
+    if len(encontrados.intersection(ELEMENTOS_ESENCIALES)) < 3:
         return False
     
     # Verificar que no sea solo una página con código de verificación
@@ -87,10 +438,7 @@ def es_pagina_valida(texto):
     lineas_con_contenido = [linea for linea in lineas if linea.strip() and len(linea.strip()) > 10]
     
     # Si tiene menos de 5 líneas con contenido real, probablemente es una página vacía
-    if len(lineas_con_contenido) < 5:
-        return False
-    
-    return True
+    return len(lineas_con_contenido) >= 5
 
 def tiene_contenido_certificado(texto):
     """
@@ -103,19 +451,10 @@ def tiene_contenido_certificado(texto):
     Returns:
         bool: True si contiene información de certificado
     """
-    indicadores_certificado = [
-        "REGISTRADURÍA NACIONAL",
-        "CERTIFICA",
-        "documento de identificación",
-        "EDISON QUIÑONES SILVA",
-        "Coordinador Grupo Servicio",
-        "Para verificar la autenticidad"
-    ]
-    
-    indicadores_encontrados = sum(1 for indicador in indicadores_certificado if indicador in texto)
+    encontrados, _ = _buscar_marcadores(texto)
     
     # Si encuentra al menos 2 indicadores, probablemente es contenido válido
-    return indicadores_encontrados >= 2
+    return len(encontrados.intersection(INDICADORES_CERTIFICADO)) >= 2
 
 if __name__ == "__main__":
     # Ejemplo de uso independiente
@@ -1,32 +1,42 @@
-import base64
-from flask import Flask, request, jsonify, send_file
+import importlib
+import io
+import time
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
-import pandas as pd
 import os
+from dotenv import load_dotenv
 from waitress import serve
 import logging
+import threading
 from pathlib import Path
 
-# Modulos de la Version 1 
-from V1.leerEXCEL import leer_excel
-from V1.navegacion import automatizar_navegacion
-from V1.Plantilla import generar_plantilla
-from V1.generarResultados import generar_resultados
+# Modulos de la Version 1 (solo los livianos; pandas, selenium, PyPDF2 y openpyxl se
+# cargan la primera vez que los usa un endpoint o en el precalentamiento)
+from V1.espacios import UPLOAD_FOLDER, obtener_espacio, obtener_o_crear_espacio
+from V1.metricas import metricas
 
-logging.basicConfig(level=logging.DEBUG)
+# Cargar las variables de entorno
+load_dotenv()
 
-# Agrega esta variable al inicio de tu archivo app.py
-ruta_carpeta_descargas = None
+logging.basicConfig(level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO))
+
+# Módulos pesados que se importan en segundo plano al arrancar si PRECARGAR_MODULOS=1
+MODULOS_PRECARGA = ("V1.trabajos", "V1.cargas", "V1.Plantilla", "V1.sesiones")
 
 app = Flask(__name__)
 CORS(app)  # Habilitar CORS para permitir peticiones desde React
 
-UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)  # Crear carpeta si no existe
 
+def _id_trabajo_de_peticion():
+    """
+    Obtiene el trabajo_id enviado en el JSON, en el formulario o en la URL.
+    """
+    data = request.get_json(silent=True) or {}
+    return data.get('trabajo_id') or request.form.get('trabajo_id') or request.args.get('trabajo_id')
+
 @app.route('/crear-carpeta-descargas', methods=['POST'])
 def crear_carpeta_en_descargas():
-    global ruta_carpeta_descargas  # usamos la variable global
     try:
         data = request.get_json()
         nombre_carpeta = data.get('nombre')
@@ -34,13 +44,17 @@ def crear_carpeta_en_descargas():
         if not nombre_carpeta:
             return jsonify({"error": "No se proporcionó un nombre de carpeta"}), 400
 
+        espacio = obtener_o_crear_espacio(data.get('trabajo_id'))
+        if not espacio:
+            return jsonify({"error": "El trabajo no existe"}), 404
+
         carpeta_descargas = str(Path.home() / "Downloads")
         ruta_carpeta = os.path.join(carpeta_descargas, nombre_carpeta)
 
         os.makedirs(ruta_carpeta, exist_ok=True)
-        ruta_carpeta_descargas = ruta_carpeta  # Guardar la ruta
+        espacio.carpeta_destino = ruta_carpeta  # Guardar la ruta en el espacio del trabajo
 
-        return jsonify({"mensaje": f"Carpeta creada en: {ruta_carpeta}"}), 200
+        return jsonify({"mensaje": f"Carpeta creada en: {ruta_carpeta}", "trabajo_id": espacio.id}), 200
 
     except Exception as e:
         return jsonify({"error": f"No se pudo crear la carpeta: {str(e)}"}), 500
@@ -51,63 +65,225 @@ def home():
 
 @app.route('/subir-excel', methods=['POST'])
 def subir_excel():
+    from V1.cargas import guardar_en_bloques, preparar_datos
+    from V1.lectores import extension_admitida
+
     if 'file' not in request.files:
         return jsonify({"error": "No se envió ningún archivo"}), 400
 
+    espacio = obtener_o_crear_espacio(_id_trabajo_de_peticion())
+    if not espacio:
+        return jsonify({"error": "El trabajo no existe"}), 404
+
+    # Guardar archivo en el espacio del trabajo por bloques, calculando su huella.
+    # Se conserva la extensión para saber si es Excel o CSV.
     file = request.files['file']
-    filepath = os.path.join(UPLOAD_FOLDER, "archivo_subido.xlsx")
-    file.save(filepath)  # Guardar archivo con nombre fijo
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in (".xlsx", ".xls", ".csv"):
+        extension = ".xlsx"
+    es_admitida, mensaje = extension_admitida(extension)
+    if not es_admitida:
+        return jsonify({"error": mensaje, "trabajo_id": espacio.id}), 400
+    espacio.ruta_excel = os.path.join(espacio.carpeta, "archivo_subido" + extension)
+    huella = guardar_en_bloques(file.stream, espacio.ruta_excel)
 
-    return jsonify({"mensaje": "Archivo recibido correctamente"}), 200
+    # El archivo se lee y se valida una sola vez; si ya se había subido no se vuelve a leer
+    es_valido, ya_existia = preparar_datos(espacio.ruta_excel, huella)
+    if not es_valido:
+        espacio.huella_archivo = None
+        return jsonify({"error": "El archivo no cumple con la plantilla o no contiene datos",
+                        "trabajo_id": espacio.id}), 400
+
+    espacio.huella_archivo = huella
+    return jsonify({"mensaje": "Archivo recibido correctamente", "trabajo_id": espacio.id,
+                    "huella": huella, "archivo_repetido": ya_existia}), 200
 
 @app.route('/iniciar-automatizacion', methods=['POST'])
 def iniciar_automatizacion():
-    global ruta_carpeta_descargas
+    from V1.trabajos import encolar_trabajo, TrabajoEnEjecucion
 
-    filepath = os.path.join(UPLOAD_FOLDER, "archivo_subido.xlsx")
+    espacio = obtener_espacio(_id_trabajo_de_peticion())
+    if not espacio:
+        return jsonify({"error": "El trabajo no existe"}), 404
 
-    if not os.path.exists(filepath):
+    if not os.path.exists(espacio.ruta_excel):
         return jsonify({"error": "No hay archivo subido"}), 400
 
-    datos = leer_excel(filepath)  
-    if datos is None:
-        return jsonify({"error": "No hay datos para procesar"}), 400
+    # El proceso se ejecuta en segundo plano; se responde de inmediato con el id del trabajo
+    try:
+        trabajo = encolar_trabajo(espacio.ruta_excel, carpeta_destino=espacio.carpeta_destino,
+                                  nombre_archivo_salida=espacio.nombre_archivo_salida,
+                                  trabajo_id=espacio.id, huella_archivo=espacio.huella_archivo)
+    except TrabajoEnEjecucion:
+        return jsonify({"error": "El trabajo ya está en ejecución"}), 409
+
+    return jsonify({"mensaje": "Automatización en cola", "trabajo_id": trabajo.id}), 202
+
+@app.route('/trabajos', methods=['GET'])
+def ver_trabajos():
+    from V1.trabajos import listar_trabajos
+
+    return jsonify([trabajo.resumen() for trabajo in listar_trabajos()]), 200
 
-    # Aquí deberías obtener el DataFrame de resultados
-    resultados = automatizar_navegacion(datos, carpeta_destino=ruta_carpeta_descargas)
+@app.route('/trabajos/<trabajo_id>', methods=['GET'])
+def ver_trabajo(trabajo_id):
+    from V1.trabajos import obtener_trabajo
 
-    # Y ahora llamas a la función pasando la ruta
-    generar_resultados(datos, resultados, nombre_archivo_salida="resultados_certificados.xlsx", carpeta_destino=ruta_carpeta_descargas)
+    trabajo = obtener_trabajo(trabajo_id)
+    if not trabajo:
+        return jsonify({"error": "El trabajo no existe"}), 404
 
-    return jsonify({"mensaje": "Automatización finalizada y resultados guardados"}), 200
+    return jsonify(trabajo.resumen()), 200
+
+@app.route('/trabajos/<trabajo_id>/eventos', methods=['GET'])
+def ver_eventos(trabajo_id):
+    from V1.trabajos import obtener_trabajo, eventos_trabajo
+
+    trabajo = obtener_trabajo(trabajo_id)
+    if not trabajo:
+        return jsonify({"error": "El trabajo no existe"}), 404
+
+    # Al reconectarse, EventSource envía el último id recibido para no perder eventos
+    ultimo_id = request.headers.get("Last-Event-ID") or request.args.get("ultimo_id")
+    ultimo_id = int(ultimo_id) if ultimo_id and ultimo_id.isdigit() else None
+
+    return Response(
+        stream_with_context(eventos_trabajo(trabajo, ultimo_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.route('/trabajos/<trabajo_id>/cancelar', methods=['POST'])
+def cancelar(trabajo_id):
+    from V1.trabajos import cancelar_trabajo
+
+    trabajo = cancelar_trabajo(trabajo_id)
+    if not trabajo:
+        return jsonify({"error": "El trabajo no existe"}), 404
+
+    return jsonify(trabajo.resumen()), 200
+
+@app.route('/metrics', methods=['GET'])
+def ver_metricas():
+    # Histogramas de tiempos por etapa, por fila y por paso del navegador (formato Prometheus)
+    return Response(metricas.exportar_prometheus(), mimetype="text/plain; version=0.0.4")
 
 @app.route('/descargar-plantilla', methods=['GET'])
 def descargar_plantilla():
-    try:
-        generar_plantilla()  # Generar la plantilla antes de enviarla
+    from V1.Plantilla import plantilla_en_memoria
 
-        # Leer el archivo y convertirlo a base64
-        with open("plantilla.xlsx", "rb") as file:
-            base64_data = base64.b64encode(file.read()).decode('utf-8')
+    try:
+        # La plantilla se genera una vez por año y se sirve desde memoria
+        contenido, etag = plantilla_en_memoria()
 
-        return jsonify({"archivo_base64": base64_data, "nombre": "plantilla.xlsx"})
+        return send_file(
+            io.BytesIO(contenido),
+            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            as_attachment=True,
+            download_name="plantilla.xlsx",
+            etag=etag,
+            conditional=True,
+            max_age=0,
+        )
     
     except Exception as e:
         return jsonify({"error": f"Error al descargar: {str(e)}"}), 500
 
 @app.route('/descargar-resultados', methods=['GET'])
 def descargar_resultados():
-    global ruta_carpeta_descargas
-    if not ruta_carpeta_descargas:
+    espacio = obtener_espacio(_id_trabajo_de_peticion())
+    if not espacio:
+        return jsonify({"error": "El trabajo no existe"}), 404
+
+    if not espacio.carpeta_destino:
         return jsonify({"error": "La carpeta de descarga no ha sido definida."}), 400
 
-    archivo_resultados = os.path.join(ruta_carpeta_descargas, "resultados_certificados.xlsx")
+    archivo_resultados = espacio.ruta_resultados
 
     if not os.path.exists(archivo_resultados):
         return jsonify({"error": "El archivo no está disponible."}), 404
 
-    return send_file(archivo_resultados, as_attachment=True)
+    return send_file(os.path.abspath(archivo_resultados), as_attachment=True)
+
+@app.route('/descargar-paquete', methods=['GET'])
+def descargar_paquete():
+    from V1.paquete import PaqueteZip, PaqueteDemasiadoGrande, archivos_paquete, rango_solicitado
+    from V1.trabajos import obtener_trabajo, ESTADOS_FINALES
+
+    espacio = obtener_espacio(_id_trabajo_de_peticion())
+    if not espacio:
+        return jsonify({"error": "El trabajo no existe"}), 404
+
+    if not espacio.carpeta_destino:
+        return jsonify({"error": "La carpeta de descarga no ha sido definida."}), 400
+
+    trabajo = obtener_trabajo(espacio.id)
+    if trabajo and trabajo.estado not in ESTADOS_FINALES:
+        return jsonify({"error": "El trabajo aún está en ejecución"}), 409
+
+    # Excel de resultados y PDFs unidos; con individuales=1 también cada certificado
+    individuales = request.args.get('individuales') == '1'
+    archivos = archivos_paquete(espacio.carpeta_destino, espacio.ruta_resultados, individuales)
+    if not archivos:
+        return jsonify({"error": "El archivo no está disponible."}), 404
+
+    try:
+        paquete = PaqueteZip(archivos)
+    except PaqueteDemasiadoGrande as e:
+        return jsonify({"error": str(e)}), 413
+
+    encabezados = {
+        "Content-Disposition": f'attachment; filename="{espacio.id}.zip"',
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{paquete.etag}"',
+        "Cache-Control": "no-cache",
+    }
+
+    # Reanudación: solo se respeta el rango si el paquete no cambió (If-Range)
+    rango = rango_solicitado(request.headers.get('Range'), paquete.tamano)
+    if_range = request.headers.get('If-Range')
+    if rango is not None and if_range and if_range.strip('"') != paquete.etag:
+        rango = None
+    if rango is False:
+        encabezados["Content-Range"] = f"bytes */{paquete.tamano}"
+        return Response(status=416, headers=encabezados)
+
+    if rango:
+        inicio, fin = rango
+        encabezados["Content-Range"] = f"bytes {inicio}-{fin}/{paquete.tamano}"
+        encabezados["Content-Length"] = str(fin - inicio + 1)
+        return Response(paquete.leer(inicio, fin), status=206, mimetype="application/zip",
+                        headers=encabezados, direct_passthrough=True)
+
+    encabezados["Content-Length"] = str(paquete.tamano)
+    return Response(paquete.leer(), mimetype="application/zip", headers=encabezados, direct_passthrough=True)
+
+def precalentar():
+    """
+    Importa en segundo plano los módulos pesados y, si se configuró, abre sesiones de
+    Chrome, para que el primer lote no pague esos tiempos. El servidor ya responde mientras
+    tanto: si un endpoint necesita un módulo antes, lo importa él mismo.
+
+    Configuración (.env):
+        PRECARGAR_MODULOS: 1 para importar los módulos pesados al arrancar
+        PRECALENTAR_SESIONES: cantidad de sesiones de Chrome que se abren al arrancar
+    """
+    if os.getenv("PRECARGAR_MODULOS", "1") == "1":
+        for nombre in MODULOS_PRECARGA:
+            inicio = time.perf_counter()
+            importlib.import_module(nombre)
+            logging.debug(f"Módulo {nombre} precargado en {time.perf_counter() - inicio:.2f} s")
+
+    # Abrir sesiones de Chrome para que el primer lote arranque sin esperas
+    sesiones_precalentadas = int(os.getenv("PRECALENTAR_SESIONES", "0"))
+    if sesiones_precalentadas > 0:
+        from V1.sesiones import pool_sesiones
+        pool_sesiones.precalentar(sesiones_precalentadas, os.getenv("CERTIFICADO_URL"))
 
 if __name__ == '__main__':
-    logging.info("Servidor iniciado en http://127.0.0.1:50400")
-    serve(app, host="0.0.0.0", port=5000)
+    threading.Thread(target=precalentar, daemon=True).start()
+
+    puerto = int(os.getenv("PUERTO", "5000"))
+    logging.info(f"Servidor iniciado en http://127.0.0.1:{puerto}")
+    # Cada cliente de /trabajos/<id>/eventos ocupa un hilo mientras el trabajo está en curso
+    serve(app, host="0.0.0.0", port=puerto, threads=int(os.getenv("SERVIDOR_HILOS", "16")))
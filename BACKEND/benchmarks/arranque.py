@@ -0,0 +1,91 @@
+"""
+Mide el arranque en frío del backend: tiempo de importación de cada módulo (con
+python -X importtime) y tiempo desde que se lanza app.py hasta que "/" responde.
+
+Uso (desde la carpeta BACKEND):
+    python -m benchmarks.arranque --top 15 --repeticiones 3
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+CARPETA_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos pesados que no deberían cargarse antes de que el servidor responda
+MODULOS_PESADOS = ("pandas", "selenium", "webdriver_manager", "PyPDF2", "openpyxl", "numpy")
+
+def medir_importaciones(modulo="app"):
+    """
+    Importa el módulo en un proceso nuevo con -X importtime.
+
+    Returns:
+        list: Tuplas (módulo, segundos propios, segundos acumulados) en orden de importación
+    """
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                             cwd=CARPETA_BACKEND, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proceso.stderr[-2000:]}")
+
+    tiempos = []
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        tiempos.append((nombre.strip(), int(propio) / 1e6, int(acumulado) / 1e6))
+    return tiempos
+
+def medir_respuesta(puerto, timeout=60, precargar=True):
+    """
+    Lanza app.py y mide cuánto tarda "/" en responder.
+
+    Returns:
+        float: Segundos desde el lanzamiento hasta la primera respuesta 200
+    """
+    entorno = dict(os.environ, PUERTO=str(puerto), PRECARGAR_MODULOS="1" if precargar else "0",
+                   PRECALENTAR_SESIONES="0")
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, "app.py"], cwd=CARPETA_BACKEND, env=entorno,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - inicio < timeout:
+            if proceso.poll() is not None:
+                raise RuntimeError(f"app.py terminó con código {proceso.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/", timeout=1) as respuesta:
+                    if respuesta.status == 200:
+                        return time.perf_counter() - inicio
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                time.sleep(0.01)
+        raise TimeoutError(f"El servidor no respondió en {timeout} s")
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del arranque del backend")
+    parser.add_argument("--modulo", default="app", help="Módulo cuyo tiempo de importación se mide")
+    parser.add_argument("--top", type=int, default=15, help="Cantidad de módulos a mostrar")
+    parser.add_argument("--puerto", type=int, default=5055, help="Puerto para lanzar app.py")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sin-servidor", action="store_true", help="Solo medir las importaciones")
+    args = parser.parse_args()
+
+    tiempos = medir_importaciones(args.modulo)
+    total = next((acumulado for nombre, _, acumulado in tiempos if nombre == args.modulo), None)
+    print(f"Importación de {args.modulo}: {total:.3f} s ({len(tiempos)} módulos)")
+    print(f"{'acumulado':>10}  {'propio':>8}  módulo")
+    for nombre, propio, acumulado in sorted(tiempos, key=lambda tiempo: -tiempo[2])[:args.top]:
+        print(f"{acumulado:>10.3f}  {propio:>8.3f}  {nombre}")
+
+    cargados = sorted({nombre.split(".")[0] for nombre, _, _ in tiempos} & set(MODULOS_PESADOS))
+    print(f"Módulos pesados cargados al importar {args.modulo}: {', '.join(cargados) or 'ninguno'}")
+
+    if not args.sin_servidor:
+        for precargar in (False, True):
+            mediciones = [medir_respuesta(args.puerto, precargar=precargar) for _ in range(args.repeticiones)]
+            print(f"Primera respuesta de / ({'con' if precargar else 'sin'} precarga): "
+                  f"mínimo {min(mediciones) * 1000:.0f} ms, máximo {max(mediciones) * 1000:.0f} ms")
@@ -0,0 +1,204 @@
+"""
+Mide el rendimiento del proceso completo contra el sitio simulado, sin consultar la
+Registraduría: filas por minuto, latencia p50/p95 por fila, tiempo de unión de los PDFs y
+tiempo de escritura del Excel de resultados, para lotes sintéticos de 100, 1.000 y 10.000 filas.
+
+Uso (desde la carpeta BACKEND):
+    python -m benchmarks.rendimiento --filas 100 1000 --trabajadores 4 --latencia 0.2 --motor http
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Las métricas, la bitácora y la caché de la corrida van a una carpeta temporal; las
+# variables se fijan antes de importar V1 para que los módulos las tomen al cargarse
+CARPETA_CORRIDA = tempfile.mkdtemp(prefix="certigranja_benchmark_")
+os.environ["METRICAS_ARCHIVO"] = os.path.join(CARPETA_CORRIDA, "tiempos.jsonl")
+os.environ["BITACORA_CARPETA"] = os.path.join(CARPETA_CORRIDA, "checkpoints")
+os.environ["CACHE_CARPETA"] = os.path.join(CARPETA_CORRIDA, "cache")
+
+import pandas as pd
+from benchmarks.sitio_simulado import MESES, argumentos_sitio, configuracion_desde_argumentos, iniciar_sitio
+from V1.generarResultados import generar_resultados
+from V1.motor_http import MOTOR_HTTP, MOTOR_SELENIUM, motor_navegacion
+from V1.navegacion import automatizar_navegacion
+
+TAMANOS_LOTE = (100, 1000, 10000)
+
+# STATUS de las filas que sí obtuvieron respuesta del sitio
+STATUS_CONSULTADOS = ("EXITO", "FALLIDO", "NOVEDAD")
+
+# Margen sobre la tasa de errores que inyecta el sitio simulado antes de dar la corrida por inválida
+MARGEN_ERRORES = 0.05
+
+def lote_sintetico(filas, proporcion_especiales=0.05, semilla=0):
+    """
+    Genera un lote con el formato de la plantilla: documentos únicos, fechas válidas y una
+    pequeña proporción de documentos TI/CE/PPT que no pasan por el sitio.
+
+    Args:
+        filas (int): Cantidad de filas
+        proporcion_especiales (float): Fracción de filas con tipo de documento especial
+        semilla (int): Semilla del azar
+
+    Returns:
+        DataFrame: Datos como los retorna leer_excel
+    """
+    azar = random.Random(semilla)
+    documentos = azar.sample(range(10_000_000, 1_200_000_000), filas)
+    return pd.DataFrame({
+        "TIPO DE DOCUMENTO": [azar.choice(["TI", "CE", "PPT"]) if azar.random() < proporcion_especiales else "CC"
+                              for _ in range(filas)],
+        "NUMERO DE DOCUMENTO": [str(documento) for documento in documentos],
+        "NOMBRES Y APELLIDOS": [f"PERSONA SINTETICA {numero}" for numero in range(1, filas + 1)],
+        "DIA": [f"{azar.randint(1, 28):02d}" for _ in range(filas)],
+        "MES": [azar.choice(MESES).upper() for _ in range(filas)],
+        "AÑO": [str(azar.randint(1970, 2020)) for _ in range(filas)],
+    })
+
+def _percentil(valores, porcentaje):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * porcentaje / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+def _leer_mediciones(desde):
+    """
+    Retorna las mediciones de filas y etapas escritas en el JSONL de métricas a partir de
+    la posición indicada.
+    """
+    filas, etapas = [], {}
+    with open(os.environ["METRICAS_ARCHIVO"], encoding="utf-8") as archivo:
+        archivo.seek(desde)
+        for linea in archivo:
+            registro = json.loads(linea)
+            if registro["tipo"] == "fila":
+                filas.append(registro)
+            elif registro["tipo"] == "etapa":
+                etapas[registro["etapa"]] = etapas.get(registro["etapa"], 0.0) + registro["duracion"]
+    return filas, etapas
+
+def validar_reporte(reporte, configuracion):
+    """
+    Revisa que la corrida mida consultas reales: alguna fila debe obtener respuesta del
+    sitio y la tasa de ERROR DE PAGINA no puede superar la que inyecta el sitio simulado
+    (errores de página más CAPTCHA que agotan los intentos) más MARGEN_ERRORES.
+
+    Returns:
+        str: Motivo por el que la corrida no es válida, o None si es válida
+    """
+    estados = reporte["status"]
+    consultadas = reporte["filas"] - estados.get("ENLACE_ESPECIAL", 0)
+    if consultadas and not any(estados.get(status) for status in STATUS_CONSULTADOS):
+        return "ninguna fila obtuvo respuesta del sitio"
+
+    intentos = int(os.getenv("CAPTCHA_MAX_INTENTOS", "3"))
+    esperada = configuracion.tasa_error_pagina + configuracion.tasa_captcha ** intentos
+    tasa = estados.get("ERROR DE PAGINA", 0) / consultadas if consultadas else 0.0
+    if tasa > esperada + MARGEN_ERRORES:
+        return f"tasa de ERROR DE PAGINA {tasa:.1%} mayor que la esperada ({esperada:.1%})"
+    return None
+
+def medir_lote(filas, trabajadores, url, motor=None, configuracion=None):
+    """
+    Procesa un lote sintético completo (navegación con unión incremental y Excel de
+    resultados) y retorna sus métricas. Si se indica la configuración del sitio simulado,
+    el reporte dice si la corrida es válida (ver validar_reporte).
+    """
+    datos = lote_sintetico(filas)
+    carpeta_destino = os.path.join(CARPETA_CORRIDA, f"lote_{filas}")
+    os.makedirs(carpeta_destino, exist_ok=True)
+    os.environ["CERTIFICADO_URL"] = url
+
+    ruta_metricas = os.environ["METRICAS_ARCHIVO"]
+    desde = os.path.getsize(ruta_metricas) if os.path.exists(ruta_metricas) else 0
+
+    inicio = time.monotonic()
+    resultados = automatizar_navegacion(datos, carpeta_destino=carpeta_destino, num_trabajadores=trabajadores,
+                                        generar_salidas=False, reanudar=False, usar_cache=False,
+                                        unir_certificados=True, motor=motor)
+    duracion_navegacion = time.monotonic() - inicio
+
+    inicio = time.monotonic()
+    generar_resultados(datos, pd.DataFrame(resultados), "resultados_benchmark.xlsx", carpeta_destino=carpeta_destino)
+    duracion_resultados = time.monotonic() - inicio
+
+    mediciones, etapas = _leer_mediciones(desde)
+    latencias = [registro["duracion"] for registro in mediciones if registro["status"] not in ("CAPTCHA", "ERROR_NAVEGADOR")]
+    estados = pd.Series([resultado["STATUS"] for resultado in resultados]).value_counts().to_dict()
+    reporte = {
+        "filas": filas,
+        "trabajadores": trabajadores,
+        "motor": motor or motor_navegacion(),
+        "segundos": round(duracion_navegacion, 2),
+        "filas_por_minuto": round(filas / duracion_navegacion * 60, 1) if duracion_navegacion else None,
+        "p50_fila": _percentil(latencias, 50),
+        "p95_fila": _percentil(latencias, 95),
+        "union_pdfs": etapas.get("union_pdfs"),
+        "escritura_resultados": round(duracion_resultados, 3),
+        "captcha": sum(1 for registro in mediciones if registro["status"] == "CAPTCHA"),
+        "status": estados,
+    }
+    motivo = validar_reporte(reporte, configuracion) if configuracion else None
+    reporte["valido"] = motivo is None
+    reporte["motivo_invalido"] = motivo
+    return reporte
+
+def _formatear(valor):
+    if valor is None:
+        return "-"
+    if isinstance(valor, float):
+        return f"{valor:.3f}"
+    return str(valor)
+
+def imprimir_tabla(reportes):
+    columnas = ["filas", "motor", "trabajadores", "segundos", "filas_por_minuto", "p50_fila", "p95_fila",
+                "union_pdfs", "escritura_resultados", "captcha", "valido"]
+    anchos = [max(len(columna), *(len(_formatear(reporte[columna])) for reporte in reportes)) for columna in columnas]
+    print("  ".join(columna.rjust(ancho) for columna, ancho in zip(columnas, anchos)))
+    for reporte in reportes:
+        print("  ".join(_formatear(reporte[columna]).rjust(ancho) for columna, ancho in zip(columnas, anchos)))
+    for reporte in reportes:
+        print(f"STATUS ({reporte['filas']} filas): {reporte['status']}")
+    for reporte in reportes:
+        if not reporte["valido"]:
+            print(f"CORRIDA INVÁLIDA ({reporte['filas']} filas): {reporte['motivo_invalido']}. "
+                  f"Sus tiempos no miden consultas reales")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del proceso contra el sitio simulado")
+    parser.add_argument("--filas", type=int, nargs="+", default=list(TAMANOS_LOTE), help="Tamaños de lote")
+    parser.add_argument("--trabajadores", type=int, default=int(os.getenv("NUM_TRABAJADORES", "1")))
+    parser.add_argument("--motor", choices=[MOTOR_HTTP, MOTOR_SELENIUM], default=None,
+                        help="Motor de navegación (por defecto MOTOR_NAVEGACION del .env)")
+    parser.add_argument("--json", help="Archivo donde guardar el reporte en JSON")
+    parser.add_argument("--conservar", action="store_true", help="No borrar la carpeta temporal de la corrida")
+    argumentos_sitio(parser)
+    args = parser.parse_args()
+
+    configuracion = configuracion_desde_argumentos(args)
+    sitio = iniciar_sitio(configuracion)
+    print(f"Sitio simulado en {sitio.url}; archivos de la corrida en {CARPETA_CORRIDA}")
+    reportes = []
+    try:
+        for filas in args.filas:
+            reportes.append(medir_lote(filas, args.trabajadores, sitio.url, args.motor, configuracion))
+    finally:
+        sitio.shutdown()
+        if not args.conservar:
+            shutil.rmtree(CARPETA_CORRIDA, ignore_errors=True)
+
+    imprimir_tabla(reportes)
+    print(f"Peticiones atendidas por el sitio simulado: {sitio.contadores}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(reportes, archivo, ensure_ascii=False, indent=2)
+    sys.exit(0 if reportes and all(reporte["valido"] for reporte in reportes) else 1)
@@ -0,0 +1,339 @@
+"""
+Sitio simulado de certificados para medir el rendimiento sin consultar la Registraduría.
+
+Reproduce las páginas que recorre automatizar_navegacion: la página inicial con el enlace
+"Expedición Certificado" (o el mensaje de error de la página), el formulario ASP.NET con los
+campos ContentPlaceHolder1_*, el mensaje de Label11 (documento no encontrado, CAPTCHA o
+novedad) y la descarga del PDF del certificado.
+
+Uso:
+    python -m benchmarks.sitio_simulado --puerto 8765 --latencia 0.3 --tasa-captcha 0.05
+"""
+import argparse
+import base64
+import hashlib
+import html
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MESES = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio",
+         "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+
+MENSAJE_ERROR_PAGINA = "Al parecer se presentó algun problema!"
+MENSAJE_NO_ENCONTRADO = "El número de documento no se encuentra en la base de datos"
+MENSAJE_CAPTCHA = "El texto del CAPTCHA no es correcto, intente nuevamente"
+MENSAJE_NOVEDAD = "El documento presenta una novedad en el archivo nacional"
+
+class ConfiguracionSitio:
+    """
+    Latencias y tasas de fallo del sitio simulado.
+
+    Args:
+        latencia (float): Segundos promedio de respuesta de cada petición
+        variacion (float): Fracción de la latencia que varía al azar (0.5 = ±50 %)
+        tasa_error_pagina (float): Probabilidad de que la página inicial muestre el error
+        tasa_captcha (float): Probabilidad de que el primer envío responda con error de CAPTCHA
+        tasa_fallidos (float): Fracción de documentos que no existen en la base de datos
+        tasa_novedad (float): Fracción de documentos con novedad
+        semilla (int): Semilla del azar, para repetir una corrida
+    """
+
+    def __init__(self, latencia=0.0, variacion=0.5, tasa_error_pagina=0.0, tasa_captcha=0.0,
+                 tasa_fallidos=0.0, tasa_novedad=0.0, semilla=None):
+        self.latencia = latencia
+        self.variacion = variacion
+        self.tasa_error_pagina = tasa_error_pagina
+        self.tasa_captcha = tasa_captcha
+        self.tasa_fallidos = tasa_fallidos
+        self.tasa_novedad = tasa_novedad
+        self.azar = random.Random(semilla)
+        self._lock = threading.Lock()
+
+    def sortear(self, tasa):
+        with self._lock:
+            return self.azar.random() < tasa
+
+    def esperar(self):
+        if self.latencia <= 0:
+            return
+        with self._lock:
+            factor = 1 + self.azar.uniform(-self.variacion, self.variacion)
+        time.sleep(max(0.0, self.latencia * factor))
+
+def _fraccion_documento(documento, sal):
+    """
+    Fracción fija en [0, 1) para un documento: el mismo documento siempre da el mismo
+    resultado (fallido o con novedad) aunque se consulte varias veces.
+    """
+    digest = hashlib.sha256(f"{sal}:{documento}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") / 2 ** 32
+
+def _escapar_pdf(texto):
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def pdf_certificado(documento):
+    """
+    Construye un PDF de certificado de una página con el texto que espera la unión de
+    certificados (Registraduría, CERTIFICA, cédula, estado...). No requiere librerías externas.
+
+    Returns:
+        bytes: Contenido del PDF
+    """
+    cedula = f"{int(documento):,}".replace(",", ".") if str(documento).isdigit() else str(documento)
+    lineas = [
+        "REGISTRADURÍA NACIONAL DEL ESTADO CIVIL",
+        "EL REGISTRADOR NACIONAL CERTIFICA",
+        f"Que la Cédula de Ciudadanía: {cedula}",
+        "Estado: VIGENTE en el archivo nacional de identificación",
+        "Para verificar la autenticidad de este documento ingrese al sitio web",
+        "EDISON QUIÑONES SILVA",
+        "Coordinador Grupo Servicio al Ciudadano",
+    ]
+    texto = "BT /F1 11 Tf 50 780 Td 16 TL\n"
+    texto += "".join(f"({_escapar_pdf(linea)}) Tj T*\n" for linea in lineas)
+    texto += "ET"
+    contenido = texto.encode("cp1252")
+
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Length " + str(len(contenido)).encode() + b" >>\nstream\n" + contenido + b"\nendstream",
+    ]
+    salida = bytearray(b"%PDF-1.4\n")
+    posiciones = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posiciones.append(len(salida))
+        salida += f"{numero} 0 obj\n".encode() + objeto + b"\nendobj\n"
+    inicio_xref = len(salida)
+    salida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    salida += "".join(f"{posicion:010d} 00000 n \n" for posicion in posiciones).encode()
+    salida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode()
+    return bytes(salida)
+
+def _opciones(valores, seleccionado=None):
+    return "".join(
+        f'<option value="{html.escape(valor)}"{" selected" if valor == seleccionado else ""}>{html.escape(valor)}</option>'
+        for valor in valores
+    )
+
+class SitioSimulado(ThreadingHTTPServer):
+    """
+    Servidor HTTP del sitio simulado. El estado de cada formulario viaja en __VIEWSTATE,
+    como en ASP.NET, y __EVENTVALIDATION se verifica en cada envío.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, direccion, configuracion=None):
+        super().__init__(direccion, ManejadorSitio)
+        self.configuracion = configuracion or ConfiguracionSitio()
+        self.secreto = secrets.token_hex(8)
+        self.descargas = {}
+        self.contadores = {"paginas": 0, "envios": 0, "descargas": 0, "captcha": 0, "errores_pagina": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}/"
+
+    def contar(self, clave):
+        with self._lock:
+            self.contadores[clave] += 1
+
+    def validacion(self, viewstate):
+        return hashlib.sha256(f"{self.secreto}:{viewstate}".encode("utf-8")).hexdigest()[:32]
+
+    def registrar_descarga(self, documento):
+        token = secrets.token_urlsafe(12)
+        with self._lock:
+            self.descargas[token] = documento
+        return token
+
+    def tomar_descarga(self, token):
+        with self._lock:
+            return self.descargas.pop(token, None)
+
+class ManejadorSitio(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Sin Nagle: encabezados y cuerpo salen en escrituras separadas y, con keep-alive, el
+    # ACK retrasado del cliente agregaría ~40 ms a cada respuesta
+    disable_nagle_algorithm = True
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, cuerpo, tipo="text/html; charset=utf-8", estado=200, encabezados=None):
+        if isinstance(cuerpo, str):
+            cuerpo = cuerpo.encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        if "ASP.NET_SessionId=" not in self.headers.get("Cookie", ""):
+            self.send_header("Set-Cookie", f"ASP.NET_SessionId={secrets.token_hex(12)}; path=/; HttpOnly")
+        for nombre, valor in (encabezados or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        sitio = self.server
+        sitio.configuracion.esperar()
+        ruta = urlparse(self.path)
+
+        if ruta.path == "/":
+            sitio.contar("paginas")
+            if sitio.configuracion.sortear(sitio.configuracion.tasa_error_pagina):
+                sitio.contar("errores_pagina")
+                self._responder(f"<html><body><h3>{MENSAJE_ERROR_PAGINA}</h3></body></html>")
+                return
+            self._responder(
+                '<html><body><h1>Certificado de vigencia de cédula</h1>'
+                '<a href="/Certificado.aspx">Expedición Certificado</a></body></html>'
+            )
+        elif ruta.path == "/Certificado.aspx":
+            self._responder(self._formulario({"paso": 1}))
+        elif ruta.path == "/Descargar.aspx":
+            token = parse_qs(ruta.query).get("t", [""])[0]
+            documento = sitio.tomar_descarga(token)
+            if documento is None:
+                self._responder("Descarga no disponible", tipo="text/plain; charset=utf-8", estado=404)
+                return
+            sitio.contar("descargas")
+            self._responder(pdf_certificado(documento), tipo="application/pdf", encabezados={
+                "Content-Disposition": f'attachment; filename="Certificado estado cedula {documento}.pdf"',
+            })
+        else:
+            self._responder("No encontrado", tipo="text/plain; charset=utf-8", estado=404)
+
+    def do_POST(self):
+        sitio = self.server
+        configuracion = sitio.configuracion
+        configuracion.esperar()
+        longitud = int(self.headers.get("Content-Length", "0"))
+        campos = {clave: valores[0] for clave, valores in
+                  parse_qs(self.rfile.read(longitud).decode("utf-8"), keep_blank_values=True).items()}
+
+        if urlparse(self.path).path != "/Certificado.aspx":
+            self._responder("No encontrado", tipo="text/plain; charset=utf-8", estado=404)
+            return
+
+        # ASP.NET rechaza el envío si __VIEWSTATE fue alterado o no corresponde a __EVENTVALIDATION
+        viewstate = campos.get("__VIEWSTATE", "")
+        try:
+            estado = json.loads(base64.b64decode(viewstate).decode("utf-8"))
+        except ValueError:
+            estado = None
+        if estado is None or campos.get("__EVENTVALIDATION") != sitio.validacion(viewstate):
+            self._responder(f"<html><body><h3>{MENSAJE_ERROR_PAGINA}</h3></body></html>", estado=500)
+            return
+
+        sitio.contar("envios")
+        documento = campos.get("ctl00$ContentPlaceHolder1$TextBox1", "").strip()
+
+        if estado.get("paso") == 1:
+            if configuracion.sortear(configuracion.tasa_captcha):
+                sitio.contar("captcha")
+                self._responder(self._formulario({"paso": 1}, campos, mensaje=MENSAJE_CAPTCHA))
+                return
+            if _fraccion_documento(documento, "fallido") < configuracion.tasa_fallidos:
+                self._responder(self._formulario({"paso": 1}, campos, mensaje=MENSAJE_NO_ENCONTRADO))
+                return
+            # Datos correctos: el botón pasa a "Generar certificado"
+            self._responder(self._formulario({"paso": 2, "documento": documento}, campos, boton="Generar certificado"))
+            return
+
+        documento = estado.get("documento", documento)
+        token = sitio.registrar_descarga(documento)
+        novedad = _fraccion_documento(documento, "novedad") < configuracion.tasa_novedad
+        self._responder(self._formulario(
+            {"paso": 3, "documento": documento}, campos,
+            mensaje=MENSAJE_NOVEDAD if novedad else None,
+            descarga=f"/Descargar.aspx?t={token}",
+        ))
+
+    def _formulario(self, estado, campos=None, mensaje=None, boton="Consultar", descarga=None):
+        campos = campos or {}
+        viewstate = base64.b64encode(json.dumps(estado).encode("utf-8")).decode("ascii")
+        validacion = self.server.validacion(viewstate)
+
+        def valor(nombre):
+            return campos.get(f"ctl00$ContentPlaceHolder1${nombre}", "")
+
+        años = [str(año) for año in range(time.localtime().tm_year, 1899, -1)]
+        etiqueta = (f'<span id="ContentPlaceHolder1_Label11" style="color:Red;">{html.escape(mensaje)}</span>'
+                    if mensaje else "")
+        # Como en el sitio real, la descarga la dispara un iframe oculto tras el segundo envío
+        marco = f'<iframe id="descarga" src="{descarga}" style="display:none"></iframe>' if descarga else ""
+        return f"""<html><body>
+<form method="post" action="/Certificado.aspx" id="form1">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}" />
+<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="CA0B0334" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{validacion}" />
+<input name="ctl00$ContentPlaceHolder1$TextBox1" type="text" id="ContentPlaceHolder1_TextBox1" value="{html.escape(valor('TextBox1'))}" />
+<select name="ctl00$ContentPlaceHolder1$DropDownList1" id="ContentPlaceHolder1_DropDownList1">{_opciones([f"{dia:02d}" for dia in range(1, 32)], valor('DropDownList1'))}</select>
+<select name="ctl00$ContentPlaceHolder1$DropDownList2" id="ContentPlaceHolder1_DropDownList2">{_opciones(MESES, valor('DropDownList2'))}</select>
+<select name="ctl00$ContentPlaceHolder1$DropDownList3" id="ContentPlaceHolder1_DropDownList3">{_opciones(años, valor('DropDownList3'))}</select>
+<input name="ctl00$ContentPlaceHolder1$TextBox2" type="text" id="ContentPlaceHolder1_TextBox2" value="" />
+<input type="submit" name="ctl00$ContentPlaceHolder1$Button1" value="{boton}" id="ContentPlaceHolder1_Button1" />
+{etiqueta}
+</form>
+{marco}
+</body></html>"""
+
+def iniciar_sitio(configuracion=None, host="127.0.0.1", puerto=0):
+    """
+    Inicia el sitio simulado en un hilo de fondo.
+
+    Args:
+        configuracion (ConfiguracionSitio): Latencias y tasas de fallo
+        host (str): Dirección en la que escucha
+        puerto (int): Puerto (0 elige uno libre)
+
+    Returns:
+        SitioSimulado: El servidor en ejecución (sitio.url, sitio.shutdown())
+    """
+    sitio = SitioSimulado((host, puerto), configuracion)
+    threading.Thread(target=sitio.serve_forever, daemon=True).start()
+    return sitio
+
+def argumentos_sitio(parser):
+    """
+    Agrega al parser las opciones de latencia y fallos del sitio simulado.
+    """
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos promedio por petición")
+    parser.add_argument("--variacion", type=float, default=0.5, help="Variación relativa de la latencia")
+    parser.add_argument("--tasa-error-pagina", type=float, default=0.0)
+    parser.add_argument("--tasa-captcha", type=float, default=0.0)
+    parser.add_argument("--tasa-fallidos", type=float, default=0.0)
+    parser.add_argument("--tasa-novedad", type=float, default=0.0)
+    parser.add_argument("--semilla", type=int, default=None)
+
+def configuracion_desde_argumentos(args):
+    return ConfiguracionSitio(
+        latencia=args.latencia, variacion=args.variacion,
+        tasa_error_pagina=args.tasa_error_pagina, tasa_captcha=args.tasa_captcha,
+        tasa_fallidos=args.tasa_fallidos, tasa_novedad=args.tasa_novedad, semilla=args.semilla,
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sitio simulado de certificados")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    argumentos_sitio(parser)
+    args = parser.parse_args()
+
+    sitio = SitioSimulado((args.host, args.puerto), configuracion_desde_argumentos(args))
+    print(f"Sitio simulado en {sitio.url} (use CERTIFICADO_URL={sitio.url})")
+    try:
+        sitio.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Peticiones atendidas: {sitio.contadores}")
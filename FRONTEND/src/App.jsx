@@ -17,6 +17,7 @@ function App() {
     handleFileChange,
     handleUpload,
     progress,
+    detalleProgreso,
     isLoading,
   } = useFileUpload();
 
@@ -46,7 +47,7 @@ function App() {
         confirmButtonColor: "#218838",
         iconColor: "#ffc107"
       });
-      return false;
+      return null;
     }
 
     try {
@@ -63,7 +64,7 @@ function App() {
       });
 
       setNombreCarpeta(nombreCarpeta.trim());
-      return true;
+      return response.data.trabajo_id;
     } catch (error) {
       console.error("Error al crear carpeta:", error);
       Swal.fire({
@@ -72,14 +73,14 @@ function App() {
         text: error.response?.data?.error || "No se pudo crear la carpeta.",
         confirmButtonColor: "#218838"
       });
-      return false;
+      return null;
     }
   };
 
   const handleUploadWithFolderCreation = async () => {
-    const carpetaCreada = await handleCrearCarpeta();
-    if (carpetaCreada) {
-      handleUpload();
+    const trabajoId = await handleCrearCarpeta();
+    if (trabajoId) {
+      handleUpload(trabajoId);
     }
   };
 
@@ -94,7 +95,7 @@ function App() {
           {isLoading ? "Cargando..." : "Cargar y Ejecutar"}
         </button>
         {/* Mostrar ProgressBar solo si isLoading es true y progress es menor que 100 */}
-        {isLoading && progress < 100 && <ProgressBar progress={progress} />}
+        {isLoading && progress < 100 && <ProgressBar progress={progress} detalle={detalleProgreso} />}
         {/* Mostrar el spinner solo si isLoading es true */}
         {isLoading && <div className="spinner"></div>}
       </div>
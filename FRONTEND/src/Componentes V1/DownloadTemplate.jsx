@@ -24,28 +24,22 @@ const DownloadTemplate = () => {
     setTemplateDownloaded(true);
 
     try {
-      const response = await axios.get(`${API_URL}/descargar-plantilla`);
+      const response = await axios.get(`${API_URL}/descargar-plantilla`, {
+        responseType: "blob",
+      });
 
       if (response.status !== 200) {
         throw new Error("No se pudo descargar la plantilla");
       }
 
-      const { archivo_base64, nombre } = response.data;
-      const byteCharacters = atob(archivo_base64);
-      const byteNumbers = new Uint8Array(byteCharacters.length).map(
-        (_, i) => byteCharacters.charCodeAt(i)
-      );
-      const blob = new Blob([byteNumbers], {
-        type: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-      });
-
-      const url = URL.createObjectURL(blob);
+      const url = URL.createObjectURL(response.data);
       const a = document.createElement("a");
       a.href = url;
-      a.download = nombre;
+      a.download = "plantilla.xlsx";
       document.body.appendChild(a);
       a.click();
       document.body.removeChild(a);
+      URL.revokeObjectURL(url);
 
       setTimeout(() => {
         Swal.fire({
@@ -13,13 +13,13 @@ const FileUploader = ({ onFileChange, fileInputRef }) => {
     const file = event.target.files[0];
 
     if (file) {
-      const allowedExtensions = ["xls", "xlsx"];
+      const allowedExtensions = ["xls", "xlsx", "csv"];
       const fileExtension = file.name.split(".").pop().toLowerCase();
 
       if (!allowedExtensions.includes(fileExtension)) {
         setFileName("");
         setIsUploaded(false);
-        setErrorMessage("Formato inválido. Solo se permiten archivos Excel.");
+        setErrorMessage("Formato inválido. Solo se permiten archivos Excel o CSV.");
         return;
       }
 
@@ -91,7 +91,7 @@ const FileUploader = ({ onFileChange, fileInputRef }) => {
         ref={fileInputRef}
         onChange={handleFileSelect}
         className="file-input"
-        accept=".xls, .xlsx"
+        accept=".xls, .xlsx, .csv"
       />
     </div>
   );
@@ -1,10 +1,11 @@
 
 // eslint-disable-next-line react/prop-types
-const ProgressBar = ({ progress }) => {
+const ProgressBar = ({ progress, detalle }) => {
     return (
       <div className="progress-bar-container">
         <progress value={progress} max="100" className="progress-bar"></progress>
         <span>{progress}%</span>
+        {detalle && <p className="progress-detalle">{detalle}</p>}
       </div>
     );
   };  
@@ -8,6 +8,7 @@ const useFileUpload = () => {
   const [file, setFile] = useState(null);
   const [progress, setProgress] = useState(0);
   const [isLoading, setIsLoading] = useState(false);
+  const [detalleProgreso, setDetalleProgreso] = useState("");
   const fileInputRef = useRef(null);
 
   const customSwal = (icon, title, text) => {
@@ -32,10 +33,11 @@ const useFileUpload = () => {
     const validExtensions = [
       "application/vnd.ms-excel",
       "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+      "text/csv",
     ];
 
-    if (!validExtensions.includes(selectedFile.type)) {
-      customSwal("error", "Formato no válido", "Selecciona un archivo Excel (.xls, .xlsx)");
+    if (!validExtensions.includes(selectedFile.type) && !selectedFile.name.toLowerCase().endsWith(".csv")) {
+      customSwal("error", "Formato no válido", "Selecciona un archivo Excel (.xls, .xlsx) o CSV (.csv)");
       if (fileInputRef.current) fileInputRef.current.value = "";
       setFile(null);
       return;
@@ -52,7 +54,68 @@ const useFileUpload = () => {
     setFile(selectedFile);
   };
 
-  const handleUpload = async () => {
+  const esperarTrabajoPorSondeo = async (trabajoId) => {
+    const estadosFinales = ["FINALIZADO", "CANCELADO", "ERROR"];
+    for (;;) {
+      const { data } = await axios.get(`${API_URL}/trabajos/${trabajoId}`);
+      setProgress(Math.min(data.porcentaje, 99));
+      if (estadosFinales.includes(data.estado)) {
+        return data;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+    }
+  };
+
+  // Sigue el trabajo fila por fila con Server-Sent Events; si la conexión falla se consulta cada 2 segundos
+  const esperarTrabajo = (trabajoId) => {
+    if (typeof EventSource === "undefined") {
+      return esperarTrabajoPorSondeo(trabajoId);
+    }
+
+    return new Promise((resolve, reject) => {
+      const fuente = new EventSource(`${API_URL}/trabajos/${trabajoId}/eventos`);
+      let totalFilas = 0;
+      let errores = 0;
+
+      fuente.addEventListener("resumen", (evento) => {
+        const datos = JSON.parse(evento.data);
+        errores = 0;
+        totalFilas = datos.total_filas;
+        setProgress(Math.min(datos.porcentaje, 99));
+        const conteo = Object.entries(datos.conteo_status || {})
+          .map(([status, cantidad]) => `${status}: ${cantidad}`)
+          .join(" · ");
+        setDetalleProgreso(
+          `${datos.filas_procesadas}/${datos.total_filas} filas · ${datos.filas_por_minuto_reciente ?? datos.filas_por_minuto} filas/min${conteo ? ` · ${conteo}` : ""}`
+        );
+      });
+
+      fuente.addEventListener("fila", (evento) => {
+        const datos = JSON.parse(evento.data);
+        errores = 0;
+        if (totalFilas) {
+          setProgress(Math.min(Math.round((datos.filas_procesadas * 100) / totalFilas), 99));
+        }
+        setDetalleProgreso(`Fila ${datos.fila + 1}: ${datos.STATUS} - ${datos.OBSERVACIONES}`);
+      });
+
+      fuente.addEventListener("fin", (evento) => {
+        fuente.close();
+        resolve(JSON.parse(evento.data));
+      });
+
+      // EventSource se reconecta solo; tras varios fallos seguidos se pasa a consultar el estado
+      fuente.onerror = () => {
+        errores += 1;
+        if (errores >= 3) {
+          fuente.close();
+          esperarTrabajoPorSondeo(trabajoId).then(resolve, reject);
+        }
+      };
+    });
+  };
+
+  const handleUpload = async (trabajoId) => {
     if (!file) {
       customSwal("warning", "Ningún archivo seleccionado", "Selecciona un archivo primero.");
       return;
@@ -61,6 +124,7 @@ const useFileUpload = () => {
     setIsLoading(true);
     const formData = new FormData();
     formData.append("file", file);
+    formData.append("trabajo_id", trabajoId);
 
     try {
       await axios.post(`${API_URL}/subir-excel`, formData, {
@@ -73,8 +137,20 @@ const useFileUpload = () => {
         },
       });
 
-      // Iniciar automatización y esperar la respuesta
-      await axios.post(`${API_URL}/iniciar-automatizacion`);
+      // Iniciar automatización: el servidor responde de inmediato con el id del trabajo
+      const { data } = await axios.post(`${API_URL}/iniciar-automatizacion`, {
+        trabajo_id: trabajoId,
+      });
+      setProgress(0);
+
+      // Consultar el progreso del trabajo hasta que termine
+      const trabajo = await esperarTrabajo(data.trabajo_id);
+      if (trabajo.estado !== "FINALIZADO") {
+        setIsLoading(false);
+        setProgress(0);
+        customSwal("error", "Proceso no completado", trabajo.mensaje);
+        return;
+      }
 
       // Ocultar el progreso y el spinner antes de mostrar la alerta
       setIsLoading(false);
@@ -97,10 +173,15 @@ const useFileUpload = () => {
 
     } catch (error) {
       console.error("Error al subir archivo:", error);
-      customSwal("error", "Error de conexión", "No se pudo conectar con el servidor. Inténtalo nuevamente.");
+      if (error.response?.data?.error) {
+        customSwal("error", "Archivo no válido", error.response.data.error);
+      } else {
+        customSwal("error", "Error de conexión", "No se pudo conectar con el servidor. Inténtalo nuevamente.");
+      }
     } finally {
       // Asegurarse de que el progreso y el estado de carga se restablezcan
       setProgress(0);
+      setDetalleProgreso("");
       setIsLoading(false);
     }
   };
@@ -110,6 +191,7 @@ const useFileUpload = () => {
     handleFileChange,
     handleUpload,
     progress,
+    detalleProgreso,
     isLoading,
   };
 };